@@ -80,6 +80,7 @@ def create_distribution(addon_root_path: str, dist_path: str):
         "wbs_kernel/CmakeLists.txt",
         "wbs_kernel/setup.py",
         "wbs_kernel/src",
+        "wbs_kernel/benchmarks",
         "pywowlib/.git",
         "pywowlib/.gitignore",
         "pywowlib/.gitmodules",
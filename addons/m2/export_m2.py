@@ -1,13 +1,14 @@
 from ..pywowlib.m2_file import M2File
 from . import m2_scene
 from .operations import m2_export_warnings
+from .lazy_animations import materialize_all
 import importlib
 
 import os
 import bpy
 import time
 
-from ..utils.misc import resolve_outside_model_path
+from ..utils.misc import resolve_outside_model_path, texture_path_session
 from ..ui.preferences import get_project_preferences
 
 def create_m2(version, filepath, selected_only, fill_textures, forward_axis, scale, merge_vertices):
@@ -15,7 +16,6 @@ def create_m2(version, filepath, selected_only, fill_textures, forward_axis, sca
     time_import_method = proj_prefs.time_import_method
     m2 = M2File(version)
     importlib.reload(m2_scene)
-    importlib.reload(m2_export_warnings)
     bl_m2 = m2_scene.BlenderM2Scene(m2, proj_prefs)
 
     export_path = resolve_outside_model_path(filepath)
@@ -29,20 +29,24 @@ def create_m2(version, filepath, selected_only, fill_textures, forward_axis, sca
 
     start_time = time.time()
 
-    bl_m2.prepare_export_axis(forward_axis, scale)
-    bl_m2.prepare_pose(selected_only)
-    bl_m2.save_properties(filepath, selected_only)
-    bl_m2.save_bones(selected_only)
-    bl_m2.save_cameras()
-    bl_m2.save_attachments()
-    bl_m2.save_events()
-    bl_m2.save_lights()
-    bl_m2.save_ribbons()
-    bl_m2.save_particles(time_import_method)
-    bl_m2.save_animations(time_import_method)
-    bl_m2.save_geosets(selected_only, fill_textures, merge_vertices)
-    bl_m2.save_collision(selected_only)
-    bl_m2.restore_pose()
+    with texture_path_session():
+        # sequences imported on demand are exported with all their keyframes
+        materialize_all()
+
+        bl_m2.prepare_export_axis(forward_axis, scale)
+        bl_m2.prepare_pose(selected_only)
+        bl_m2.save_properties(filepath, selected_only)
+        bl_m2.save_bones(selected_only)
+        bl_m2.save_cameras()
+        bl_m2.save_attachments()
+        bl_m2.save_events()
+        bl_m2.save_lights()
+        bl_m2.save_ribbons()
+        bl_m2.save_particles(time_import_method)
+        bl_m2.save_animations(time_import_method)
+        bl_m2.save_geosets(selected_only, fill_textures, merge_vertices)
+        bl_m2.save_collision(selected_only)
+        bl_m2.restore_pose()
 
     warnings = m2_export_warnings.print_warnings()
 
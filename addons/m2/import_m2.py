@@ -9,6 +9,18 @@ from . import m2_scene
 from ..pywowlib.m2_file import M2File, M2Versions
 from ..ui.preferences import get_project_preferences
 
+from typing import Optional
+
+
+def _extract_dependency(game_data, extract_dir: str, identifier, file_format: str) -> Optional[str]:
+    """ Extract a single M2 dependency file, return its extracted path or None if it failed to extract. """
+
+    try:
+        return game_data.extract_file(extract_dir, identifier, file_format)
+    except Exception as e:
+        print("\n Failed to extract \"{}\": {}".format(identifier, e))
+        return None
+
 
 def import_m2(version, filepath, is_local_file, time_import_method):
 
@@ -50,8 +62,10 @@ def import_m2(version, filepath, is_local_file, time_import_method):
         # extract textures, always into cache folder
         m2_file.texture_path_map = game_data.extract_textures_as_png(project_preferences.cache_dir_path, dependencies.textures)
 
-        # extract anims
         anim_filepaths = {}
+        anims_to_extract = {}
+        extracted_anims = []
+
         for key, identifier in dependencies.anims.items():
             #For importing m2 through import (folder)
             if is_local_file:
@@ -65,31 +79,51 @@ def import_m2(version, filepath, is_local_file, time_import_method):
                         print("\n.anim not found at:", full_path, '\n')
             #For importing thorugh WMV/WoW.Export...               
             else:
-                try:
-                    anim_filepaths[key] = game_data.extract_file(extract_dir, identifier, 'anim')
-                except:
-                        anim_filepaths[key] = os.path.split(identifier)[-1]
-                        print("\n Failed to extract anim from game data:", identifier)
+                anims_to_extract[key] = identifier
+
+        for key, identifier in anims_to_extract.items():
+            path = _extract_dependency(game_data, extract_dir, identifier, 'anim')
+
+            if path:
+                anim_filepaths[key] = path
+                extracted_anims.append(path)
+            else:
+                anim_filepaths[key] = os.path.split(identifier)[-1]
+                print("\n Failed to extract anim from game data:", identifier)
 
         # extract skins and everything else
         if is_local_file:
             skin_filepaths = dependencies.skins
         else:
-            skin_filepaths = game_data.extract_files(extract_dir, dependencies.skins, 'skin')
+            skin_filepaths = []
+
+            # skins are read by LOD index, the ones after a missing skin can't be used
+            for i, identifier in enumerate(dependencies.skins):
+                path = _extract_dependency(game_data, extract_dir, identifier, 'skin')
+
+                if not path:
+                    print("\n Failed to extract skin from game data:", identifier)
+                elif len(skin_filepaths) == i:
+                    skin_filepaths.append(path)
+
+            if dependencies.skins and not skin_filepaths:
+                raise Exception('Error: failed to extract skin \"{}\" from game data.'.format(dependencies.skins[0]))
 
         if version >= M2Versions.WOD:
             game_data.extract_files(extract_dir, dependencies.bones, 'bone', True)
             game_data.extract_files(extract_dir, dependencies.lod_skins, 'skin', True)
-        
+
     else:
         raise NotImplementedError('Error: Importing without gamedata loaded is not yet implemented.')
 
-    m2_file.read_additional_files(skin_filepaths, anim_filepaths)
-    m2_file.root.assign_bone_names()
+    try:
+        m2_file.read_additional_files(skin_filepaths, anim_filepaths)
+    finally:
+        # extracted anims are only needed for reading
+        for path in extracted_anims:
+            os.remove(path)
 
-    if not is_local_file:
-        for key, identifier in dependencies.anims.items():
-            os.remove(os.path.join(extract_dir, identifier))
+    m2_file.root.assign_bone_names()
 
     print("\n\n### Importing M2 model ###")
 
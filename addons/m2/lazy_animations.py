@@ -0,0 +1,90 @@
+import bpy
+import numpy as np
+
+from collections import namedtuple
+from typing import List
+
+from .util import write_fcurve_keyframes
+
+
+# Keys of a bone track, already converted to Blender frames and values, waiting for its fcurves to be created.
+PendingTrack = namedtuple('PendingTrack', ['data_path', 'action_group', 'length', 'interp_type', 'timestamps', 'values'])
+
+# ID property group on the action holding its pending tracks as packed float arrays. It is saved with the .blend,
+# including autosaves and quit.blend, and restored by undo along with the fcurves it is removed for.
+PENDING_TRACKS_PROP = 'wow_pending_tracks'
+
+
+def add_pending_track(action: bpy.types.Action, data_path: str, action_group: str, length: int, interp_type: str,
+                      timestamps: np.ndarray, values: np.ndarray):
+
+    pending = action.get(PENDING_TRACKS_PROP)
+
+    if pending is None:
+        action[PENDING_TRACKS_PROP] = {}
+        pending = action[PENDING_TRACKS_PROP]
+
+    pending[str(len(pending))] = {
+        'data_path': data_path,
+        'action_group': action_group,
+        'length': length,
+        'interp_type': interp_type,
+        'channels': values.shape[1],
+        'timestamps': timestamps.astype(np.float32),
+        'values': values.astype(np.float32).ravel()
+    }
+
+
+def _get_pending_tracks(action: bpy.types.Action) -> List[PendingTrack]:
+    pending = action.get(PENDING_TRACKS_PROP)
+
+    if not pending:
+        return []
+
+    # keys are stored as str(order), sort numerically to create fcurves in import order
+    return [PendingTrack(track['data_path'], track['action_group'], track['length'], track['interp_type'],
+                         np.array(track['timestamps'], dtype=np.float32),
+                         np.array(track['values'], dtype=np.float32).reshape(-1, track['channels']))
+            for _, track in sorted(pending.items(), key=lambda item: int(item[0]))]
+
+
+def has_pending_keyframes(sequence=None) -> bool:
+    """ Check if a sequence, or any sequence if None, has keyframes that were not yet created. """
+
+    if sequence is None:
+        return any(action.get(PENDING_TRACKS_PROP) for action in bpy.data.actions)
+
+    return any(anim_pair.action and anim_pair.action.get(PENDING_TRACKS_PROP) for anim_pair in sequence.anim_pairs)
+
+
+def materialize_action(action: bpy.types.Action):
+    tracks = _get_pending_tracks(action)
+
+    if not tracks:
+        return
+
+    for track in tracks:
+
+        # keys added by hand since import win over pending ones
+        if any(action.fcurves.find(track.data_path, index=k) for k in range(track.length)):
+            continue
+
+        f_curves = [action.fcurves.new(data_path=track.data_path, index=k, action_group=track.action_group)
+                    for k in range(track.length)]
+
+        write_fcurve_keyframes(f_curves, track.timestamps, track.values, track.interp_type)
+
+    del action[PENDING_TRACKS_PROP]
+
+
+def materialize_sequence(sequence):
+    for anim_pair in sequence.anim_pairs:
+        if anim_pair.action:
+            materialize_action(anim_pair.action)
+
+
+def materialize_all():
+    """ Create all pending keyframes. Must be called before anything reads or writes animation data in bulk. """
+
+    for action in bpy.data.actions:
+        materialize_action(action)
@@ -1,12 +1,13 @@
 import os
 import re
 
-from math import sqrt, isinf, asin, atan2, sin, cos
+from math import sqrt, asin, atan2, sin, cos
 from functools import partial
+from collections import namedtuple
 
 import bpy
-import sys, io
 import ctypes
+import numpy as np
 from mathutils import Vector
 from ..ui.preferences import get_project_preferences
 from ..third_party.tqdm import tqdm
@@ -14,8 +15,8 @@ from ..third_party.tqdm import tqdm
 from .bl_render import load_m2_shader_dependencies, update_m2_mat_node_tree
 from ..render.m2.shaders import M2ShaderPermutations
 from ..utils.misc import parse_bitfield, construct_bitfield, load_game_data
-from ..utils.misc import resolve_texture_path, get_origin_position, get_objs_boundbox_world, get_obj_boundbox_center, \
-    get_obj_radius
+from ..utils.misc import mesh_from_triangles
+from ..utils.misc import resolve_texture_path, get_origin_position, get_objs_boundbox_world, get_obj_boundbox_center
 from .ui.enums import mesh_part_id_menu, TEXTURE_TYPES, get_texture_type_name
 from .ui.panels.camera import update_follow_path_constraints
 from .ui.panels.animation_editor import convert_frequency_percentage, get_frequency_percentage
@@ -24,7 +25,15 @@ from ..pywowlib.file_formats.wow_common_types import *
 from ..pywowlib.file_formats.m2_format import *
 from ..pywowlib.m2_file import M2File
 from ..pywowlib.io_utils.types import vec3D
-from .util import _find_final_alias, make_fcurve_compound,get_bone_groups
+from .util import _find_final_alias, make_fcurve_compound, write_fcurve_keyframes, weld_loops, \
+    get_vertex_group_weights, select_bone_influences, read_fcurve_keyframes, reduce_keyframes
+from .lazy_animations import add_pending_track
+
+
+# export-ready vertex streams of a single geoset, as passed to M2File.add_geoset()
+GeosetArrays = namedtuple('GeosetArrays', ['vertices', 'normals', 'tex_coords', 'tex_coords2', 'tris',
+                                           'bone_indices', 'bone_weights', 'origin', 'sort_pos', 'sort_radius'])
+
 
 class BlenderM2Scene:
     """ This class is used for assembling a Blender scene from an M2 file or saving the scene back to it."""
@@ -599,41 +608,29 @@ class BlenderM2Scene:
         bpy.ops.object.mode_set(mode='OBJECT')  # return to object mode. 
 
     @staticmethod
-    def _populate_bl_fcurve(f_curves, frames, track, length, callback, interp_type):
+    def _convert_bl_track(frames, track, callback, batch=False):
+        """ Convert M2 track keys to Blender frames and an array of per channel values """
 
-        # init keyframes on the curve
-        for f_curve in f_curves:
-            f_curve.keyframe_points.add(len(frames))
+        n_keyframes = len(frames)
 
-        # set values for each channel
-            
         preferences = get_project_preferences()
-        timestamp_convert = preferences.time_import_method
-
-        if track:
-
-            for j, timestamp in enumerate(frames):
-                value = callback(value=track[j])
-                if timestamp_convert == 'Convert':
-                    frame = int(round( timestamp * ( bpy.context.scene.render.fps / bpy.context.scene.render.fps_base / 1000 )))
-                else: 
-                    frame = timestamp
-
-                for k in range(len(value)):
-                    keyframe = f_curves[k].keyframe_points[j]
-                    keyframe.co = frame, value[k]
-                    keyframe.interpolation = interp_type
-
+        timestamps = np.fromiter(frames, dtype=np.float64, count=n_keyframes)
+
+        if preferences.time_import_method == 'Convert':
+            timestamps = np.round(timestamps * (bpy.context.scene.render.fps
+                                                / bpy.context.scene.render.fps_base / 1000))
+
+        # per channel values, tracks with no values (e.g. events) are keyed as True
+        if track and batch:
+            values = np.asarray(callback(values=[track[j] for j in range(n_keyframes)]), dtype=np.float64)
+            values = values.reshape(n_keyframes, -1)
+        elif track:
+            values = np.array([callback(value=track[j]) for j in range(n_keyframes)], dtype=np.float64)
+            values = values.reshape(n_keyframes, -1)
         else:
+            values = np.ones((n_keyframes, 1), dtype=np.float64)
 
-            for j, timestamp in enumerate(frames):
-                if timestamp_convert == 'Convert':
-                    frame = int(round( timestamp * ( bpy.context.scene.render.fps / bpy.context.scene.render.fps_base / 1000 )))
-                else: 
-                    frame = timestamp
-                keyframe = f_curves[0].keyframe_points[j]
-                keyframe.co = frame, True
-                keyframe.interpolation = interp_type
+        return timestamps, values
 
     def _bl_create_sequences(self, m2_obj, m2_track_name, prefix, bl_obj, bl_obj_name, bl_track_name, track_count, conv):
         # Create tracks (and actions, as needed) for all sequences for a specific M2Track
@@ -699,7 +696,12 @@ class BlenderM2Scene:
                 )
 
     @staticmethod
-    def _bl_create_fcurves(action, action_group, callback, length, anim_index, data_path, anim_track):
+    def _bl_create_fcurves(action, action_group, callback, length, anim_index, data_path, anim_track, batch=False,
+                           lazy=False):
+        """ Create fcurves for a track of the given sequence. If batch is True, callback converts the whole list of track
+            values at once and returns an array of shape (n_keyframes, length), otherwise it converts a single value.
+            If lazy is True, converted keys are kept aside and fcurves are only created once the action is used.
+        """
 
         if anim_track.timestamps.n_elements > anim_index:
 
@@ -711,11 +713,17 @@ class BlenderM2Scene:
                 track = None
 
             if frames:
+                timestamps, values = BlenderM2Scene._convert_bl_track(frames, track, callback, batch=batch)
+                interp_type = 'LINEAR' if anim_track.interpolation_type == 1 else 'CONSTANT'
+
+                if lazy:
+                    add_pending_track(action, data_path, action_group, length, interp_type, timestamps, values)
+                    return
+
                 t_fcurves = [action.fcurves.new(data_path=data_path, index=k, action_group=action_group)
                              for k in range(length)]
 
-                BlenderM2Scene._populate_bl_fcurve(t_fcurves, frames, track, length, callback,
-                                                   'LINEAR' if anim_track.interpolation_type == 1 else 'CONSTANT')
+                write_fcurve_keyframes(t_fcurves, timestamps, values, interp_type)
 
     @staticmethod
     def _bl_create_action(anim_pair, name: str) -> bpy.types.Action:
@@ -847,22 +855,24 @@ class BlenderM2Scene:
 
         # TODO: pre-wotlk
 
-        def bl_convert_trans_track(value=None, bl_bone=None, bone=None):
-            return bl_bone.bone.matrix_local.inverted() @ (Vector(bone.pivot) + Vector(value))
-
-        def bl_convert_rot_track(value=None):
-            return value.to_quaternion()
+        def bl_convert_trans_track(values=None, matrix_local_inv=None, pivot=None):
+            translations = np.array([tuple(value) for value in values], dtype=np.float64) + pivot
+            return translations @ matrix_local_inv[:3, :3].T + matrix_local_inv[:3, 3]
 
-        def bl_convert_scale_track(value=None):
+        def bl_convert_rot_track(values=None):
+            # int16 components in M2CompQuaternion constructor order, decoded the same way as to_quaternion()
+            packed = np.array([(value.x, value.y, value.z, value.w) for value in values], dtype=np.float64)
+            return np.where(packed < 0, packed + 32768, packed - 32767) / 32767
 
-            value = list(value)
+        def bl_convert_scale_track(values=None):
+            scales = np.array([tuple(value) for value in values], dtype=np.float64)
 
-            for i, val in enumerate(value):
-                if isinf(val):
-                    print("\nWarning: Fixed infinite scale value!")  #TODO: figure out infinite values there
-                    value[i] = 1.0
+            infinite = np.isinf(scales)
+            if infinite.any():
+                print("\nWarning: Fixed infinite scale value!")  #TODO: figure out infinite values there
+                scales[infinite] = 1.0
 
-            return tuple((value[1], value[0], value[2]))
+            return scales[:, (1, 0, 2)]
         
         def load_alias_actions():
 
@@ -903,10 +913,18 @@ class BlenderM2Scene:
 
         self._bl_load_sequences()
 
+        # keyframes of regular sequences can be created on first use, global sequences are always loaded
+        lazy = self.settings.lazy_animation_import
+
         # import fcurves
         for bone in self.m2.root.bones:
             bl_bone = rig.pose.bones[bone.name]
 
+            # bone rest matrix is inverted once for all sequences of the bone
+            convert_trans_track = partial(bl_convert_trans_track
+                                          , matrix_local_inv=np.array(bl_bone.bone.matrix_local.inverted())
+                                          , pivot=np.array(tuple(bone.pivot), dtype=np.float64))
+
             is_global_seq_trans = bone.translation.global_sequence >= 0
             is_global_seq_rot = bone.rotation.global_sequence >= 0
             is_global_seq_scale = bone.scale.global_sequence >= 0
@@ -917,20 +935,21 @@ class BlenderM2Scene:
             if is_global_seq_trans:
                 action = scene.wow_m2_animations[glob_sequences[bone.translation.global_sequence]].anim_pairs[1].action
                 self._bl_create_action_group(action, bone.name)
-                self._bl_create_fcurves(action, bone.name, partial(bl_convert_trans_track, bl_bone=bl_bone, bone=bone),
-                                        3, 0, 'pose.bones["{}"].location'.format(bl_bone.name), bone.translation)
+                self._bl_create_fcurves(action, bone.name, convert_trans_track, 3, 0,
+                                        'pose.bones["{}"].location'.format(bl_bone.name), bone.translation, batch=True)
 
             if is_global_seq_rot:
                 action = scene.wow_m2_animations[glob_sequences[bone.rotation.global_sequence]].anim_pairs[1].action
                 self._bl_create_action_group(action, bone.name)
-                self._bl_create_fcurves(action, bone.name, partial(bl_convert_rot_track), 4, 0,
-                                        'pose.bones["{}"].rotation_quaternion'.format(bl_bone.name), bone.rotation)
+                self._bl_create_fcurves(action, bone.name, bl_convert_rot_track, 4, 0,
+                                        'pose.bones["{}"].rotation_quaternion'.format(bl_bone.name), bone.rotation,
+                                        batch=True)
 
             if is_global_seq_scale:
                 action = scene.wow_m2_animations[glob_sequences[bone.scale.global_sequence]].anim_pairs[1].action
                 self._bl_create_action_group(action, bone.name)
-                self._bl_create_fcurves(action, bone.name, partial(bl_convert_scale_track), 3, 0,
-                                        'pose.bones["{}"].scale'.format(bl_bone.name), bone.scale)
+                self._bl_create_fcurves(action, bone.name, bl_convert_scale_track, 3, 0,
+                                        'pose.bones["{}"].scale'.format(bl_bone.name), bone.scale, batch=True)
 
             # write regular animation fcurves
             n_global_sequences = len(self.m2.root.global_sequences)
@@ -944,24 +963,23 @@ class BlenderM2Scene:
                 # translate bones
                 if not is_global_seq_trans and bone.translation.timestamps.n_elements > anim_index:
                     self._bl_create_action_group(action, bone.name)
-                    self._bl_create_fcurves(action, bone.name, partial(bl_convert_trans_track, bl_bone=bl_bone,
-                                            bone=bone), 3, anim_index,
+                    self._bl_create_fcurves(action, bone.name, convert_trans_track, 3, anim_index,
                                             'pose.bones["{}"].location'.format(bl_bone.name),
-                                            bone.translation)
+                                            bone.translation, batch=True, lazy=lazy)
 
                 # rotate bones
                 if not is_global_seq_rot and bone.rotation.timestamps.n_elements > anim_index:
                     self._bl_create_action_group(action, bone.name)
-                    self._bl_create_fcurves(action, bone.name, partial(bl_convert_rot_track), 4,
+                    self._bl_create_fcurves(action, bone.name, bl_convert_rot_track, 4,
                                             anim_index,'pose.bones["{}"].rotation_quaternion'.format(bl_bone.name),
-                                            bone.rotation)
+                                            bone.rotation, batch=True, lazy=lazy)
 
                 # scale bones
                 if not is_global_seq_scale and bone.scale.timestamps.n_elements > anim_index:
                     self._bl_create_action_group(action, bone.name)
-                    self._bl_create_fcurves(action, bone.name, partial(bl_convert_scale_track), 3, anim_index,
+                    self._bl_create_fcurves(action, bone.name, bl_convert_scale_track, 3, anim_index,
                                             'pose.bones["{}"].scale'.format(bl_bone.name),
-                                            bone.scale)
+                                            bone.scale, batch=True, lazy=lazy)
         load_alias_actions()
 
     def load_geosets(self):
@@ -975,59 +993,49 @@ class BlenderM2Scene:
 
         skin = self.m2.skins[0]
 
-        for smesh_i, smesh in enumerate(skin.submeshes):
+        # gather all skin vertices once, submeshes are contiguous ranges of them
+        skin_vertices = [self.m2.root.vertices[i] for i in skin.vertex_indices]
 
-            vertices = [self.m2.root.vertices[skin.vertex_indices[i]].pos
-                        for i in range(smesh.vertex_start, smesh.vertex_start + smesh.vertex_count)]
+        positions = np.array([vertex.pos for vertex in skin_vertices], dtype=np.float32).reshape(-1, 3)
+        normals = np.array([vertex.normal for vertex in skin_vertices], dtype=np.float32).reshape(-1, 3)
+        tex_coords = np.array([vertex.tex_coords for vertex in skin_vertices], dtype=np.float32).reshape(-1, 2)
+        tex_coords2 = np.array([vertex.tex_coords2 for vertex in skin_vertices], dtype=np.float32).reshape(-1, 2)
 
-            normals = [self.m2.root.vertices[skin.vertex_indices[i]].normal
-                       for i in range(smesh.vertex_start, smesh.vertex_start + smesh.vertex_count)]
+        # flip V to Blender convention
+        tex_coords[:, 1] = 1 - tex_coords[:, 1]
+        tex_coords2[:, 1] = 1 - tex_coords2[:, 1]
 
-            tex_coords = [self.m2.root.vertices[skin.vertex_indices[i]].tex_coords
-                          for i in range(smesh.vertex_start, smesh.vertex_start + smesh.vertex_count)]
+        triangle_indices = np.array(skin.triangle_indices, dtype=np.int32)
 
-            tex_coords2 = [self.m2.root.vertices[skin.vertex_indices[i]].tex_coords2
-                          for i in range(smesh.vertex_start, smesh.vertex_start + smesh.vertex_count)]
+        if self.rig:
+            bone_indices = np.array([vertex.bone_indices for vertex in skin_vertices], dtype=np.int32).reshape(-1, 4)
+            bone_weights = np.array([vertex.bone_weights for vertex in skin_vertices], dtype=np.int32).reshape(-1, 4)
 
-            triangles = [[skin.triangle_indices[i + j] - smesh.vertex_start for j in range(3)]
-                         for i in range(smesh.index_start, smesh.index_start + smesh.index_count, 3)]
+        for smesh_i, smesh in enumerate(skin.submeshes):
 
-            # create mesh
-            mesh = bpy.data.meshes.new(self.m2.root.name.value)
-            mesh.from_pydata(vertices, [], triangles)
+            vertex_range = slice(smesh.vertex_start, smesh.vertex_start + smesh.vertex_count)
 
-            for poly in mesh.polygons:
-                poly.use_smooth = True
+            triangles = triangle_indices[smesh.index_start:smesh.index_start + smesh.index_count] - smesh.vertex_start
+            triangles = triangles.reshape(-1, 3)
 
-            # set normals
-            #for index, vertex in enumerate(mesh.vertices):
-                #vertex.normal = normals[index]
-            
-            # set normals
-            #custom_normals = [(0.0, 0.0, 0.0)] * len(mesh.loops)
-            #mesh.use_auto_smooth = True
+            # create mesh
+            mesh = mesh_from_triangles(self.m2.root.name.value, positions[vertex_range], triangles)
 
-            # Set custom normals
-            #mesh.create_normals_split()
-            #mesh.normals_split_custom_set_from_vertices(normals)
+            mesh.polygons.foreach_set('use_smooth', np.ones(len(mesh.polygons), dtype=bool))
 
+            # set normals
             mesh.auto_smooth_angle = 3.14159
             mesh.use_auto_smooth = True
-            custom_normals = [normals[loop.vertex_index] for loop in mesh.loops]
-            mesh.normals_split_custom_set(custom_normals)            
-
-            # set uv
-            mesh.uv_layers.new(name="UVMap")
-            uv_layer1 = mesh.uv_layers[0]
-            for i in range(len(uv_layer1.data)):
-                uv = tex_coords[mesh.loops[i].vertex_index]
-                uv_layer1.data[i].uv = (uv[0], 1 - uv[1])
-
-            mesh.uv_layers.new(name="UVMap.001")
-            uv_layer2 = mesh.uv_layers[1]
-            for i in range(len(uv_layer2.data)):
-                uv = tex_coords2[mesh.loops[i].vertex_index]
-                uv_layer2.data[i].uv = (uv[0], 1 - uv[1])
+            mesh.normals_split_custom_set_from_vertices(normals[vertex_range])
+
+            # set uv, loops are in triangle order, so loop vertices are the triangle indices
+            loop_vertices = triangles.ravel()
+
+            uv_layer1 = mesh.uv_layers.new(name="UVMap")
+            uv_layer1.data.foreach_set('uv', tex_coords[vertex_range][loop_vertices].ravel())
+
+            uv_layer2 = mesh.uv_layers.new(name="UVMap.001")
+            uv_layer2.data.foreach_set('uv', tex_coords2[vertex_range][loop_vertices].ravel())
 
             # set textures and materials
             for material, tex_unit in self.materials[smesh_i]:
@@ -1054,19 +1062,27 @@ class BlenderM2Scene:
                 armature_modifier = obj.modifiers.new(name="Armature", type='ARMATURE')
                 armature_modifier.object = self.rig
 
+                # weights are stored as bytes, so influences are added in batches per bone and weight value
+                influence_vertices = np.repeat(np.arange(smesh.vertex_count, dtype=np.int32), 4)
+                influence_bones = bone_indices[vertex_range].ravel()
+                influence_weights = bone_weights[vertex_range].ravel()
+
+                # create groups in order of first use
                 vgroups = {}
-                for j in range(smesh.vertex_start, smesh.vertex_start + smesh.vertex_count):
-                    m2_vertex = self.m2.root.vertices[skin.vertex_indices[j]]
+                bones, first_influences = np.unique(influence_bones, return_index=True)
+                for bone_index in bones[np.argsort(first_influences)]:
+                    name = self.m2.root.bones[bone_index].name
+
+                    if name not in vgroups:
+                        vgroups[name] = obj.vertex_groups.new(name=name)
 
-                    for b_index, bone_index in enumerate(filter(lambda x: x >= 0, m2_vertex.bone_indices)):
-                        vgroups.setdefault(self.m2.root.bones[bone_index].name, []).append(
-                            (j - smesh.vertex_start, m2_vertex.bone_weights[b_index] / 255))
+                keys = influence_bones * 256 + influence_weights
+                order = np.argsort(keys, kind='stable')
+                run_starts = np.flatnonzero(np.diff(keys[order])) + 1
 
-                for name in vgroups.keys():
-                    if len(vgroups[name]) > 0:
-                        grp = obj.vertex_groups.new(name=name)
-                        for (v, w) in vgroups[name]:
-                            grp.add([v], w, 'ADD')
+                for run in np.split(order, run_starts) if order.size else ():
+                    bone_index, weight = divmod(int(keys[run[0]]), 256)
+                    vgroups[self.m2.root.bones[bone_index].name].add(influence_vertices[run].tolist(), weight / 255, 'ADD')
 
             self.geosets.append(obj)
             
@@ -2034,6 +2050,153 @@ class BlenderM2Scene:
             vec[2] * self.scale
         )
 
+    def _convert_vec_array(self, vecs):
+        """ Same as _convert_vec(), for an (n, 3) array of vectors. """
+        return np.stack((vecs[:, self.axis_order[0]] * self.axis_polarity[0] * self.scale,
+                         vecs[:, self.axis_order[1]] * self.axis_polarity[1] * self.scale,
+                         vecs[:, 2] * self.scale), axis=1)
+
+    def _evaluate_geoset(self, obj, depsgraph, merge_vertices):
+        """ Collect geoset vertex streams from the evaluated mesh of the object, modifiers applied.
+            Loose geometry is skipped, faces are triangulated with loop triangles.
+        """
+
+        obj_eval = obj.evaluated_get(depsgraph)
+        mesh = obj_eval.to_mesh()
+
+        try:
+            if not mesh.uv_layers.active:
+                raise Exception("Mesh <<{}>> has no UV Map.".format(obj.name))
+
+            mesh.calc_loop_triangles()
+            mesh.calc_normals_split()
+
+            n_loops = len(mesh.loops)
+
+            positions = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+            mesh.vertices.foreach_get('co', positions)
+            positions = positions.reshape(-1, 3)
+
+            loop_vertex_indices = np.empty(n_loops, dtype=np.int32)
+            mesh.loops.foreach_get('vertex_index', loop_vertex_indices)
+
+            # custom split normals
+            loop_normals = np.empty(n_loops * 3, dtype=np.float32)
+            mesh.loops.foreach_get('normal', loop_normals)
+            loop_normals = loop_normals.reshape(-1, 3)
+
+            loop_tex_coords = []
+            for uv_layer in (mesh.uv_layers[0], mesh.uv_layers[1 if len(mesh.uv_layers) >= 2 else 0]):
+                uv = np.empty(n_loops * 2, dtype=np.float32)
+                uv_layer.data.foreach_get('uv', uv)
+                uv = uv.reshape(-1, 2)
+                uv[:, 1] = 1 - uv[:, 1]
+                loop_tex_coords.append(uv)
+
+            looptri_loops = np.empty(len(mesh.loop_triangles) * 3, dtype=np.int32)
+            mesh.loop_triangles.foreach_get('loops', looptri_loops)
+
+            # only vertices used by faces are exported
+            used_loops = np.unique(looptri_loops)
+            used_vertices = np.unique(loop_vertex_indices[used_loops])
+
+            sort_pos = get_obj_boundbox_center(obj_eval)
+            sort_radius = float(np.sqrt(((positions[used_vertices] - np.array(sort_pos)) ** 2).sum(axis=1))
+                                .max(initial=0.0))
+
+            vertex_bone_indices = np.zeros((len(positions), 4), dtype=np.int32)
+            vertex_bone_weights = np.zeros((len(positions), 4), dtype=np.int32)
+            vertex_bone_weights[:, 0] = 255
+
+            if self.rig:
+
+                bone_names = {bone.name for bone in self.rig.data.bones}
+                bone_groups = np.array([group.name in bone_names for group in obj.vertex_groups], dtype=bool)
+                group_bone_ids = np.array([self.bone_ids.get(group.name, -1) for group in obj.vertex_groups],
+                                          dtype=np.int64)
+
+                weights = get_vertex_group_weights(mesh, len(obj.vertex_groups))
+
+                (vertex_bone_indices[used_vertices],
+                 vertex_bone_weights[used_vertices],
+                 unique_bones) = select_bone_influences(weights[used_vertices], bone_groups, group_bone_ids)
+
+                num_bones = len(unique_bones)
+
+                if num_bones > 64:
+                    raise Exception(f"\n\nWarning: The number of bones affecting the mesh: {obj.name} is {num_bones}, which exceeds the limit of 64! Separate it into more objects, and try again")
+
+            if merge_vertices:
+                vertex_loops, loop_to_vertex = weld_loops(used_loops,
+                                                          positions[loop_vertex_indices],
+                                                          loop_normals,
+                                                          loop_tex_coords[0],
+                                                          loop_tex_coords[1],
+                                                          vertex_bone_indices[loop_vertex_indices],
+                                                          vertex_bone_weights[loop_vertex_indices])
+            else:
+                # one vertex per mesh vertex, attributes are taken from its last loop
+                _, last_index = np.unique(loop_vertex_indices[used_loops[::-1]], return_index=True)
+
+                vertex_loops = used_loops[::-1][last_index]
+                loop_to_vertex = np.zeros(n_loops, dtype=np.int64)
+                loop_to_vertex[used_loops] = np.searchsorted(used_vertices, loop_vertex_indices[used_loops])
+
+            source_vertices = loop_vertex_indices[vertex_loops]
+
+            matrix_world = np.array(obj_eval.matrix_world, dtype=np.float64)
+            world_positions = positions[source_vertices] @ matrix_world[:3, :3].T + matrix_world[:3, 3]
+            vertices = self._convert_vec_array(world_positions)
+
+            return GeosetArrays(vertices=list(map(tuple, vertices.tolist())),
+                                normals=list(map(tuple, loop_normals[vertex_loops].tolist())),
+                                tex_coords=list(map(tuple, loop_tex_coords[0][vertex_loops].tolist())),
+                                tex_coords2=list(map(tuple, loop_tex_coords[1][vertex_loops].tolist())),
+                                tris=list(map(tuple, loop_to_vertex[looptri_loops].reshape(-1, 3).tolist())),
+                                bone_indices=vertex_bone_indices[source_vertices].tolist(),
+                                bone_weights=vertex_bone_weights[source_vertices].tolist(),
+                                origin=tuple(vertices.mean(axis=0).tolist()),
+                                sort_pos=sort_pos,
+                                sort_radius=sort_radius)
+
+        finally:
+            obj_eval.to_mesh_clear()
+
+    def _evaluate_collision(self, obj, depsgraph):
+        """ Collision vertices, triangles and triangle normals from the evaluated mesh of the object,
+            in export space. Loose geometry is skipped.
+        """
+
+        obj_eval = obj.evaluated_get(depsgraph)
+        mesh = obj_eval.to_mesh()
+
+        try:
+            mesh.calc_loop_triangles()
+
+            positions = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+            mesh.vertices.foreach_get('co', positions)
+            positions = positions.reshape(-1, 3)
+
+            n_triangles = len(mesh.loop_triangles)
+
+            triangles = np.empty(n_triangles * 3, dtype=np.int32)
+            mesh.loop_triangles.foreach_get('vertices', triangles)
+
+            normals = np.empty(n_triangles * 3, dtype=np.float32)
+            mesh.loop_triangles.foreach_get('normal', normals)
+
+            used_vertices, triangles = np.unique(triangles, return_inverse=True)
+
+            matrix_world = np.array(obj_eval.matrix_world, dtype=np.float64)
+            world_positions = positions[used_vertices] @ matrix_world[:3, :3].T + matrix_world[:3, 3]
+
+            return (self._convert_vec_array(world_positions),
+                    triangles.reshape(-1, 3),
+                    self._convert_vec_array(normals.reshape(-1, 3).astype(np.float64)))
+
+        finally:
+            obj_eval.to_mesh_clear()
+
     def prepare_pose(self, selected_only):
 
         if bpy.context.object:
@@ -2444,21 +2607,17 @@ class BlenderM2Scene:
                 export_fcurve(m2_particle.spline_points, bl_particle.spline_action, 'spline_point', False)
 
     def save_animations(self, timestamp_convert):
+        # both operate on arrays of keyframe values
         def bl_to_m2_time(bl):
             if timestamp_convert == 'Convert':
-                return int(round( bl / (bpy.context.scene.render.fps / bpy.context.scene.render.fps_base / 1000)))
+                return np.round(bl / (bpy.context.scene.render.fps / bpy.context.scene.render.fps_base / 1000)).astype(np.int64)
             else: 
-                return int(bl)                    
+                return bl.astype(np.int64)
 
-        #def bl_to_m2_quat(n):
-            #n = max(min(n,1),-1) * 32767
-            #return int(n + 32767 if n <= 0 else n-32768)
-        
         def bl_to_m2_quat(n, threshold=1e-7):
-            n = max(min(n, 1), -1) * 32767
-            if abs(n) < threshold:
-                n = 0
-            return int(n + 32767 if n <= 0 else n - 32768)
+            n = np.clip(n, -1, 1) * 32767
+            n[np.abs(n) < threshold] = 0
+            return np.where(n <= 0, n + 32767, n - 32768).astype(np.int64)
 
         def bl_to_m2_interpolation(interpolation):
             if interpolation == 'CONSTANT': return 0
@@ -2485,6 +2644,9 @@ class BlenderM2Scene:
                     
             return len(bpy.context.scene.wow_m2_animations) - global_seq_count
         
+        interpolation_names = {item.value: item.identifier
+                               for item in bpy.types.Keyframe.bl_rna.properties['interpolation'].enum_items}
+
         # Used to measure the highest duration for any keyframe of a given sequence index
         global_seq_durations = {}
         seq_durations = {}
@@ -2493,6 +2655,12 @@ class BlenderM2Scene:
         track_global_sequences = {}
         track_interpolations = {}
 
+        # Keyframe reduction settings and savings, for the export report
+        reduce_animation_keyframes = self.settings.reduce_animation_keyframes
+        keyframe_reduction_tolerance = self.settings.keyframe_reduction_tolerance
+        keyframe_reduction_angle = self.settings.keyframe_reduction_angle
+        keyframe_reduction_stats = {'keyframes': 0, 'removed': 0, 'bytes': 0}
+
         class ObjectTracks:
             def __init__(self,seq_id,global_seq_id,pair,callback):
                 self.seq_id = seq_id
@@ -2525,7 +2693,9 @@ class BlenderM2Scene:
                         while len(track.values) < anim_count:
                             track.values.add(M2Array(value_type))
 
-            def write_track(self,path,track_count,m2_track,value_type,converter = lambda x: x, fill_tracks = False):
+            def write_track(self,path,track_count,m2_track,value_type,converter = lambda x: x, fill_tracks = False,
+                            bulk_converter = None):
+                # bulk_converter, if set, converts an array of keyframe values (n_keyframes, track_count) at once
                 # Exit on empty tracks
                 if not path in self.compounds and not fill_tracks:
                         #print("M2 track path not found : " + path)                                                              
@@ -2541,21 +2711,20 @@ class BlenderM2Scene:
                 if not fcurves:
                     return
 
+                keyframes = {i: read_fcurve_keyframes(fcurve) for i, fcurve in fcurves.items()}
+
                 mismatch_detected = False
-                
+                interpolation = None
+
                 # Find interpolation in current action
-                for i, fcurve in enumerate(fcurves.values()):
-                    interpolation = None
-                    
-                    for point in fcurve.keyframe_points:
-                        if interpolation is None:
-                            interpolation = point.interpolation
-                        else:
-                            if interpolation != point.interpolation and not mismatch_detected:
-                                print(f"\nThere's an interpolation discrepancy in {path}, found {point.interpolation}, but last type for this object was {interpolation}, WoW only supports one interpolation setting.")
-                                print(f'Exportation will continue using the original interpolation, but make sure to check the action: {self.pair.action.name}')
-                                mismatch_detected = True
-                                break
+                for i, (_, _, interpolations) in keyframes.items():
+                    interpolation = interpolation_names[interpolations[0]] if interpolations.size else None
+
+                    mismatches = np.flatnonzero(interpolations != interpolations[:1])
+                    if mismatches.size and not mismatch_detected:
+                        print(f"\nThere's an interpolation discrepancy in {path}, found {interpolation_names[interpolations[mismatches[0]]]}, but last type for this object was {interpolation}, WoW only supports one interpolation setting.")
+                        print(f'Exportation will continue using the original interpolation, but make sure to check the action: {self.pair.action.name}')
+                        mismatch_detected = True
                 
                 # Compare interpolation from (let's say a bone.translation) with other animations, to see discrepancies
                 if m2_track in track_interpolations:
@@ -2582,32 +2751,57 @@ class BlenderM2Scene:
                     if not i in fcurves:
                         raise ValueError(f'\n\nTrack index {i} from {path} missing in {self.pair.action.name} fcurves')
 
-                # Find keyframe count discrepancies
-                keyframe_count = len(fcurves[0].keyframe_points)
-                for i,fcurve in fcurves.items():
-                    cur_count = len(fcurve.keyframe_points)
-                    if cur_count != keyframe_count:
-                        raise ValueError(f'\n\nTrack index {i} keyframe count ({cur_count}) is different from index 0: {keyframe_count} in bone: {path} from action: {self.pair.action.name}')
-                
-                # Find timestamp discrepancies
-                for i in range(keyframe_count):
-                    time = fcurves[0].keyframe_points[i].co[0]
+                # Merge component curves, components keyed at different times are sampled at the union of times
+                times = keyframes[0][0]
+
+                if all(np.array_equal(keyframes[j][0], times) for j in range(1, track_count)):
+                    values = np.stack([keyframes[j][1] for j in range(track_count)], axis=1)
+                else:
+                    times = np.unique(np.concatenate([keyframes[j][0] for j in range(track_count)]))
+                    values = np.empty((len(times), track_count), dtype=np.float32)
+
                     for j in range(track_count):
-                        cur_time = fcurves[j].keyframe_points[i].co[0]
-                        if cur_time != time:
-                            raise ValueError(f'\n\nTrack index {j} frame {j} has a different time value ({cur_time}) from index 0 ({time}) in bone: {path} from action: {self.pair.action.name}')
-                
+                        component_times, component_values, _ = keyframes[j]
+                        is_keyed = np.isin(times, component_times)
+                        values[is_keyed, j] = component_values[np.searchsorted(component_times, times[is_keyed])]
+                        values[~is_keyed, j] = [fcurves[j].evaluate(t) for t in times[~is_keyed].tolist()]
+
+                # Drop keyframes the exported interpolation reproduces within tolerance
+                if reduce_animation_keyframes and value_type is not None:
+                    is_rotation = value_type in (M2CompQuaternion, quat)
+                    kept = reduce_keyframes(times, values.astype(np.float64), track_interpolations[m2_track],
+                                            keyframe_reduction_angle if is_rotation else keyframe_reduction_tolerance,
+                                            is_rotation)
+
+                    removed = len(times) - len(kept)
+                    keyframe_reduction_stats['keyframes'] += len(times)
+                    keyframe_reduction_stats['removed'] += removed
+                    # timestamp plus values, compressed quaternions use 16-bit components
+                    keyframe_reduction_stats['bytes'] += removed * (4 + track_count * (2 if value_type is M2CompQuaternion else 4))
+
+                    times = times[kept]
+                    values = values[kept]
+
                 self.ensure_track_length(m2_track, self.seq_id, anim_count, value_type, fill_tracks)
 
                 m2_times = m2_track.timestamps[self.seq_id]
                 m2_values = m2_track.values[self.seq_id] if value_type is not None else None
 
-                for i in range(keyframe_count):
-                    time = bl_to_m2_time(fcurves[0].keyframe_points[i].co[0])
-                    if m2_values is not None:
-                        values = [fcurves[j].keyframe_points[i].co[1] for j in range(track_count)]
-                        m2_values.add(converter(tuple(values) if len(values) > 1 else values[0]))
-                    m2_times.append(time)
+                m2_time = bl_to_m2_time(times.astype(np.float64))
+                m2_times.extend(m2_time.tolist())
+
+                if m2_values is not None:
+                    if bulk_converter is not None:
+                        m2_values.extend(bulk_converter(values.astype(np.float64)))
+                    elif track_count > 1:
+                        m2_values.extend([converter(tuple(row)) for row in values.tolist()])
+                    else:
+                        m2_values.extend([converter(row[0]) for row in values.tolist()])
+
+                if not m2_time.size:
+                    return
+
+                time = int(m2_time[-1])
 
                 # Increase the highest duration
                 if self.global_seq_id >= 0:
@@ -2671,28 +2865,31 @@ class BlenderM2Scene:
                 m2_bone.flags = m2_bone.flags | 512
 
                 if curve_type == 'rotation_quaternion':
+                    def convert_rotations(x):
+                        quats = bl_to_m2_quat(np.stack((
+                            x[:, 0],
+                            x[:, self.axis_order[0] + 1] * self.axis_polarity[0],
+                            x[:, self.axis_order[1] + 1] * self.axis_polarity[1],
+                            x[:, 3]
+                        ), axis=1))
+                        return [M2CompQuaternion(quat) for quat in map(tuple, quats.tolist())]
                     cpd.write_track(path,4,m2_bone.rotation,M2CompQuaternion,
-                        lambda x: M2CompQuaternion((
-                            bl_to_m2_quat(x[0]),
-                            bl_to_m2_quat(x[self.axis_order[0] + 1] * self.axis_polarity[0]),
-                            bl_to_m2_quat(x[self.axis_order[1] + 1] * self.axis_polarity[1]),
-                            bl_to_m2_quat(x[3])
-                        )), fill_tracks = False
+                        fill_tracks = False, bulk_converter = convert_rotations
                     )
 
                 elif curve_type == 'scale':
-                    def convert_scale(scale):                  
+                    def convert_scales(scales):
                         if self.forward_axis == 'X+' or self.forward_axis == 'X-':
-                            scale = (scale[1],scale[0],scale[2])
-                        elif self.forward_axis == 'Y+' or self.forward_axis == 'Y-':
-                            scale = (scale[0],scale[1],scale[2])
-                        return scale
-                    cpd.write_track(path,3,m2_bone.scale,vec3D,convert_scale, fill_tracks = False)
+                            scales = scales[:, (1, 0, 2)]
+                        return list(map(tuple, scales.tolist()))
+                    cpd.write_track(path,3,m2_bone.scale,vec3D, fill_tracks = False, bulk_converter = convert_scales)
 
                 # TODO: this probably doesn't work if bone is not at 0,0,0
                 elif curve_type == 'location':
                     cpd.write_track(path,3,m2_bone.translation,vec3D,
-                        lambda x: self._convert_vec((x[1],-x[0],x[2])), fill_tracks = False)
+                        fill_tracks = False,
+                        bulk_converter = lambda x: list(map(tuple, self._convert_vec_array(
+                            np.stack((x[:, 1], -x[:, 0], x[:, 2]), axis=1)).tolist())))
 
         def write_scene(cpd, pair):
             def extract_scene_data(path):
@@ -2984,6 +3181,12 @@ class BlenderM2Scene:
         
         write_empty_events()
 
+        if keyframe_reduction_stats['keyframes']:
+            print(f"\nKeyframe reduction: removed {keyframe_reduction_stats['removed']} of "
+                  f"{keyframe_reduction_stats['keyframes']} keyframes "
+                  f"({keyframe_reduction_stats['removed'] / keyframe_reduction_stats['keyframes']:.1%}), "
+                  f"about {keyframe_reduction_stats['bytes'] / 1024:.1f} KB of track data")
+
     def save_globalflags(self, need_combiner_flag):   
         global_flags_armature = next((obj for obj in bpy.data.objects if obj.type == 'ARMATURE'), None)
         if global_flags_armature is None:
@@ -3012,10 +3215,6 @@ class BlenderM2Scene:
         if not objects:
             raise Exception('Error: no mesh found on the scene or selected.')
 
-        # deselect all objects before saving geosets
-        bpy.ops.object.select_all(action='DESELECT')
-
-        proxy_objects = []
         tex_anim_lookup_table = [] 
         tex_combiner_materials = []
         tt_controller_combinations = []
@@ -3042,191 +3241,36 @@ class BlenderM2Scene:
 
         tt_controller_id_map = {name: idx for idx, name in enumerate(rearranged_transforms)}   
         
-        for obj in tqdm(filter(lambda ob: not ob.wow_m2_geoset.collision_mesh and ob.type == 'MESH' and not ob.hide_get(), objects), desc='Exporting Geosets', ascii=True):
+        geoset_objects = [ob for ob in objects
+                          if not ob.wow_m2_geoset.collision_mesh and ob.type == 'MESH' and not ob.hide_get()]
 
-            new_obj = obj.copy()
-            new_obj.data = obj.data.copy()
-            proxy_objects.append(new_obj)
+        # texture transform previews are exported as animations, not baked into UVs
+        tex_transforms = [modifier for ob in geoset_objects for modifier in ob.modifiers
+                          if 'M2TexTransform' in modifier.name and modifier.show_viewport]
 
-            bpy.context.collection.objects.link(new_obj)
+        for modifier in tex_transforms:
+            modifier.show_viewport = False
 
-            bpy.context.view_layer.objects.active = new_obj
-            mesh = new_obj.data
+        try:
+            depsgraph = bpy.context.evaluated_depsgraph_get()
+            geosets = [(obj, self._evaluate_geoset(obj, depsgraph, merge_vertices))
+                       for obj in tqdm(geoset_objects, desc='Exporting Geosets', ascii=True)]
+        finally:
+            for modifier in tex_transforms:
+                modifier.show_viewport = True
 
-            # security checks
+        for obj, geoset in geosets:
 
-            if not mesh.uv_layers.active:
-                raise Exception("Mesh <<{}>> has no UV Map.".format(obj.name))
-            
             ntexanim = 0
             tt_controller_id_uv1 = None
-            tt_controller_id_uv2 = None    
-
-            # apply all modifiers
-            if len(obj.modifiers):
-                for modifier in obj.modifiers:
-                    if 'M2TexTransform' not in modifier.name:
-                        bpy.ops.object.modifier_apply(modifier=modifier.name)
-            
-            #Temporal console to hide Blender's removing vertices messages
-            temporal_console_output = io.StringIO()
-            sys.stdout = temporal_console_output
-
-            # triangulate mesh, delete loose geometry
-            bpy.ops.object.mode_set(mode='EDIT')
-            bpy.ops.mesh.select_all(action='SELECT')
-            bpy.ops.mesh.reveal()
-            bpy.ops.mesh.quads_convert_to_tris()
-            bpy.ops.mesh.delete_loose()
-            bpy.ops.mesh.select_all(action='DESELECT')
-            bpy.ops.object.mode_set(mode='OBJECT')
-
-            # prepare scene
-            ###################################
-
-            # add custom split normals if there're none
-            bpy.ops.object.use_auto_smooth  = True 
-            bpy.ops.mesh.customdata_custom_splitnormals_add()
-              
-            if merge_vertices: # TODO find a better method           
-
-                bpy.ops.object.mode_set(mode='EDIT')
-                bpy.ops.mesh.select_all(action='SELECT')
-                bpy.ops.mesh.remove_doubles(threshold = 0.0001, use_sharp_edge_from_normals = True)
-                bpy.ops.uv.select_all(action='SELECT')
-                bpy.ops.uv.seams_from_islands(mark_seams=False, mark_sharp=True)
-                bpy.ops.mesh.select_all(action='DESELECT')
-                bpy.ops.object.mode_set(mode='OBJECT')
-                for e in new_obj.data.edges:
-                    if e.use_edge_sharp:
-                        e.select = True
-                bpy.ops.object.mode_set(mode='EDIT')
-                bpy.ops.mesh.edge_split()
-                bpy.ops.mesh.select_all(action='DESELECT')
-                bpy.ops.object.mode_set(mode='OBJECT')
-
-                bpy.ops.object.modifier_add(type='DATA_TRANSFER')
-                bpy.context.object.modifiers["DataTransfer"].use_loop_data = True
-                bpy.context.object.modifiers["DataTransfer"].data_types_loops = {'CUSTOM_NORMAL'}
-                bpy.context.object.modifiers["DataTransfer"].object = obj
-                bpy.ops.object.datalayout_transfer(modifier="DataTransfer")
-                bpy.ops.object.modifier_apply(modifier="DataTransfer")
-
-            sys.stdout = sys.__stdout__
-            captured_output = temporal_console_output.getvalue()
-            temporal_console_output.close()
-            #print(captured_output) #Print Blender's removed vertices info
-           
-            # smooth edges
-            # bpy.ops.object.mode_set(mode='EDIT')
-            # bpy.ops.mesh.select_all(action='SELECT')
-            # bpy.ops.mesh.mark_sharp(clear=True)
-            # bpy.ops.mesh.select_all(action='DESELECT')
-            # bpy.ops.object.mode_set(mode='OBJECT')
-            
-            # export vertices
-            mesh.calc_loop_triangles()
-            mesh.calc_normals_split()
-
-            vertices = [self._convert_vec(new_obj.matrix_world @ vertex.co) for vertex in mesh.vertices]
-            #normals = [self._convert_vec(vertex.normal) for vertex in mesh.vertices] # Original normals
-
-            normals = [(0.0, 0.0, 0.0)] * len(vertices)
-            tex_coords = [(0.0, 0.0)] * len(vertices)
-            tex_coords2 = [(0.0, 0.0)] * len(vertices)
-
-            for loop in mesh.loops:
-
-                normals[loop.vertex_index] = (mesh.loops[loop.index].normal) # custom split normals
-                tex_coords[loop.vertex_index] = (mesh.uv_layers[0].data[loop.index].uv[0],
-                                                 1 - mesh.uv_layers[0].data[loop.index].uv[1])
-                if len(mesh.uv_layers) >= 2:
-                    tex_coords2[loop.vertex_index] = (mesh.uv_layers[1].data[loop.index].uv[0],
-                                                      1 - mesh.uv_layers[1].data[loop.index].uv[1])
-                else:
-                    tex_coords2[loop.vertex_index] = (mesh.uv_layers[0].data[loop.index].uv[0],
-                                                      1 - mesh.uv_layers[0].data[loop.index].uv[1])                    
-
-            tris = [poly.vertices for poly in mesh.polygons]
-
-            # old system
-            # bpy.ops.object.origin_set(type='ORIGIN_GEOMETRY')
-            # origin = new_obj.location
-
-            vertx = 0.0
-            verty = 0.0
-            vertz = 0.0
-            vertcount = len(vertices)
-            
-            for vert in vertices:
-                vertx += vert[0]
-                verty += vert[1]
-                vertz += vert[2]
-            
-            origin = ( vertx / vertcount, verty / vertcount, vertz / vertcount )
-            
-            sort_pos = get_obj_boundbox_center(new_obj)
-            sort_radius = get_obj_radius(new_obj, sort_pos)
-
-            if self.rig:
-
-                bone_indices = []
-                bone_weights = []
-
-                bone_names = [bone.name for bone in self.rig.data.bones]
-
-                unique_bones = set()
-
-                for vertex in mesh.vertices:
-                    v_bone_indices = [0, 0, 0, 0]
-                    v_bone_weights = [0, 0, 0, 0]
-
-                    bone_groups = get_bone_groups(new_obj,vertex,bone_names)[:4]
-
-                    for i, group_info in enumerate(bone_groups):
-                        bone_id = self.bone_ids.get(new_obj.vertex_groups[group_info.group].name)
-                        weight = group_info.weight
-
-                        if bone_id is None:
-                            bone_id = 0
-                            weight = 0
-
-                        v_bone_indices[i] = bone_id
-                        v_bone_weights[i] = int(weight * 255)
-
-                        unique_bones.add(bone_id)
-                    
-                    weight_sum = sum(v_bone_weights)
-
-                    if weight_sum != 255:
-                        if weight_sum > 0:
-                            scale = 255 / weight_sum
-                            v_bone_weights = [int(w * scale) for w in v_bone_weights]
-
-                        weight_sum = sum(v_bone_weights)
-                        if weight_sum != 255:
-                            diff = 255 - weight_sum
-                            max_weight_index = v_bone_weights.index(max(v_bone_weights))
-                            v_bone_weights[max_weight_index] += diff    
-
-                    bone_indices.append(v_bone_indices)
-                    bone_weights.append(v_bone_weights)
-                
-                num_bones = len(unique_bones)
-
-                if num_bones > 64:
-                    bpy.data.objects.remove(new_obj, do_unlink=True)  
-                    raise Exception(f"\n\nWarning: The number of bones affecting the mesh: {obj.name} is {num_bones}, which exceeds the limit of 64! Separate it into more objects, and try again")
-
-            else:
-                bone_indices = [[0, 0, 0, 0] for _ in mesh.vertices]
-                bone_weights = [[255, 0, 0, 0] for _ in mesh.vertices]
+            tt_controller_id_uv2 = None
 
             # add geoset
-            g_index = self.m2.add_geoset(vertices, normals, tex_coords, tex_coords2, tris, bone_indices, bone_weights,
-                                         origin, sort_pos, sort_radius, int(new_obj.wow_m2_geoset.mesh_part_id))
+            g_index = self.m2.add_geoset(geoset.vertices, geoset.normals, geoset.tex_coords, geoset.tex_coords2,
+                                         geoset.tris, geoset.bone_indices, geoset.bone_weights, geoset.origin,
+                                         geoset.sort_pos, geoset.sort_radius, int(obj.wow_m2_geoset.mesh_part_id))
             
-            for i, material in enumerate(mesh.materials):
+            for i, material in enumerate(obj.data.materials):
 
                 textures = [material.wow_m2_material.texture_1, material.wow_m2_material.texture_2]
 
@@ -3370,73 +3414,35 @@ class BlenderM2Scene:
                 self.m2.add_material_to_geoset(g_index, render_flags, bl_mode, flags, shader_id, tex_lookup_id,
                                                 tex_1_mapping, tex_2_mapping, priority_plane, mat_layer, texture_count, color_id, transparency_id, transform_id)
 
-           
-            bpy.data.objects.remove(new_obj, do_unlink=True)  
-        
-        self.save_globalflags(need_combiner_flag)
 
-        # remove temporary objects
-        # for obj in proxy_objects:
-        #     bpy.data.objects.remove(obj, do_unlink=True)
+        self.save_globalflags(need_combiner_flag)
 
     def save_collision(self, selected_only):
         objects = bpy.context.selected_objects if selected_only else bpy.context.scene.objects
         objects = list(filter(lambda ob: ob.wow_m2_geoset.collision_mesh and ob.type == 'MESH', objects))
 
-        proxy_objects = []
+        depsgraph = bpy.context.evaluated_depsgraph_get()
+        collision_vertices = []
 
         for obj in tqdm(objects, desc='Exporting Collision', ascii=True):
-            new_obj = obj.copy()
-            new_obj.data = obj.data.copy()
-            proxy_objects.append(new_obj)
-
-            bpy.context.collection.objects.link(new_obj)
+            vertices, faces, normals = self._evaluate_collision(obj, depsgraph)
 
-            bpy.context.view_layer.objects.active = new_obj
-            mesh = new_obj.data
-
-            # apply all modifiers
-            if len(obj.modifiers):
-                for modifier in obj.modifiers:
-                    bpy.ops.object.modifier_apply(modifier=modifier.name)
-
-            temporal_console_output = io.StringIO()
-            sys.stdout = temporal_console_output
-             
-            # triangulate mesh, delete loose geometry
-            bpy.ops.object.mode_set(mode='EDIT')
-            bpy.ops.mesh.select_all(action='SELECT')
-            bpy.ops.mesh.reveal()
-            bpy.ops.mesh.quads_convert_to_tris()
-            bpy.ops.mesh.delete_loose()
-            bpy.ops.mesh.select_all(action='DESELECT')
-            bpy.ops.object.mode_set(mode='OBJECT')
-
-            sys.stdout = sys.__stdout__
-            captured_output = temporal_console_output.getvalue()
-            temporal_console_output.close()
-
-            # collect geometry data
-            vertices = [self._convert_vec(tuple(new_obj.matrix_world @ vertex.co)) for vertex in mesh.vertices]
-            faces = [tuple([vertex for vertex in poly.vertices]) for poly in mesh.polygons]
-            normals = [self._convert_vec(tuple(poly.normal)) for poly in mesh.polygons]
-
-            self.m2.add_collision_mesh(vertices, faces, normals)
-            bpy.data.objects.remove(new_obj, do_unlink=True)
-
-        # remove temporary objects
-        #for obj in proxy_objects:
-        #    bpy.data.objects.remove(obj, do_unlink=True)
+            self.m2.add_collision_mesh(list(map(tuple, vertices.tolist())),
+                                       list(map(tuple, faces.tolist())),
+                                       list(map(tuple, normals.tolist())))
+            collision_vertices.append(vertices)
 
         # calculate collision bounding box
-        b_min, b_max = get_objs_boundbox_world(objects)
-        b_min = self._convert_vec(b_min)
-        b_max = self._convert_vec(b_max)
-        self.m2.root.collision_box.min = b_min
-        self.m2.root.collision_box.max = b_max
-        self.m2.root.collision_sphere_radius = sqrt(((b_max[self.axis_order[0]] - b_min[self.axis_order[0]]) * self.axis_polarity[0] * self.scale) ** 2
-                                                    + ((b_max[self.axis_order[1]] - b_min[self.axis_order[1]]) * self.axis_polarity[1] * self.scale) ** 2
-                                                    + ((b_max[2] - b_min[2])) ** 2) / 2
+        if collision_vertices and sum(len(vertices) for vertices in collision_vertices):
+            all_vertices = np.concatenate(collision_vertices)
+            b_min = all_vertices.min(axis=0)
+            b_max = all_vertices.max(axis=0)
+        else:
+            b_min = b_max = np.zeros(3)
+
+        self.m2.root.collision_box.min = tuple(b_min.tolist())
+        self.m2.root.collision_box.max = tuple(b_max.tolist())
+        self.m2.root.collision_sphere_radius = float(np.linalg.norm(b_max - b_min)) / 2
 
         #for key, identifier in self.final_events.items():
         #    print(key, identifier)
\ No newline at end of file
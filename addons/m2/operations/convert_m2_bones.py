@@ -1,91 +1,93 @@
 import bpy
 import re
+import numpy as np
 from mathutils import Matrix, Vector, Quaternion
-from ..util import can_apply_scale,make_fcurve_compound,get_bone_groups
+from ..util import make_fcurve_compound,get_bone_groups,read_fcurve_keyframes
+from ..lazy_animations import materialize_all
 
 def convert_m2_bones():
-    def fix_scale(matrix,curves,keyframe_count):
-        if not can_apply_scale(curves,keyframe_count):
-            return (True,'Non-uniform scaling')
-
-        for i in range(keyframe_count):
-            def co(j): return fcurves[j].keyframe_points[i].co
-            # read vector defining the old rotation
-            vec = Vector((co(0)[1], co(1)[1], co(2)[1]))
-
-            # TODO: CHANGE VECTOR USING 'matrix' HERE SOMEHOW
-
-            # write vector back
-            co(0)[1] = vec.x
-            co(1)[1] = vec.y
-            co(2)[1] = vec.z
-
-        return (False,'')
-
-    def fix_rotation(matrix,fcurves,keyframe_count):
-        def quat_dist(q1,q2):
-            # takes polarity into account on purpose.
-            # we just want to do _mostly_ correct rotations,
-            # but there might be a better formula to use here.
-            return (
-                pow(q1.w-q2.w,2) +
-                pow(q1.x-q2.x,2) +
-                pow(q1.y-q2.y,2) +
-                pow(q1.z-q2.z,2))
-
-        last_quat = None
-        for i in range(keyframe_count):
-            def co(j): return fcurves[j].keyframe_points[i].co
-
-            q_in = Quaternion((co(0)[1], co(1)[1], co(2)[1], co(3)[1]))
-            axis,angle = q_in.to_axis_angle()
-            axis.rotate(matrix)
-
-            rot_q = Quaternion(axis,angle)
-            if last_quat is None:
-                last_quat = rot_q
-            else:
-                rot_q_neg = Quaternion(-rot_q)
-                dist = quat_dist(rot_q,last_quat)
-                neg_dist = quat_dist(rot_q_neg,last_quat)
-                last_quat = rot_q if dist <= neg_dist else rot_q_neg
-
-            co(0)[1] = last_quat.w
-            co(2)[1] = last_quat.x
-            co(1)[1] = -last_quat.y
-            co(3)[1] = last_quat.z
-        return (False,'')
-
-    def fix_location(matrix, fcurves,keyframe_count):
-        for i in range(keyframe_count):
-            def co(j): return fcurves[j].keyframe_points[i].co
-            vec = Vector((co(0)[1],co(1)[1], co(2)[1]))
-            vec.rotate(matrix)
-
-            co(1)[1] = vec.x
-            co(0)[1] = -vec.y
-            co(2)[1] = vec.z
-        return (False,'')
+    # callbacks take keyframe values of shape (n_keyframes, n_channels) and return (should_remove, reason, values)
+    def fix_scale(matrix, values):
+        # same check as can_apply_scale()
+        if np.any(np.abs(values[:, 0] - values[:, 1]) > 0.0001) or np.any(np.abs(values[:, 0] - values[:, 2]) > 0.0001):
+            return (True,'Non-uniform scaling',values)
+
+        # TODO: CHANGE VECTOR USING 'matrix' HERE SOMEHOW
+
+        return (False,'',values)
+
+    def fix_rotation(matrix, values):
+        rotation = np.array(matrix.to_3x3().normalized())
+
+        # axis and angle of the normalized quaternions, sanitized the way Quaternion.to_axis_angle() does
+        norm = np.linalg.norm(values, axis=1, keepdims=True)
+        quats = np.where(norm != 0, values / np.where(norm != 0, norm, 1), (0.0, 1.0, 0.0, 0.0))
+
+        half_angle = np.arccos(np.clip(quats[:, 0], -1, 1))
+        sin_half = np.sin(half_angle)
+        sin_half[np.abs(sin_half) < np.finfo(np.float32).eps] = 1.0
+
+        axis = quats[:, 1:] / sin_half[:, None]
+        angle = half_angle * 2
+        axis[~axis.any(axis=1), 1] = 1.0
+
+        # rotate the axis, keep the angle
+        axis = axis @ rotation.T
+        axis_length = np.linalg.norm(axis, axis=1, keepdims=True)
+        is_valid = axis_length[:, 0] != 0
+
+        rot_q = np.empty_like(values)
+        rot_q[:] = (1.0, 0.0, 0.0, 0.0)
+        rot_q[is_valid, 0] = np.cos(angle[is_valid] / 2)
+        rot_q[is_valid, 1:] = axis[is_valid] / axis_length[is_valid] * np.sin(angle[is_valid] / 2)[:, None]
+
+        # keep each quaternion in the hemisphere of the previous one, as it was written.
+        # takes polarity into account on purpose, we just want to do _mostly_ correct rotations.
+        flips = np.zeros(len(rot_q), dtype=np.int64)
+        flips[1:] = (rot_q[1:] * rot_q[:-1]).sum(axis=1) < 0
+        rot_q *= np.where(np.cumsum(flips) % 2, -1.0, 1.0)[:, None]
+
+        return (False,'',np.stack((rot_q[:, 0], -rot_q[:, 2], rot_q[:, 1], rot_q[:, 3]), axis=1))
+
+    def fix_location(matrix, values):
+        vecs = values @ np.array(matrix.to_3x3().normalized()).T
+        return (False,'',np.stack((-vecs[:, 1], vecs[:, 0], vecs[:, 2]), axis=1))
 
     def fix_curves(name, matrix, fcurves, track_count, callback):
         for i in range(track_count):
             if not i in fcurves:
                 raise ValueError(f'Track index {i} missing in {name} fcurves')
 
-        keyframe_count = len(fcurves[0].keyframe_points)
-        for i,fcurve in fcurves.items():
-            cur_count = len(fcurve.keyframe_points)
+        keyframes = {i: read_fcurve_keyframes(fcurve) for i, fcurve in fcurves.items()}
+
+        times = keyframes[0][0]
+        keyframe_count = len(times)
+        for i,(cur_times, _, _) in keyframes.items():
+            cur_count = len(cur_times)
             if cur_count != keyframe_count:
                 raise ValueError(f'Track index {i} keyframe count ({cur_count}) is different from index 0 {keyframe_count}')
 
-        for i in range(keyframe_count):
-            time = fcurves[0].keyframe_points[i].co[0]
+        for j in range(track_count):
+            mismatches = np.flatnonzero(keyframes[j][0] != times)
+            if mismatches.size:
+                cur_time = keyframes[j][0][mismatches[0]]
+                raise ValueError(f'Track index {j} frame {j} has a different time value ({cur_time}) from index 0 ({times[mismatches[0]]})')
+
+        values = np.stack([keyframes[j][1] for j in range(track_count)], axis=1).astype(np.float64)
+        (should_remove,remove_reason,values) = callback(matrix, values)
+
+        if not should_remove:
+            co = np.empty((keyframe_count, 2), dtype=np.float32)
+            co[:, 0] = times
+
             for j in range(track_count):
-                cur_time = fcurves[j].keyframe_points[i].co[0]
-                if cur_time != time:
-                    raise ValueError(f'Track index {j} frame {j} has a different time value ({cur_time}) from index 0 ({time})')
+                co[:, 1] = values[:, j]
+                fcurves[j].keyframe_points.foreach_set('co', co.ravel())
+
+        return (should_remove,remove_reason)
 
-        return callback(matrix,fcurves,keyframe_count)
+    # keyframes rewritten below must exist
+    materialize_all()
 
     bpy.ops.object.mode_set(mode='OBJECT')
     bpy.ops.object.select_all(action='DESELECT')
@@ -1,14 +1,44 @@
 import bpy
 import re
+from bpy.app.handlers import persistent
+from collections import namedtuple
+from typing import Dict, List, Optional, Tuple
 from mathutils import Vector
 from ..util import can_apply_scale, make_fcurve_compound,get_bone_groups
 
+
+# Checks are run in order of registration. Object checks return records for a single object, which are cached until
+# the object changes and merged into warning items by combine(). Scene checks return warning items directly.
+WarningCheck = namedtuple('WarningCheck', ['name', 'description', 'scan', 'is_object_check', 'combine'])
+
+_checks: List[WarningCheck] = []
+
+# object name -> check name -> records
+_object_records: Dict[str, Dict[str, list]] = {}
+
+# scene name and check name -> items, for the last scanned scene
+_scene_items: Optional[Tuple[str, Dict[str, list]]] = None
+
+
+def object_check(name, description, combine=list):
+    def decorator(scan):
+        _checks.append(WarningCheck(name, description, scan, True, combine))
+        return scan
+    return decorator
+
+
+def scene_check(name, description):
+    def decorator(scan):
+        _checks.append(WarningCheck(name, description, scan, False, None))
+        return scan
+    return decorator
+
+
+@scene_check("Wrong Scene Type", [
+    'Issue: The scene type is set to WMO instead of M2',
+    'Fix: Change the scene type to "M2" in the top-right corner of blender'
+])
 def wrong_scene_type():
-    name = "Wrong Scene Type"
-    description = [
-        'Issue: The scene type is set to WMO instead of M2',
-        'Fix: Change the scene type to "M2" in the top-right corner of blender'
-    ]
     items = []
 
     if not bpy.context.scene:
@@ -16,14 +46,13 @@ def wrong_scene_type():
     if bpy.context.scene.wow_scene.type != 'M2':
         items.append(f"Wrong scene: Type is {bpy.context.scene.wow_scene.type} but should be M2")
 
-    return (name,description,items)
+    return items
 
-def transformed_objects():
-    name = "Transformed Objects"
-    description = [
-        'Issue: Objects in the scene are transformed in any way (moved, rotated or scaled)',
-        'Fix: Run the "Convert Bones To WoW" command and fix any issues it might cause.'
-    ]
+@object_check("Transformed Objects", [
+    'Issue: Objects in the scene are transformed in any way (moved, rotated or scaled)',
+    'Fix: Run the "Convert Bones To WoW" command and fix any issues it might cause.'
+])
+def transformed_objects(obj):
     items = []
 
     def vec_eq(n, q1,q2):
@@ -38,140 +67,131 @@ def transformed_objects():
             str_out += names[i] + "=" + str(value[i]) + " "
         return str_out
 
-    for obj in bpy.data.objects:
-        if obj.type not in  ('ARMATURE', 'MESH'):
-            continue
-
-        def compare(name,names,val1,val2):
-            if not vec_eq(len(names),val1,val2):
-                items.append(f"Object {obj.name}s {name} is {vec_str(val1,names)}, but should be {vec_str(val2,names)}")
-
-        vec_names = ['x','y','z']
-        quat_names = ['w','x','y','z']
-
-        compare("location",vec_names,obj.location,(0,0,0))
-        compare("scale ",vec_names,obj.scale,(1,1,1))
-        if obj.rotation_mode == 'QUATERNION':
-            compare("quaternion rotation",quat_names,obj.rotation_quaternion,(1,0,0,0))
-        elif obj.rotation_mode == 'AXIS_ANGLE':
-            compare("axis angle rotation",quat_names,obj.rotation_quaternion,(1,0,0,0))
-        else:
-            compare("euler rotation",vec_names,obj.rotation_euler,(0,0,0))
-
-    return (name,description,items)
-
-def empty_textures():
-    name = "Empty Textures"
-    description = [
-        'Issue: An M2 material has no texture set in any of its texture slots.',
-        'Effect: Will usually cause the model to become invisible ingame',
-        "Note: this is not *always* an error, not all materials have textures."
-    ]
-    items = []
-    for obj in bpy.data.objects:
-        if not obj.wow_m2_geoset.collision_mesh:
-            for slot in obj.material_slots:
-                if slot.material.wow_m2_material.texture_1 is None:
-                    items.append(f'Object {obj.name} has no m2 textures, this is usually an error and will cause the model to be invisible ingame')
-
-    return (name,description,items)
-
-def empty_texture_paths():
-    name = "Empty Texture Path"
-    description = [
-        'Issue: A model has an M2 material with a texture set that has no blp path',
-        'Effect: Will usually cause the model to become invisible ingame',
-        'Fix: Find the material with the texture and fill the Texture Path',
-    ]
+    if obj.type not in  ('ARMATURE', 'MESH'):
+        return items
+
+    def compare(name,names,val1,val2):
+        if not vec_eq(len(names),val1,val2):
+            items.append(f"Object {obj.name}s {name} is {vec_str(val1,names)}, but should be {vec_str(val2,names)}")
+
+    vec_names = ['x','y','z']
+    quat_names = ['w','x','y','z']
+
+    compare("location",vec_names,obj.location,(0,0,0))
+    compare("scale ",vec_names,obj.scale,(1,1,1))
+    if obj.rotation_mode == 'QUATERNION':
+        compare("quaternion rotation",quat_names,obj.rotation_quaternion,(1,0,0,0))
+    elif obj.rotation_mode == 'AXIS_ANGLE':
+        compare("axis angle rotation",quat_names,obj.rotation_quaternion,(1,0,0,0))
+    else:
+        compare("euler rotation",vec_names,obj.rotation_euler,(0,0,0))
+
+    return items
+
+@object_check("Empty Textures", [
+    'Issue: An M2 material has no texture set in any of its texture slots.',
+    'Effect: Will usually cause the model to become invisible ingame',
+    "Note: this is not *always* an error, not all materials have textures."
+])
+def empty_textures(obj):
     items = []
+    if not obj.wow_m2_geoset.collision_mesh:
+        for slot in obj.material_slots:
+            if slot.material is not None and slot.material.wow_m2_material.texture_1 is None:
+                items.append(f'Object {obj.name} has no m2 textures, this is usually an error and will cause the model to be invisible ingame')
+
+    return items
 
+def _combine_texture_maps(records):
     texture_maps = {}
-    for obj in bpy.data.objects:
-        if obj.type == 'MESH' and not obj.wow_m2_geoset.collision_mesh and len(obj.material_slots) != 0:
-            for slot in obj.material_slots:
-                
-                if slot.material is None:
-                    continue
-
-                if not hasattr(slot.material, 'wow_m2_material'):
-                    continue 
-
-                mat = slot.material.wow_m2_material
-
-                for texture in [mat.texture_1,mat.texture_2]:
-                    if hasattr(texture, 'wow_m2_texture'):
-                        if texture is not None and len(texture.wow_m2_texture.path) == 0:
-                            if texture.wow_m2_texture.texture_type == '0':
-                                if not texture.name in texture_maps:
-                                    texture_maps[texture.name] = []
-                                
-                                if not obj.name in texture_maps[texture.name]:
-                                    texture_maps[texture.name].append(obj.name)
-    
+    for texture, obj_name in records:
+        if not texture in texture_maps:
+            texture_maps[texture] = []
+
+        if not obj_name in texture_maps[texture]:
+            texture_maps[texture].append(obj_name)
+
+    items = []
     for texture,obj_names in texture_maps.items():
-        tex_str = f"Texture {texture} ("
-        obj_name_len = len(obj_names)
-        for i,obj_name in enumerate(obj_names):
-            tex_str+=obj_name
-            if i < obj_name_len -1:
-                tex_str+=","
-        tex_str += ") has no blp path set."
-        items.append(tex_str)
-
-    return (name,description,items)
-
-def no_materials():
-    name = "No Materials"
-    description = [
-        'Issue: A model has no materials set',
-        'Effect: Will usually cause the model to be invisible ingame',
-        'Fix: Add at least one material to your model',
-        'Note: This is not *always* an error, not all models have materials'
-    ]
+        items.append(f"Texture {texture} ({','.join(obj_names)}) has no blp path set.")
+
+    return items
+
+@object_check("Empty Texture Path", [
+    'Issue: A model has an M2 material with a texture set that has no blp path',
+    'Effect: Will usually cause the model to become invisible ingame',
+    'Fix: Find the material with the texture and fill the Texture Path',
+], combine=_combine_texture_maps)
+def empty_texture_paths(obj):
+    # (texture name, object name) pairs, grouped by texture when combined
+    records = []
+
+    if obj.type == 'MESH' and not obj.wow_m2_geoset.collision_mesh and len(obj.material_slots) != 0:
+        for slot in obj.material_slots:
+
+            if slot.material is None:
+                continue
+
+            if not hasattr(slot.material, 'wow_m2_material'):
+                continue
+
+            mat = slot.material.wow_m2_material
+
+            for texture in [mat.texture_1,mat.texture_2]:
+                if hasattr(texture, 'wow_m2_texture'):
+                    if texture is not None and len(texture.wow_m2_texture.path) == 0:
+                        if texture.wow_m2_texture.texture_type == '0':
+                            records.append((texture.name, obj.name))
+
+    return records
+
+@object_check("No Materials", [
+    'Issue: A model has no materials set',
+    'Effect: Will usually cause the model to be invisible ingame',
+    'Fix: Add at least one material to your model',
+    'Note: This is not *always* an error, not all models have materials'
+])
+def no_materials(obj):
     items = []
-    for obj in bpy.data.objects:
-        if obj.type == 'MESH' and not obj.wow_m2_geoset.collision_mesh and len(obj.material_slots) == 0:
-            items.append(f'Object {obj.name} has no m2 materials, this is usually an error and will cause the model to be invisible ingame')
-    return (name,description,items)
-        
-def bone_constraints():
-    name = "Bone Constraints"
-    description = [
-        "Issue: A bone has constraints applied",
-        "Effect: Will almost always mess up your animations, wow does not support bone constraints",
-        "Fix: Try removing bone constraints or bake your animations into keyframes"
-    ]
+    if obj.type == 'MESH' and not obj.wow_m2_geoset.collision_mesh and len(obj.material_slots) == 0:
+        items.append(f'Object {obj.name} has no m2 materials, this is usually an error and will cause the model to be invisible ingame')
+    return items
+
+@object_check("Bone Constraints", [
+    "Issue: A bone has constraints applied",
+    "Effect: Will almost always mess up your animations, wow does not support bone constraints",
+    "Fix: Try removing bone constraints or bake your animations into keyframes"
+])
+def bone_constraints(obj):
     items = []
 
-    for obj in bpy.data.objects:
-        if obj.type != 'ARMATURE':
-            continue
-        for bone in obj.pose.bones:
-            for constraint in bone.constraints:
-                items.append(f'Bone {obj.name}.{bone.name} has constraint {constraint.name}, this is usually a mistake and will mess up your animations.')
+    if obj.type != 'ARMATURE':
+        return items
 
-    return (name,description,items)
+    for bone in obj.pose.bones:
+        for constraint in bone.constraints:
+            items.append(f'Bone {obj.name}.{bone.name} has constraint {constraint.name}, this is usually a mistake and will mess up your animations.')
 
+    return items
+
+@scene_check("No Animation Pairs", [
+    "Issue: Animations in the Animation Editor don't have any object pairs added",
+    "Effect: No actual animation data is written for this sequence",
+    "Fix: add an object pair and select an object and action"
+])
 def no_animation_pairs():
-    name = "No Animation Pairs"
-    description = [
-        "Issue: Animations in the Animation Editor don't have any object pairs added",
-        "Effect: No actual animation data is written for this sequence",
-        "Fix: add an object pair and select an object and action"
-    ]
     items = []
     for i,sequence in enumerate(bpy.context.scene.wow_m2_animations):
         if len(sequence.anim_pairs) == 0 and not "64" in sequence.flags:
             items.append(f'Sequence {sequence.name} have no pairs')
-    return (name,description,items)
+    return items
 
+@scene_check("Missing Animation Items", [
+    "Issue: Animation object pairs lacks an object or action set",
+    "Effect: No actual animation data is written for this sequence",
+    "Fix: Select an action + object for pairs missing them"
+])
 def missing_animation_items():
-    name = "Missing Animation Items"
-    description = [
-        "Issue: Animation object pairs lacks an object or action set",
-        "Effect: No actual animation data is written for this sequence",
-        "Fix: Select an action + object for pairs missing them"
-    ]
     items = []
     for i,sequence in enumerate(bpy.context.scene.wow_m2_animations):
         for j, pair in enumerate(sequence.anim_pairs):
@@ -184,50 +204,46 @@ def missing_animation_items():
                     pass
                 else:
                     items.append(f'Sequence {sequence.name} pair {pair.object.name} has no action set')
-    return (name,description,items)
+    return items
 
+@scene_check("Non-primary sequence", [
+    "Issue: WBS currently does not support non-primary sequences",
+    "Effect: The animation will break completely if not crash the game",
+    "Fix: Add the 'primary sequence' flag"
+])
 def non_primary_sequences():
-    name = "Non-primary sequence"
-    description = [
-        "Issue: WBS currently does not support non-primary sequences",
-        "Effect: The animation will break completely if not crash the game",
-        "Fix: Add the 'primary sequence' flag"
-    ]
     items = []
     for sequence in bpy.context.scene.wow_m2_animations:
 
         if not "32" in sequence.flags and not sequence.is_global_sequence:
             items.append(f'Sequence {sequence.name} does not have the primary sequence flag')
 
-    return (name,description,items)
+    return items
 
-def too_many_bone_groups():
-    name = "Too many bone groups"
-    description = [
-        "Issue: You have vertices with too many bone groups",
-        "Effect: Bones will be dropped from vertices influence table on export, causing vertices to move differently in-game",
-        "Fix: Either run 'Limit Bone Groups' to see the ingame effect in blender, or ignore this error and see results ingame.",
-    ]
+@object_check("Too many bone groups", [
+    "Issue: You have vertices with too many bone groups",
+    "Effect: Bones will be dropped from vertices influence table on export, causing vertices to move differently in-game",
+    "Fix: Either run 'Limit Bone Groups' to see the ingame effect in blender, or ignore this error and see results ingame.",
+])
+def too_many_bone_groups(obj):
     items = []
-    for obj in bpy.data.objects:
-        if obj.type != 'MESH' or obj.parent == None or obj.parent.type != 'ARMATURE':
-            continue
-        bone_names = [bone.name for bone in obj.parent.data.bones]
-        broken_vertices = 0
-        for vertex in obj.data.vertices:
-            if len(get_bone_groups(obj,vertex,bone_names)) > 4:
-                broken_vertices += 1
-        if broken_vertices > 0:
-            items.append(f'Object {obj.name} has {broken_vertices} vertices with too many bone groups')
-    return (name,description,items)
-
+    if obj.type != 'MESH' or obj.parent == None or obj.parent.type != 'ARMATURE':
+        return items
+    bone_names = [bone.name for bone in obj.parent.data.bones]
+    broken_vertices = 0
+    for vertex in obj.data.vertices:
+        if len(get_bone_groups(obj,vertex,bone_names)) > 4:
+            broken_vertices += 1
+    if broken_vertices > 0:
+        items.append(f'Object {obj.name} has {broken_vertices} vertices with too many bone groups')
+    return items
+
+@scene_check("FCurves Transforming Objects", [
+    'Issue: You have FCurves that transform blender objects themselves, this is currently unsupported',
+    'Effect: Object has wrong scale/rotation/location ingame.',
+    'Fix: Run "Convert Bones To WoW" and check the result.'
+])
 def fcurves_transforming_objects():
-    name = "FCurves Transforming Objects"
-    description = [
-        'Issue: You have FCurves that transform blender objects themselves, this is currently unsupported',
-        'Effect: Object has wrong scale/rotation/location ingame.',
-        'Fix: Run "Convert Bones To WoW" and check the result.'
-    ]
     items = []
     for animation in bpy.context.scene.wow_m2_animations:
         for anim_pair in animation.anim_pairs:
@@ -238,13 +254,80 @@ def fcurves_transforming_objects():
                     if curve.data_path in ["location", "rotation_euler", "scale"]:
                         if obj is not None and not obj.wow_m2_uv_transform.enabled:
                             items.append(f'FCurve "{curve.data_path}[{curve.array_index}]" in {action.name} transforms an object')
-    return (name,description,items)
+    return items
+
+def scan_warnings():
+    """ Run all checks, objects unchanged since the last scan are served from cache.
+        Returns a (name, description, items) tuple per check, in order of registration.
+    """
+    global _scene_items
+
+    object_checks = [check for check in _checks if check.is_object_check]
+    records = {check.name: [] for check in object_checks}
+
+    # single traversal feeding all object checks
+    for obj in bpy.data.objects:
+        obj_records = _object_records.get(obj.name)
+
+        if obj_records is None:
+            obj_records = _object_records[obj.name] = {check.name: check.scan(obj) for check in object_checks}
+
+        for check in object_checks:
+            records[check.name].extend(obj_records[check.name])
+
+    # forget removed and renamed objects
+    for obj_name in _object_records.keys() - bpy.data.objects.keys():
+        del _object_records[obj_name]
+
+    scene_name = bpy.context.scene.name if bpy.context.scene else None
+
+    if _scene_items is None or _scene_items[0] != scene_name:
+        _scene_items = (scene_name, {check.name: check.scan() for check in _checks if not check.is_object_check})
+
+    return [(check.name, check.description,
+             check.combine(records[check.name]) if check.is_object_check else _scene_items[1][check.name])
+            for check in _checks]
+
+def invalidate_warnings():
+    global _scene_items
+    _object_records.clear()
+    _scene_items = None
+
+def _invalidate_object(obj):
+    _object_records.pop(obj.name, None)
+
+    # bone group checks of children depend on the parent armature
+    for child in obj.children:
+        _object_records.pop(child.name, None)
+
+@persistent
+def _invalidate_on_depsgraph_update(scene, depsgraph):
+    global _scene_items
+
+    # scene checks are cheap and refer to objects and actions, any change reruns them
+    if depsgraph.updates:
+        _scene_items = None
+
+    for update in depsgraph.updates:
+        id_data = update.id.original
+
+        if isinstance(id_data, bpy.types.Object):
+            _invalidate_object(id_data)
+        elif isinstance(id_data, (bpy.types.Mesh, bpy.types.Armature)):
+            for obj in bpy.data.objects:
+                if obj.data == id_data:
+                    _invalidate_object(obj)
+        elif isinstance(id_data, (bpy.types.Material, bpy.types.Image, bpy.types.Texture)):
+            # materials and images can be shared by any number of objects
+            _object_records.clear()
+
+@persistent
+def _invalidate_on_load(_):
+    invalidate_warnings()
 
 def print_warnings():
     printed_warnings = False
-    def warning_section(callback):
-        nonlocal printed_warnings
-        (name,descriptions,items) = callback()
+    for (name,descriptions,items) in scan_warnings():
         if len(items) > 0:
             if not printed_warnings:
                 print("\n")
@@ -258,21 +341,17 @@ def print_warnings():
                 print(f'\n{description}')
             for item in items:
                 print(f'\n- {item}')
-    
-    warning_section(wrong_scene_type)
-    warning_section(transformed_objects)
-    warning_section(empty_textures)
-    warning_section(empty_texture_paths)
-    warning_section(no_materials)
-    warning_section(bone_constraints)
-    warning_section(no_animation_pairs)
-    warning_section(missing_animation_items)
-    warning_section(non_primary_sequences)
-    warning_section(too_many_bone_groups)
-    warning_section(fcurves_transforming_objects)
 
     if not printed_warnings:
         print("\nNo warnings found!")
         return False
     else:
-        return True
\ No newline at end of file
+        return True
+
+def register():
+    bpy.app.handlers.depsgraph_update_post.append(_invalidate_on_depsgraph_update)
+    bpy.app.handlers.load_post.append(_invalidate_on_load)
+
+def unregister():
+    bpy.app.handlers.depsgraph_update_post.remove(_invalidate_on_depsgraph_update)
+    bpy.app.handlers.load_post.remove(_invalidate_on_load)
@@ -4,7 +4,7 @@ import traceback
 import struct
 
 from ...import_m2 import import_m2_gamedata
-from ....wmo.utils.wmv import wmv_get_last_m2, wow_export_get_last_m2, noggit_red_get_last_m2
+from ....wmo.utils.wmv import wmv_get_last_m2, wow_export_get_last_m2, noggit_red_get_last_m2, get_recent_log_items
 from ....ui.preferences import get_project_preferences
 from ....utils.misc import load_game_data
 
@@ -55,3 +55,54 @@ class M2_OT_import_last_m2_from_wmv(bpy.types.Operator):
 
     def invoke(self, context, event):
         return context.window_manager.invoke_confirm(self, event)
+
+
+# enum items are kept referenced, Blender does not own strings returned by dynamic item callbacks
+_recent_m2_items = []
+
+
+def _get_recent_m2_items(self, context):
+    try:
+        paths = get_recent_log_items(get_project_preferences().import_method, 'M2')
+    except OSError:
+        paths = []
+
+    _recent_m2_items[:] = [(path, path, "") for path in paths]
+    return _recent_m2_items
+
+
+class M2_OT_import_recent_m2_from_wmv(bpy.types.Operator):
+    bl_idname = "scene.wow_import_recent_m2_from_wmv"
+    bl_label = "Load recent M2 from preferred import method"
+    bl_description = "Search M2s recently opened in the preferred import method and load one"
+    bl_options = {'UNDO', 'REGISTER'}
+    bl_property = "m2_path"
+
+    m2_path: bpy.props.EnumProperty(name="M2", items=_get_recent_m2_items)
+
+    def execute(self, context):
+
+        game_data = load_game_data()
+
+        if not game_data or not game_data.files:
+            self.report({'ERROR'}, "Failed to import model. Connect to game client first.")
+            return {'CANCELLED'}
+
+        try:
+            import_m2_gamedata(2, self.m2_path, False)
+        except:
+            traceback.print_exc()
+            self.report({'ERROR'}, "Failed to import model.")
+            return {'CANCELLED'}
+
+        self.report({'INFO'}, "Done importing M2 object to scene.")
+        return {'FINISHED'}
+
+    def invoke(self, context, event):
+
+        if not _get_recent_m2_items(self, context):
+            self.report({'ERROR'}, "Log contains no M2 entries.")
+            return {'CANCELLED'}
+
+        context.window_manager.invoke_search_popup(self)
+        return {'RUNNING_MODAL'}
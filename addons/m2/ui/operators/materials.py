@@ -2,7 +2,7 @@ import bpy
 from ....wmo.utils.materials import load_texture
 from ....wmo.utils.wmv import wmv_get_last_texture, wow_export_get_last_texture
 from ....ui.preferences import get_project_preferences
-from ....utils.misc import load_game_data, resolve_outside_texture_path, resolve_texture_path
+from ....utils.misc import load_game_data, resolve_outside_texture_path, resolve_texture_path, texture_path_session
 
 class M2_fill_textures(bpy.types.Operator):
     bl_idname = 'scene.m2_fill_textures'
@@ -12,36 +12,37 @@ class M2_fill_textures(bpy.types.Operator):
 
     def execute(self, context):
 
-        for ob in bpy.context.selected_objects:
+        with texture_path_session():
+            for ob in bpy.context.selected_objects:
             
-            mesh = ob.data
-
-            if mesh is None and ob.wow_m2_particle.enabled:
-                texture = ob.wow_m2_particle.texture
-                resolved_path = resolve_texture_path(texture.filepath)
-                if resolved_path is None:
-                    resolved_path = resolve_outside_texture_path(texture.filepath)
-
-                texture.wow_m2_texture.path = resolved_path                
-            else:
-                for material in mesh.materials:
-                    if material.wow_m2_material.texture_1:
-                        texture = material.wow_m2_material.texture_1
+                mesh = ob.data
+
+                if mesh is None and ob.wow_m2_particle.enabled:
+                    texture = ob.wow_m2_particle.texture
+                    resolved_path = resolve_texture_path(texture.filepath)
+                    if resolved_path is None:
+                        resolved_path = resolve_outside_texture_path(texture.filepath)
+
+                    texture.wow_m2_texture.path = resolved_path                
+                else:
+                    for material in mesh.materials:
+                        if material.wow_m2_material.texture_1:
+                            texture = material.wow_m2_material.texture_1
                     
-                        resolved_path = resolve_texture_path(texture.filepath)
-                        if resolved_path is None:
-                            resolved_path = resolve_outside_texture_path(texture.filepath)
+                            resolved_path = resolve_texture_path(texture.filepath)
+                            if resolved_path is None:
+                                resolved_path = resolve_outside_texture_path(texture.filepath)
 
-                        texture.wow_m2_texture.path = resolved_path
+                            texture.wow_m2_texture.path = resolved_path
 
-                    if material.wow_m2_material.texture_2:
-                        texture2 = material.wow_m2_material.texture_2
+                        if material.wow_m2_material.texture_2:
+                            texture2 = material.wow_m2_material.texture_2
 
-                        resolved_path = resolve_texture_path(texture2.filepath)
-                        if resolved_path is None:
-                            resolved_path = resolve_outside_texture_path(texture2.filepath)
+                            resolved_path = resolve_texture_path(texture2.filepath)
+                            if resolved_path is None:
+                                resolved_path = resolve_outside_texture_path(texture2.filepath)
 
-                        texture2.wow_m2_texture.path = resolved_path    
+                            texture2.wow_m2_texture.path = resolved_path    
 
         
         self.report({'INFO'}, "Done filling texture paths")
@@ -3,6 +3,7 @@ import bpy
 from ..enums import ANIMATION_FLAGS
 from ....pywowlib.enums.m2_enums import M2SequenceNames
 from ....pywowlib import WoWVersions
+from ...lazy_animations import has_pending_keyframes, materialize_sequence, materialize_all
 
 
 ###############################
@@ -78,6 +79,10 @@ class M2_OT_animation_editor_dialog(bpy.types.Operator):
         sub_col4 = sub_col_parent.column(align=True)
         sub_col4.operator("scene.wow_m2_animation_editor_seq_cleanup", text='', icon='GHOST_DISABLED')
 
+        if has_pending_keyframes():
+            col.operator("scene.wow_m2_animation_editor_load_keyframes", text='Load All Keyframes',
+                         icon='IMPORT').all_sequences = True
+
         # Objects column
 
         col = split.column()
@@ -572,6 +577,33 @@ class M2_OT_animation_editor_sequence_deselect(bpy.types.Operator):
 
         return {'FINISHED'}
     
+class M2_OT_animation_editor_load_keyframes(bpy.types.Operator):
+    bl_idname = 'scene.wow_m2_animation_editor_load_keyframes'
+    bl_label = 'Load keyframes'
+    bl_description = 'Create keyframes of sequences imported without them'
+    bl_options = {'REGISTER', 'INTERNAL'}
+
+    all_sequences:  bpy.props.BoolProperty(
+        name='All Sequences',
+        description='Load keyframes of all sequences instead of the current one',
+        default=False
+    )
+
+    def execute(self, context):
+
+        if self.all_sequences:
+            materialize_all()
+        else:
+            try:
+                materialize_sequence(context.scene.wow_m2_animations[context.scene.wow_m2_cur_anim_index])
+            except IndexError:
+                self.report({'ERROR'}, "No sequence selected")
+                return {'CANCELLED'}
+
+        update_scene_frame_range()
+
+        return {'FINISHED'}
+
 class M2_OT_animation_editor_play_global_sequence(bpy.types.Operator):
     bl_idname = 'scene.wow_m2_animation_editor_play_global_sequence'
     bl_label = 'Play all global sequences along animation'
@@ -1229,6 +1261,10 @@ def update_animation(self, context):
 
     context.scene.render.fps_base = sequence.playback_speed
 
+    # sequences imported on demand get their keyframes on first selection
+    if context.scene.wow_m2_cur_anim_index >= 0:
+        materialize_sequence(sequence)
+
     for obj in context.scene.objects:
         if obj.animation_data:
             obj.animation_data.action = None
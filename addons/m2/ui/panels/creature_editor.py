@@ -6,42 +6,100 @@ from ....utils.misc import load_game_data
 
 
 ###############################
-## Items callbacks
+## DBC lookups
 ###############################
 
-def get_creature_model_data(self, context):
-    game_data = load_game_data()
-    
-    creature_model_data_db = game_data.db_files_client.CreatureModelData
+def _normalize_model_path(path: str) -> str:
+    return os.path.splitext(path.lower())[0].replace('/', '\\')
 
-    cr_model_data_entries = [('None', 'None', '')]
-    model_path = os.path.splitext(context.scene.wow_scene.game_path.lower())[0]
-    model_path = model_path.replace('/', '\\')
 
-    for record in creature_model_data_db.records:
-        if os.path.splitext(record.ModelName.lower())[0] == model_path:
-            cr_model_data_entries.append((str(record.ID), 'ModelDataEntry_{}'.format(record.ID), ""))
-    return cr_model_data_entries
+class CreatureDBCIndex:
+    """ Lookup tables over client DBCs used by the creature editor, built lazily for one game data instance.
+        Enum items are kept here as well, Blender requires strings returned by items callbacks to stay referenced.
+    """
 
+    _instance = None
 
-def get_creature_display_infos(self, context):
-    game_data = load_game_data()
-    creature_display_info_db = game_data.db_files_client.CreatureDisplayInfo
+    def __init__(self, game_data):
+        self.game_data = game_data
+        self._model_data_ids = None
+        self._display_info_ids = None
+        self._model_data_items = {}
+        self._display_info_items = {}
+        self._race_items = None
 
-    cr_display_infos = [('None', 'None', '')]
-    cr_model_data = int(context.scene.wow_m2_creature.CreatureModelData)
-    for record in creature_display_info_db.records:
-        if record.ModelID == cr_model_data:
-            cr_display_infos.append((str(record.ID), 'CreatureDisplayInfoEntry_{}'.format(record.ID), ""))
+    @classmethod
+    def get(cls) -> 'CreatureDBCIndex':
+        game_data = load_game_data()
 
-    return cr_display_infos
+        if cls._instance is None or cls._instance.game_data is not game_data:
+            cls._instance = cls(game_data)
 
+        return cls._instance
 
-def get_char_races(self, context):
-    game_data = load_game_data()
-    chr_races_db = game_data.db_files_client.ChrRaces
+    @classmethod
+    def invalidate(cls):
+        cls._instance = None
+
+    def model_data_items(self, model_path: str):
+        model_path = _normalize_model_path(model_path)
+        items = self._model_data_items.get(model_path)
+
+        if items is None:
+
+            # normalized ModelName -> CreatureModelData IDs
+            if self._model_data_ids is None:
+                self._model_data_ids = {}
+                for record in self.game_data.db_files_client.CreatureModelData.records:
+                    self._model_data_ids.setdefault(_normalize_model_path(record.ModelName), []).append(record.ID)
+
+            items = [('None', 'None', '')]
+            items.extend((str(record_id), 'ModelDataEntry_{}'.format(record_id), "")
+                         for record_id in self._model_data_ids.get(model_path, ()))
+            self._model_data_items[model_path] = items
+
+        return items
+
+    def display_info_items(self, model_id: int):
+        items = self._display_info_items.get(model_id)
+
+        if items is None:
 
-    return [(str(record.ID), record.ClientFileString, '') for record in chr_races_db.records]
+            # ModelID -> CreatureDisplayInfo IDs
+            if self._display_info_ids is None:
+                self._display_info_ids = {}
+                for record in self.game_data.db_files_client.CreatureDisplayInfo.records:
+                    self._display_info_ids.setdefault(record.ModelID, []).append(record.ID)
+
+            items = [('None', 'None', '')]
+            items.extend((str(record_id), 'CreatureDisplayInfoEntry_{}'.format(record_id), "")
+                         for record_id in self._display_info_ids.get(model_id, ()))
+            self._display_info_items[model_id] = items
+
+        return items
+
+    def race_items(self):
+        if self._race_items is None:
+            self._race_items = [(str(record.ID), record.ClientFileString, '')
+                                for record in self.game_data.db_files_client.ChrRaces.records]
+
+        return self._race_items
+
+
+###############################
+## Items callbacks
+###############################
+
+def get_creature_model_data(self, context):
+    return CreatureDBCIndex.get().model_data_items(context.scene.wow_scene.game_path)
+
+
+def get_creature_display_infos(self, context):
+    return CreatureDBCIndex.get().display_info_items(int(context.scene.wow_m2_creature.CreatureModelData))
+
+
+def get_char_races(self, context):
+    return CreatureDBCIndex.get().race_items()
 
 
 ###############################
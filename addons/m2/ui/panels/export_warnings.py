@@ -0,0 +1,34 @@
+import bpy
+
+from ...operations.m2_export_warnings import scan_warnings
+
+
+class M2_PT_export_warnings_panel(bpy.types.Panel):
+    bl_space_type = "PROPERTIES"
+    bl_region_type = "WINDOW"
+    bl_context = "scene"
+    bl_label = "M2 Export Warnings"
+    bl_options = {'DEFAULT_CLOSED'}
+
+    def draw(self, context):
+        layout = self.layout
+        col = layout.column()
+
+        # results are cached, only objects changed since the last redraw are scanned again
+        warnings = [(name, items) for name, _, items in scan_warnings() if items]
+
+        if not warnings:
+            col.label(text='No warnings found', icon='CHECKMARK')
+            return
+
+        for name, items in warnings:
+            box = col.box()
+            box.label(text=f'{name} ({len(items)})', icon='ERROR')
+            for item in items:
+                box.label(text=item.strip())
+
+        col.operator("print_warnings.m2", text="Print M2 Warnings", icon='CONSOLE')
+
+    @classmethod
+    def poll(cls, context):
+        return context.scene is not None and context.scene.wow_scene.type == 'M2'
@@ -91,7 +91,8 @@ class M2_PT_tools_panel_object_mode_add_to_scene(bpy.types.Panel):
 
         
         col1_row1.operator("scene.wow_import_last_m2_from_wmv", text='M2',
-            icon_value=ui_icons['WOW_STUDIO_DOODADS_ADD']) 
+            icon_value=ui_icons['WOW_STUDIO_DOODADS_ADD'])
+        col1_row1.operator("scene.wow_import_recent_m2_from_wmv", text='', icon='RECOVER_LAST')
         
         
         if proj_prefs := get_project_preferences():
@@ -153,7 +154,8 @@ class M2_MT_mesh_wow_components_add(bpy.types.Menu):
 
         if hasattr(bpy, "wow_game_data") and bpy.wow_game_data.files:
             col.operator("scene.wow_import_last_m2_from_wmv", text='M2',
-                icon_value=ui_icons['WOW_STUDIO_DOODADS_ADD'])          
+                icon_value=ui_icons['WOW_STUDIO_DOODADS_ADD'])
+            col.operator("scene.wow_import_recent_m2_from_wmv", text='Recent M2', icon='RECOVER_LAST')
 
         col.operator("scene.m2_add_attachment", text='Attachment', icon='POSE_HLT')
         col.operator("scene.m2_add_event", text='Event', icon='POSE_HLT')
@@ -1,4 +1,8 @@
 import bpy
+import numpy as np
+
+# Blender enum values of keyframe interpolation, as used by foreach_set()
+KEYFRAME_INTERPOLATION_VALUES = {'CONSTANT': 0, 'LINEAR': 1, 'BEZIER': 2}
 
 def can_apply_scale(fcurves,keyframe_count):
     for i in range(keyframe_count):
@@ -9,6 +13,100 @@ def can_apply_scale(fcurves,keyframe_count):
             return False
     return True
 
+def write_fcurve_keyframes(f_curves, timestamps, values, interp_type):
+    """ Add keyframes to empty fcurves in bulk. values is an array of shape (n_keyframes, n_channels),
+        fcurves beyond n_channels only get keyframe points added.
+    """
+    n_keyframes = len(timestamps)
+
+    co = np.empty((n_keyframes, 2), dtype=np.float32)
+    co[:, 0] = timestamps
+    interpolation = np.full(n_keyframes, KEYFRAME_INTERPOLATION_VALUES[interp_type], dtype=np.int32)
+
+    for k, f_curve in enumerate(f_curves):
+        f_curve.keyframe_points.add(n_keyframes)
+
+        if k >= values.shape[1]:
+            continue
+
+        co[:, 1] = values[:, k]
+        f_curve.keyframe_points.foreach_set('co', co.ravel())
+        f_curve.keyframe_points.foreach_set('interpolation', interpolation)
+        f_curve.update()
+
+def read_fcurve_keyframes(f_curve):
+    """ Read keyframe times, values and interpolation enum values of an fcurve into arrays. """
+    n_keyframes = len(f_curve.keyframe_points)
+
+    co = np.empty(n_keyframes * 2, dtype=np.float32)
+    f_curve.keyframe_points.foreach_get('co', co)
+
+    interpolation = np.empty(n_keyframes, dtype=np.int32)
+    f_curve.keyframe_points.foreach_get('interpolation', interpolation)
+
+    return co[0::2], co[1::2], interpolation
+
+def _quaternion_angles(a, b):
+    """ Angles between rows of two (n, 4) quaternion arrays, regardless of their sign. """
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    return 2 * np.arccos(np.clip(np.abs((a * b).sum(axis=1)), 0.0, 1.0))
+
+def reduce_keyframes(times, values, interp_type, tolerance, is_rotation=False):
+    """ Indices of keyframes to keep, first and last keyframes are always kept. values is an array of shape
+        (n_keyframes, n_channels), quaternions (w, x, y, z) when is_rotation is set, tolerance is then an angle.
+        LINEAR tracks keep the keyframes needed for interpolation to stay within tolerance of all the original ones,
+        CONSTANT tracks drop keyframes repeating the previous value. Other interpolation types are left untouched.
+    """
+    n_keyframes = len(times)
+
+    if n_keyframes <= 2:
+        return np.arange(n_keyframes)
+
+    if interp_type == 'CONSTANT':
+        keep = np.ones(n_keyframes, dtype=bool)
+        keep[1:-1] = np.any(values[1:-1] != values[:-2], axis=1)
+        return np.flatnonzero(keep)
+
+    if interp_type != 'LINEAR':
+        return np.arange(n_keyframes)
+
+    keep = np.zeros(n_keyframes, dtype=bool)
+    keep[[0, -1]] = True
+
+    # split segments at their worst keyframe until every segment is within tolerance
+    segments = [(0, n_keyframes - 1)]
+
+    while segments:
+        first, last = segments.pop()
+
+        if last - first < 2:
+            continue
+
+        duration = times[last] - times[first]
+        factors = (times[first + 1:last] - times[first]) / duration if duration > 0 else np.zeros(last - first - 1)
+
+        start = values[first]
+        end = values[last]
+
+        if is_rotation:
+            # interpolate through the shorter arc, same as the client does
+            if np.dot(start, end) < 0:
+                end = -end
+            error = _quaternion_angles(start + (end - start) * factors[:, None], values[first + 1:last])
+        else:
+            error = np.abs(start + (end - start) * factors[:, None] - values[first + 1:last]).max(axis=1)
+
+        worst = int(np.argmax(error))
+
+        if error[worst] > tolerance:
+            split = first + 1 + worst
+            keep[split] = True
+            segments.append((first, split))
+            segments.append((split, last))
+
+    return np.flatnonzero(keep)
+
 def make_fcurve_compound(fcurves, accept = lambda path: True):
     compound = {}
     for fcurve in fcurves:
@@ -28,6 +126,89 @@ def get_bone_groups(obj, vertex, bone_names):
     groups.sort(key=lambda x: -x.weight)
     return groups
 
+def get_vertex_group_weights(mesh, n_groups):
+    """ Read deform weights of all vertices into a dense (vertex, group) array, NaN where vertex is not in group. """
+    weights = np.full((len(mesh.vertices), n_groups), np.nan, dtype=np.float32)
+
+    influences = [(vertex.index, group.group, group.weight) for vertex in mesh.vertices for group in vertex.groups]
+
+    if influences:
+        vertex_indices, group_indices, group_weights = zip(*influences)
+        weights[vertex_indices, group_indices] = group_weights
+
+    return weights
+
+def select_bone_influences(weights, bone_groups, group_bone_ids):
+    """ Pick the four strongest bone influences per vertex, quantized to weights summing up to 255.
+        weights comes from get_vertex_group_weights(), bone_groups marks groups named after armature bones,
+        group_bone_ids holds the exported bone index of each group or -1, such bones are exported with weight 0.
+        Returns bone indices, bone weights and the bone indices in use.
+    """
+    columns = np.flatnonzero(bone_groups)
+    group_weights = weights[:, columns] + 0.0
+    bone_ids = group_bone_ids[columns]
+
+    # non-negative float bits sort as integers, lower group index wins a tie
+    keys = (group_weights.view(np.int32).astype(np.int64) << 16) | (0xFFFF - np.arange(columns.size))
+    keys[np.isnan(group_weights)] = -1
+
+    if columns.size < 4:
+        padding = 4 - columns.size
+        keys = np.pad(keys, ((0, 0), (0, padding)), constant_values=-1)
+        group_weights = np.pad(group_weights, ((0, 0), (0, padding)), constant_values=np.nan)
+        bone_ids = np.pad(bone_ids, (0, padding), constant_values=-1)
+
+    top = np.argpartition(-keys, 3, axis=1)[:, :4]
+    top = np.take_along_axis(top, np.argsort(-np.take_along_axis(keys, top, axis=1), axis=1), axis=1)
+
+    is_influence = np.take_along_axis(keys, top, axis=1) >= 0
+    is_exported = is_influence & (bone_ids[top] >= 0)
+
+    bone_indices = np.where(is_exported, bone_ids[top], 0)
+    top_weights = np.where(is_exported, np.take_along_axis(group_weights, top, axis=1), 0.0).astype(np.float64)
+
+    # same truncation and re-normalization as per vertex int(weight * 255)
+    bone_weights = (top_weights * 255).astype(np.int64)
+    weight_sum = bone_weights.sum(axis=1)
+
+    rescale = (weight_sum != 255) & (weight_sum > 0)
+    bone_weights[rescale] = (bone_weights[rescale] * (255 / weight_sum[rescale])[:, None]).astype(np.int64)
+
+    # put the remainder on the strongest influence for an exact sum
+    weight_sum = bone_weights.sum(axis=1)
+    bone_weights[np.arange(len(bone_weights)), bone_weights.argmax(axis=1)] += 255 - weight_sum
+
+    return bone_indices.astype(np.int32), bone_weights.astype(np.int32), np.unique(bone_indices[is_influence])
+
+# Quantization steps of vertex attributes compared by weld_loops(), position step is the former remove_doubles threshold
+WELD_POSITION_STEP = 0.0001
+WELD_NORMAL_STEP = 0.001
+WELD_TEX_COORD_STEP = 0.00001
+
+def weld_loops(loops, positions, normals, tex_coords, tex_coords2, bone_indices, bone_weights):
+    """ Merge loops with equal quantized attributes into shared vertices. Attribute arrays are indexed by loop.
+        Returns the loop each vertex takes its attributes from, in order of first use,
+        and the vertex index of each loop (0 for loops not in loops).
+    """
+    keys = np.concatenate((np.round(positions[loops].astype(np.float64) / WELD_POSITION_STEP),
+                           np.round(normals[loops].astype(np.float64) / WELD_NORMAL_STEP),
+                           np.round(tex_coords[loops].astype(np.float64) / WELD_TEX_COORD_STEP),
+                           np.round(tex_coords2[loops].astype(np.float64) / WELD_TEX_COORD_STEP),
+                           bone_indices[loops],
+                           bone_weights[loops]), axis=1).astype(np.int64)
+
+    _, first_index, inverse = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+
+    # np.unique orders by key, renumber vertices by first use to keep the output stable
+    order = np.argsort(first_index)
+    rank = np.empty_like(order)
+    rank[order] = np.arange(order.size)
+
+    loop_to_vertex = np.zeros(len(positions), dtype=np.int64)
+    loop_to_vertex[loops] = rank[inverse.reshape(-1)]
+
+    return loops[first_index[order]], loop_to_vertex
+
 def _find_final_alias(self, n_global_sequences, alias_next):
     for i, anim_index in enumerate(self.animations):
         anim = bpy.context.scene.wow_m2_animations[alias_next + n_global_sequences]
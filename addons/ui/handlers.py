@@ -1,13 +1,12 @@
 import bpy
 from bpy.app.handlers import persistent
 
-from ..utils.misc import load_game_data
+from ..utils.misc import GameDataWarmUp
 
 
 @persistent
 def _load_game_data(scene):
-    pass
-    #load_game_data()
+    GameDataWarmUp.start()
 
 
 def register():
@@ -9,6 +9,7 @@ from ..wmo.import_wmo import import_wmo_to_blender_scene
 from ..wmo.export_wmo import export_wmo_from_blender_scene
 from ..m2.import_m2 import import_m2
 from ..m2.export_m2 import export_m2, create_m2
+from ..m2.ui.panels.creature_editor import CreatureDBCIndex
 from ..utils.misc import load_game_data
 from ..utils.collections import get_current_wow_model_collection, SpecialCollection                                                                                   
 from ..ui.preferences import get_project_preferences
@@ -56,6 +57,7 @@ class WBS_OT_reload_game_data(bpy.types.Operator):
 
             delattr(bpy, "wow_game_data")
 
+        CreatureDBCIndex.invalidate()
         load_game_data()
 
         if not bpy.wow_game_data.files:
@@ -227,6 +229,12 @@ class WBS_OT_wmo_export(bpy.types.Operator, ExportHelper):
         default=False,
         )
 
+    optimize_vertex_cache: BoolProperty(
+        name="Optimize vertex cache",
+        description="Reorder triangles and vertices of each batch for faster rendering in game. Slows down export",
+        default=False,
+        )
+
     def draw(self, context):
         layout = self.layout
         layout.prop(self, 'export_method', expand=True)
@@ -234,6 +242,8 @@ class WBS_OT_wmo_export(bpy.types.Operator, ExportHelper):
         if self.export_method == 'FULL':
             layout.prop(self, 'export_selected')
 
+        layout.prop(self, 'optimize_vertex_cache')
+
     def execute(self, context):
         if context.scene and context.scene.wow_scene.type == 'WMO':
 
@@ -243,7 +253,8 @@ class WBS_OT_wmo_export(bpy.types.Operator, ExportHelper):
 
             version = int(context.scene.wow_scene.version)
 
-            export_wmo_from_blender_scene(self.filepath, version, self.export_selected, self.export_method)
+            export_wmo_from_blender_scene(self.filepath, version, self.export_selected, self.export_method,
+                                          self.optimize_vertex_cache)
             return {'FINISHED'}
 
         self.report({'ERROR'}, 'Invalid scene type.')
@@ -514,9 +525,7 @@ class WBS_OT_M2_Print_Warnings(bpy.types.Operator):
     bl_options = {'REGISTER'}
 
     def execute(self, context):
-        import importlib
         from ..m2.operations import m2_export_warnings
-        importlib.reload(m2_export_warnings)
         m2_export_warnings.print_warnings()
         return {'FINISHED'}
 
@@ -2,6 +2,7 @@ import bpy
 from ..ui.preferences import get_project_preferences
 from .. import ui_icons
 from ..utils.callbacks import on_release
+from ..utils.misc import GameDataWarmUp
 from ..utils.custom_object import CustomObject
 from .enums import WoWSceneTypes
 
@@ -263,6 +264,13 @@ def render_top_bar(self, context):
     row.label(text='WoW Scene:')
     row.prop(context.scene.wow_scene, 'version', text='')
     row.prop(context.scene.wow_scene, 'type', text='')
+
+    game_data_state = GameDataWarmUp.get_state()
+    if game_data_state == 'LOADING':
+        row.label(text='Loading game data...', icon='TIME')
+    elif game_data_state == 'FAILED':
+        row.label(text='Game data not loaded', icon='ERROR')
+
     row.operator("scene.reload_wow_filesystem", text="", icon='FILE_REFRESH')
 
 
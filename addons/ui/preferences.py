@@ -83,6 +83,14 @@ class WBS_PG_ProjectPreferences(bpy.types.PropertyGroup):
         description="Choose the preferred method for timestamp import."
     )
 
+    lazy_animation_import: bpy.props.BoolProperty(
+        name="Load Animation Keyframes On Demand",
+        description="Import M2 animation sequences without keyframes, bone keyframes of a sequence are created "
+                    "when it is selected in the animation editor or exported. Keys not created yet are kept "
+                    "in saved files",
+        default=False
+    )
+
     import_method: bpy.props.EnumProperty(
         name="Import Method",
         items=[
@@ -141,6 +149,30 @@ class WBS_PG_ProjectPreferences(bpy.types.PropertyGroup):
         default=True
     )
 
+    reduce_animation_keyframes: bpy.props.BoolProperty(
+        name="Reduce Animation Keyframes",
+        description="On M2 export, skip keyframes of linear tracks that interpolation of the remaining keyframes "
+                    "reproduces within tolerance, and repeated keyframes of constant tracks",
+        default=False
+    )
+
+    keyframe_reduction_tolerance: bpy.props.FloatProperty(
+        name="Value Tolerance",
+        description="Maximum deviation of reduced location, scale and other animated values",
+        default=0.0001,
+        min=0.0,
+        precision=5
+    )
+
+    keyframe_reduction_angle: bpy.props.FloatProperty(
+        name="Rotation Tolerance",
+        description="Maximum deviation of reduced bone and texture rotations",
+        subtype='ANGLE',
+        default=0.001,
+        min=0.0,
+        precision=3
+    )
+
 class WBS_OT_ProjectListActions(bpy.types.Operator):
     """
     Moves items up and down the list of projects, adds or removes.
@@ -182,11 +214,15 @@ class WBS_OT_ProjectListActions(bpy.types.Operator):
         target.wow_export_path = source.wow_export_path
         target.noggit_red_path = source.noggit_red_path
         target.time_import_method = source.time_import_method
+        target.lazy_animation_import = source.lazy_animation_import
         target.import_method = source.import_method
         target.cache_dir_path = source.cache_dir_path
         target.project_dir_path = source.project_dir_path
         target.export_dir_path = source.export_dir_path
         target.merge_vertices = source.merge_vertices
+        target.reduce_animation_keyframes = source.reduce_animation_keyframes
+        target.keyframe_reduction_tolerance = source.keyframe_reduction_tolerance
+        target.keyframe_reduction_angle = source.keyframe_reduction_angle
 
         for setting in source.export_method_settings:
             new_setting = target.export_method_settings.add()
@@ -327,6 +363,7 @@ class WBS_AP_Preferences(bpy.types.AddonPreferences):
             box = col.box()
             box.prop(proj_prefs, 'wow_path')
             box.prop(proj_prefs, 'time_import_method')
+            box.prop(proj_prefs, 'lazy_animation_import')
             box.prop(proj_prefs, 'import_method')
             if proj_prefs.import_method == 'WMV':
                 box.prop(proj_prefs, 'wmv_path')
@@ -359,4 +396,13 @@ class WBS_AP_Preferences(bpy.types.AddonPreferences):
             col = layout.column(align=True)
             col.label(text='M2 Quick Save Settings:', icon='SETTINGS')
             box = col.box()
-            box.prop(proj_prefs, 'merge_vertices', text='Merge Vertices')                
\ No newline at end of file
+            box.prop(proj_prefs, 'merge_vertices', text='Merge Vertices')
+
+            col.separator()
+            col = layout.column(align=True)
+            col.label(text='M2 Animation Export Settings:', icon='ANIM')
+            box = col.box()
+            box.prop(proj_prefs, 'reduce_animation_keyframes')
+            if proj_prefs.reduce_animation_keyframes:
+                box.prop(proj_prefs, 'keyframe_reduction_tolerance')
+                box.prop(proj_prefs, 'keyframe_reduction_angle')
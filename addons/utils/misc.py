@@ -1,9 +1,14 @@
 import bpy
 import os
+import re
 import sys
+import threading
+
+import numpy as np
 
 from mathutils import Vector
 from collections import namedtuple
+from contextlib import contextmanager
 
 from ..pywowlib import WoWVersionManager
 from ..pywowlib.archives.wow_filesystem import WoWFileData
@@ -102,10 +107,105 @@ def get_material_viewport_image(material):
     return None
 
 
+class GameDataWarmUp:
+    """ Opens game data on a worker thread, so that the first import does not block on opening archives.
+        Completion is polled by a timer on the main thread, load_game_data() waits for a running warm-up
+        instead of opening the archives a second time.
+    """
+
+    POLL_INTERVAL = 0.5
+
+    _thread = None
+    _result = None
+    _error = None
+
+    @classmethod
+    def start(cls):
+        if cls._thread is not None or hasattr(bpy, 'wow_game_data'):
+            return
+
+        try:
+            project_preferences = get_project_preferences()
+        except UserWarning:
+            return
+
+        if not project_preferences.wow_path:
+            return
+
+        # version manager is not thread-safe, it is set before archives are opened
+        WoWVersionManager().set_client_version(int(bpy.context.scene.wow_scene.version))
+
+        cls._result = None
+        cls._error = None
+        cls._thread = threading.Thread(target=cls._load,
+                                       args=(project_preferences.wow_path, project_preferences.project_dir_path),
+                                       daemon=True)
+        cls._thread.start()
+
+        # persistent, loading another .blend during the warm-up would otherwise drop the poll timer
+        bpy.app.timers.register(cls._poll, first_interval=cls.POLL_INTERVAL, persistent=True)
+
+    @classmethod
+    def _load(cls, wow_path: str, project_dir_path: str):
+        try:
+            cls._result = WoWFileData(wow_path, project_dir_path)
+        except Exception as e:
+            cls._error = e
+
+    @classmethod
+    def _poll(cls):
+        if cls._thread is not None and cls._thread.is_alive():
+            return cls.POLL_INTERVAL
+
+        cls.finish()
+
+        window_manager = bpy.context.window_manager
+
+        if window_manager is not None:
+            for window in window_manager.windows:
+                for area in window.screen.areas:
+                    area.tag_redraw()
+
+        return None
+
+    @classmethod
+    def finish(cls):
+        """ Wait for a running warm-up and make its game data current. """
+
+        if cls._thread is None:
+            return
+
+        cls._thread.join()
+        cls._thread = None
+
+        if cls._error is not None:
+            print("\nFailed to load WoW game data in background: {}".format(cls._error))
+
+        # empty game data is left for load_game_data() to report
+        elif cls._result.files and not hasattr(bpy, 'wow_game_data'):
+            bpy.wow_game_data = cls._result
+
+        cls._result = None
+
+    @classmethod
+    def get_state(cls) -> str:
+        """ One of 'LOADING', 'LOADED', 'FAILED' or 'NOT_LOADED'. """
+
+        if cls._thread is not None:
+            return 'LOADING'
+
+        if hasattr(bpy, 'wow_game_data'):
+            return 'LOADED' if bpy.wow_game_data.files else 'FAILED'
+
+        return 'FAILED' if cls._error is not None else 'NOT_LOADED'
+
+
 def load_game_data() -> WoWFileData:
 
     WoWVersionManager().set_client_version(int(bpy.context.scene.wow_scene.version))
 
+    GameDataWarmUp.finish()
+
     if not hasattr(bpy, 'wow_game_data'):
         project_preferences = get_project_preferences()
         bpy.wow_game_data = WoWFileData(project_preferences.wow_path, project_preferences.project_dir_path)
@@ -115,14 +215,72 @@ def load_game_data() -> WoWFileData:
 
     return bpy.wow_game_data
 
+def mesh_from_triangles(name: str, vertices: np.ndarray, triangles: np.ndarray) -> bpy.types.Mesh:
+    """ Create a triangle mesh from arrays, equivalent to from_pydata() """
+
+    mesh = bpy.data.meshes.new(name)
+
+    n_triangles = triangles.shape[0]
+
+    mesh.vertices.add(vertices.shape[0])
+    mesh.vertices.foreach_set('co', vertices.ravel())
+
+    mesh.loops.add(n_triangles * 3)
+    mesh.loops.foreach_set('vertex_index', triangles.ravel())
+
+    mesh.polygons.add(n_triangles)
+    mesh.polygons.foreach_set('loop_start', np.arange(0, n_triangles * 3, 3, dtype=np.int32))
+    mesh.polygons.foreach_set('loop_total', np.full(n_triangles, 3, dtype=np.int32))
+
+    mesh.update(calc_edges=True)
+
+    return mesh
+
+
 def custom_relpath(path, start):
     if path.lower().startswith(start.lower()):
         return path[len(start):].lstrip('\\')
     else:
         return resolve_outside_texture_path(path)
     
+# texture paths resolved during the active texture_path_session(), keyed by absolute path
+_texture_path_cache = None
+
+
+@contextmanager
+def texture_path_session():
+    """ Memoize resolve_texture_path() results until the session ends, e.g. for the duration of an export.
+        Nested sessions share the outermost one.
+    """
+    global _texture_path_cache
+
+    if _texture_path_cache is not None:
+        yield
+        return
+
+    _texture_path_cache = {}
+
+    try:
+        yield
+    finally:
+        _texture_path_cache = None
+
+
 def resolve_texture_path(filepath: str) -> str:
     filepath = os.path.splitext(bpy.path.abspath(filepath))[0] + ".blp"
+
+    if _texture_path_cache is not None and filepath in _texture_path_cache:
+        return _texture_path_cache[filepath]
+
+    resolved_path = _resolve_texture_path(filepath)
+
+    if _texture_path_cache is not None:
+        _texture_path_cache[filepath] = resolved_path
+
+    return resolved_path
+
+
+def _resolve_texture_path(filepath: str) -> str:
     prefs = get_project_preferences()
 
     # TODO: project folder
@@ -133,57 +291,55 @@ def resolve_texture_path(filepath: str) -> str:
 
     game_data = load_game_data()
 
-    path = (filepath, "")
+    # game path suffixes from the shortest one up, drive and root are never part of a game path
+    components = [component for component in re.split(r'[\\/]', filepath) if component]
+    if components and components[0].endswith(':'):
+        components = components[1:]
+
     rest_path = ""
 
-    while True:
-        path = os.path.split(path[0])
+    for component in reversed(components):
+        rest_path = component + '\\' + rest_path if rest_path else component
 
-        if not path[1]:
-            print("\nTexture \"{}\" not found.".format(path))
-            break
+        if game_data.has_file(rest_path)[0]:
+            return rest_path
 
-        rest_path = os.path.join(path[1], rest_path)
-        rest_path = rest_path[:-1] if rest_path.endswith('\\') else rest_path
+    print("\nTexture \"{}\" not found.".format(filepath))
+
+
+# directories game paths start with, in order of preference
+GAME_PATH_ROOTS = ("world\\", "dungeon\\", "creature\\", "interface\\", "item\\", "models\\", "spells\\",
+                   "textures\\", "tileset\\", "xtextures\\")
 
-        if os.name != 'nt':
-            rest_path_n = rest_path.replace('/', '\\')
-        else:
-            rest_path_n = rest_path
 
-        rest_path_n = rest_path_n[:-1] if rest_path_n.endswith('\\') else rest_path_n
+def _find_game_path(lowercase_filepath: str):
+    """ Part of a path starting at the last occurrence of the first matching game path root, or None. """
+
+    for root in GAME_PATH_ROOTS:
+        index = lowercase_filepath.rfind(root)
+        if index >= 0:
+            return lowercase_filepath[index:]
+
+    return None
 
-        if game_data.has_file(rest_path_n)[0]:
-            return rest_path_n
 
 def resolve_outside_texture_path(filepath: str) -> str:
-    keywords = ["world\\", "dungeon\\", "creature\\", "interface\\", "item\\", "models\\", "spells\\", "textures\\", "tileset\\", "xtextures\\"]
     lowercase_filepath = filepath.lower()
-    
-    for keyword in keywords:
-        if keyword in lowercase_filepath:
-            index = lowercase_filepath.rfind(keyword)
-            extracted_path = lowercase_filepath[index:]
-            extracted_path = os.path.splitext(extracted_path)[0] + ".blp"
-            normalized_path = os.path.normpath(extracted_path)
-            return normalized_path
-    
+    extracted_path = _find_game_path(lowercase_filepath)
+
+    if extracted_path is not None:
+        return os.path.normpath(os.path.splitext(extracted_path)[0] + ".blp")
+
     lowercase_filepath = os.path.splitext(bpy.path.abspath(lowercase_filepath))[0] + ".blp"
     return lowercase_filepath
 
 def resolve_outside_model_path(filepath: str) -> str:
-    keywords = ["world\\", "dungeon\\", "creature\\", "interface\\", "item\\", "models\\", "spells\\", "textures\\", "tileset\\", "xtextures\\"]
-    lowercase_filepath = filepath.lower()
-    
-    for keyword in keywords:
-        if keyword in lowercase_filepath:
-            index = lowercase_filepath.rfind(keyword)
-            extracted_path = lowercase_filepath[index:]
-            extracted_path = os.path.splitext(extracted_path)[0] + ".m2"
-            normalized_path = os.path.normpath(extracted_path)
-            return normalized_path
-    else:
-        return None
+    extracted_path = _find_game_path(filepath.lower())
+
+    if extracted_path is not None:
+        return os.path.normpath(os.path.splitext(extracted_path)[0] + ".m2")
+
+    return None
         
 def get_origin_position():
     loc = bpy.context.scene.cursor.location
@@ -0,0 +1,122 @@
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from wmo_utils import CWMOGeometryBatcher, WMOGeometryBatcherMeshParams, WMOGeometryBatcherMeshArrays, \
+    BSP_NODE_DTYPE
+from bsp_tree_benchmark import generate_mesh, tilt_mesh, print_info, MAX_GROUP_TRIANGLES
+
+
+DEFAULT_SIZES = (1000, 5000, 20000, 65535)
+
+
+def generate_mesh_arrays(n_triangles: int, n_materials: int, tilt: float = 0.0,
+                         seed: int = 0) -> WMOGeometryBatcherMeshArrays:
+    """ Synthetic WMO group as batcher input arrays: one polygon per triangle, flat shaded,
+        materials assigned in patches, fully collidable.
+    """
+
+    rng = np.random.default_rng(seed)
+    vertices, triangles = generate_mesh(n_triangles, seed)
+
+    if tilt:
+        vertices = tilt_mesh(vertices, tilt)
+
+    n_loops = n_triangles * 3
+    loop_vertex_indices = triangles.astype(np.int32).ravel()
+
+    edge_a = vertices[triangles[:, 1]] - vertices[triangles[:, 0]]
+    edge_b = vertices[triangles[:, 2]] - vertices[triangles[:, 0]]
+    normals = np.cross(edge_a, edge_b)
+    normals /= np.maximum(np.linalg.norm(normals, axis=1, keepdims=True), 1e-12)
+
+    vertex_normals = np.zeros_like(vertices)
+    np.add.at(vertex_normals, triangles.ravel(), np.repeat(normals, 3, axis=0))
+    vertex_normals /= np.maximum(np.linalg.norm(vertex_normals, axis=1, keepdims=True), 1e-12)
+
+    # neighbouring triangles mostly share a material, like textured surfaces of a real group
+    patch_size = 64
+    patch_materials = rng.integers(0, n_materials, -(-n_triangles // patch_size), dtype=np.int32)
+    material_indices = np.repeat(patch_materials, patch_size)[:n_triangles]
+
+    uv = vertices[loop_vertex_indices, :2] / 16.0
+
+    return WMOGeometryBatcherMeshArrays(vertices
+                                        , vertex_normals
+                                        , loop_vertex_indices
+                                        , np.arange(n_loops, dtype=np.int32)
+                                        , np.arange(n_triangles, dtype=np.int32)
+                                        , material_indices=material_indices
+                                        , uv=uv
+                                        , collision_weights=np.ones(len(vertices), dtype=np.float32))
+
+
+def run_benchmark(sizes, n_materials: int, node_size: int, repeats: int, tilt: float, optimize_vertex_cache: bool):
+    print_info('\nWMO geometry batching benchmark')
+    print(f'Materials: {n_materials}, node size: {node_size if node_size else "auto"}, repeats: {repeats}, '
+          f'tilt: {tilt} degrees, vertex cache optimization: {optimize_vertex_cache}\n')
+
+    header = '{:>10} {:>12} {:>12} {:>10} {:>10} {:>10} {:>10} {:>10}'.format(
+        'faces', 'best ms', 'median ms', 'batches', 'vertices', 'bsp nodes', 'acmr in', 'acmr out')
+    print(header)
+    print('-' * len(header))
+
+    for n_triangles in sizes:
+        mesh_arrays = generate_mesh_arrays(n_triangles, n_materials, tilt)
+
+        params = WMOGeometryBatcherMeshParams(0
+                                              , np.identity(4)
+                                              , 0
+                                              , None
+                                              , False
+                                              , False
+                                              , False
+                                              , -1
+                                              , node_size
+                                              , optimize_vertex_cache
+                                              , list(range(n_materials))
+                                              , None
+                                              , mesh_arrays=mesh_arrays)
+
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            batcher = CWMOGeometryBatcher([params])
+            timings.append((time.perf_counter() - start) * 1000.0)
+
+        batch_counts = batcher.batch_count_info(0)
+        n_batches = batch_counts.n_batches_trans + batch_counts.n_batches_int + batch_counts.n_batches_ext
+        acmr_before, acmr_after = batcher.acmr(0)
+
+        print('{:>10} {:>12.2f} {:>12.2f} {:>10} {:>10} {:>10} {:>10.3f} {:>10.3f}'.format(
+            n_triangles, min(timings), float(np.median(timings)),
+            n_batches, len(batcher.vertices(0) or b'') // 12,
+            len(batcher.bsp_nodes(0) or b'') // BSP_NODE_DTYPE.itemsize,
+            acmr_before, acmr_after))
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Benchmark WMO group batching on synthetic meshes passed as arrays,'
+                                                 ' without Blender.'
+                                                 '\nRequires wbs_kernel to be built (see build.py).'
+                                     , formatter_class=argparse.RawTextHelpFormatter)
+
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help='triangle counts to benchmark, at most 65535 per group')
+    parser.add_argument('--materials', type=int, default=8, help='amount of materials assigned to the mesh')
+    parser.add_argument('--node_size', type=int, default=0, help='max faces per BSP leaf, 0 picks it automatically')
+    parser.add_argument('--repeats', type=int, default=5, help='amount of batcher runs per mesh size')
+    parser.add_argument('--tilt', type=float, default=0.0, help='rotate meshes by that many degrees')
+    parser.add_argument('--optimize_vertex_cache', action='store_true', help='run vertex cache optimization')
+    args = parser.parse_args()
+
+    if max(args.sizes) > MAX_GROUP_TRIANGLES:
+        parser.error('WMO groups are limited to {} triangles.'.format(MAX_GROUP_TRIANGLES))
+
+    run_benchmark(args.sizes, args.materials, args.node_size, args.repeats, args.tilt, args.optimize_vertex_cache)
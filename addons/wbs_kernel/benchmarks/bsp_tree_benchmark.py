@@ -0,0 +1,160 @@
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+from typing import Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from wmo_utils import build_bsp_tree
+
+
+DEFAULT_SIZES = (1000, 5000, 20000, 100000, 500000)
+
+# MOBR face indices are uint16, larger sizes are built as several groups of at most that many triangles
+MAX_GROUP_TRIANGLES = 0xFFFF
+
+# triangle counts around the largest groups shipped with the game, MOBR bounds a group to 65535 triangles
+LARGEST_GROUP_SIZES = (40000, 60000, 65535)
+
+BSP_LEAF = 4
+
+
+def print_info(*s: str):
+    print("\033[93m {}\033[00m".format(' '.join(s)))
+
+
+def generate_mesh(n_triangles: int, seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """ Generate a synthetic WMO-like group: stacked floors of a wavy grid, sized to fit uint16 indices.
+        Floors are reused cyclically once all their quads are used, like overlapping detail geometry.
+    """
+
+    rng = np.random.default_rng(seed)
+
+    n_quads = (n_triangles + 1) // 2
+    n_floors = max(1, -(-n_quads // (255 * 255)))
+    grid_size = min(256, int(np.sqrt(n_quads / n_floors)) + 2, int(np.sqrt(0xFFFF / n_floors)))
+    cell_size = 200.0 / grid_size
+
+    x, y = np.meshgrid(np.arange(grid_size, dtype=np.float32), np.arange(grid_size, dtype=np.float32))
+    height = 2.0 * np.sin(x * 0.3) * np.cos(y * 0.2)
+
+    floors = []
+    for floor in range(n_floors):
+        z = height + floor * 8.0 + rng.uniform(-0.1, 0.1, height.shape)
+        floors.append(np.stack((x * cell_size, y * cell_size, z), axis=-1).reshape(-1, 3))
+
+    vertices = np.concatenate(floors).astype(np.float32)
+
+    quad_x, quad_y = np.meshgrid(np.arange(grid_size - 1), np.arange(grid_size - 1))
+    a = (quad_y * grid_size + quad_x).ravel()
+    floor_offsets = np.arange(n_floors) * grid_size * grid_size
+    a = (a[None, :] + floor_offsets[:, None]).ravel()
+    b, c, d = a + 1, a + grid_size, a + grid_size + 1
+
+    triangles = np.concatenate((np.stack((a, b, d), axis=-1), np.stack((a, d, c), axis=-1)), axis=1).reshape(-1, 3)
+    triangles = np.resize(triangles, (n_triangles, 3))
+
+    return vertices, triangles.astype(np.uint16)
+
+
+def tilt_mesh(vertices: np.ndarray, degrees: float) -> np.ndarray:
+    """ Rotate mesh around X and Z axes, so that most faces cross split planes and need the exact overlap test. """
+
+    angle = np.radians(degrees)
+    cos, sin = np.cos(angle), np.sin(angle)
+
+    rot_x = np.array(((1.0, 0.0, 0.0), (0.0, cos, -sin), (0.0, sin, cos)))
+    rot_z = np.array(((cos, -sin, 0.0), (sin, cos, 0.0), (0.0, 0.0, 1.0)))
+
+    return (vertices @ (rot_z @ rot_x).T).astype(np.float32)
+
+
+def tree_depth(nodes: np.ndarray) -> int:
+    if not len(nodes):
+        return 0
+
+    depth = 0
+    stack = [(0, 1)]
+
+    while stack:
+        i_node, node_depth = stack.pop()
+        depth = max(depth, node_depth)
+
+        if nodes[i_node]['plane_type'] == BSP_LEAF:
+            continue
+
+        for child in nodes[i_node]['children']:
+            if child >= 0:
+                stack.append((child, node_depth + 1))
+
+    return depth
+
+
+def split_into_groups(n_triangles: int) -> Tuple[int, ...]:
+    """ Triangle counts of the groups a mesh of n_triangles is exported as, evenly sized. """
+
+    n_groups = max(1, -(-n_triangles // MAX_GROUP_TRIANGLES))
+    return tuple(n_triangles // n_groups + (i < n_triangles % n_groups) for i in range(n_groups))
+
+
+def run_benchmark(sizes, node_size: int, repeats: int, tilt: float):
+    print_info('\nBSP tree build benchmark')
+    print(f'Node size: {node_size if node_size else "auto"}, repeats: {repeats}, tilt: {tilt} degrees\n')
+
+    header = '{:>10} {:>7} {:>10} {:>12} {:>12} {:>8} {:>8} {:>6} {:>22} {:>10}'.format(
+        'faces', 'groups', 'vertices', 'best ms', 'median ms', 'nodes', 'leaves', 'depth', 'faces/leaf min/avg/max',
+        'dup ratio')
+    print(header)
+    print('-' * len(header))
+
+    for n_triangles in sizes:
+        groups = []
+        for seed, n_group_triangles in enumerate(split_into_groups(n_triangles)):
+            vertices, triangles = generate_mesh(n_group_triangles, seed)
+
+            if tilt:
+                vertices = tilt_mesh(vertices, tilt)
+
+            groups.append((vertices, triangles))
+
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            trees = [build_bsp_tree(vertices, triangles, node_size) for vertices, triangles in groups]
+            timings.append((time.perf_counter() - start) * 1000.0)
+
+        leaf_sizes = np.concatenate([nodes['num_faces'][nodes['plane_type'] == BSP_LEAF] for nodes, _ in trees])
+
+        print('{:>10} {:>7} {:>10} {:>12.2f} {:>12.2f} {:>8} {:>8} {:>6} {:>22} {:>10.2f}'.format(
+            n_triangles, len(groups), sum(len(vertices) for vertices, _ in groups), min(timings),
+            float(np.median(timings)), sum(len(nodes) for nodes, _ in trees), len(leaf_sizes),
+            max(tree_depth(nodes) for nodes, _ in trees),
+            '{}/{:.1f}/{}'.format(leaf_sizes.min(), leaf_sizes.mean(), leaf_sizes.max()),
+            sum(len(faces) for _, faces in trees) / n_triangles))
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Benchmark WMO collision BSP tree generation on synthetic meshes.'
+                                                 '\nRequires wbs_kernel to be built (see build.py).'
+                                     , formatter_class=argparse.RawTextHelpFormatter)
+
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help='triangle counts to benchmark, sizes above 65535 are split into several groups')
+    parser.add_argument('--node_size', type=int, default=0, help='max faces per leaf, 0 picks it automatically')
+    parser.add_argument('--repeats', type=int, default=5, help='amount of builds per mesh size')
+    parser.add_argument('--tilt', type=float, default=0.0, help='rotate meshes by that many degrees, '
+                                                                'stresses triangle-box overlap tests')
+    parser.add_argument('--largest', action='store_true', help='benchmark sizes of the largest game WMO groups '
+                                                               'instead of --sizes, tilted by 20 degrees '
+                                                               'unless --tilt is given')
+    args = parser.parse_args()
+
+    if args.largest:
+        run_benchmark(LARGEST_GROUP_SIZES, args.node_size, args.repeats, args.tilt or 20.0)
+    else:
+        run_benchmark(args.sizes, args.node_size, args.repeats, args.tilt)
@@ -42,11 +42,11 @@ def main(debug: bool):
             extra_link_args = []
     else:
         if debug:
-            extra_compile_args = ['-std=c++17', '-O0', '-g']
-            extra_link_args = []
+            extra_compile_args = ['-std=c++17', '-O0', '-g', '-pthread']
+            extra_link_args = ['-pthread']
         else:
-            extra_compile_args = ['-std=c++17', '-O3']
-            extra_link_args = []
+            extra_compile_args = ['-std=c++17', '-O3', '-pthread']
+            extra_link_args = ['-pthread']
 
     common_include_dirs = [
         "src/bl_src/source/blender/blenkernel/",
@@ -62,8 +62,11 @@ def main(debug: bool):
         "src/bl_utils/math_utils.cpp",
         "src/bl_utils/color_utils.cpp",
         "src/bl_utils/mesh/custom_data.cpp",
+        "src/bl_utils/mesh/vertex_cache.cpp",
         "src/bl_utils/mesh/wmo/batch_geometry.cpp",
         "src/bl_utils/mesh/wmo/bsp_tree.cpp",
+        "src/bl_utils/mesh/wmo/mesh_source.cpp",
+        "src/bl_utils/mesh/wmo/unbatch_geometry.cpp",
         "src/bl_utils/mesh/wmo/wmo_liquid_exporter.cpp"
     ]
 
@@ -0,0 +1,214 @@
+#include "vertex_cache.hpp"
+
+#include <algorithm>
+#include <array>
+#include <cassert>
+#include <cmath>
+#include <deque>
+
+using namespace wbs_kernel::bl_utils::mesh;
+
+// scoring constants as proposed by the original paper
+static constexpr float CACHE_DECAY_POWER = 1.5f;
+static constexpr float LAST_TRI_SCORE = 0.75f;
+static constexpr float VALENCE_BOOST_SCALE = 2.0f;
+static constexpr float VALENCE_BOOST_POWER = 0.5f;
+
+static float vertex_score(int cache_position, unsigned remaining_tris)
+{
+  // no triangles left to use this vertex
+  if (!remaining_tris)
+    return -1.f;
+
+  float score = 0.f;
+
+  if (cache_position >= 0)
+  {
+    if (cache_position < 3)
+    {
+      // vertex was used in the last triangle, fixed score so that it does not matter which of the three it was
+      score = LAST_TRI_SCORE;
+    }
+    else
+    {
+      assert(cache_position < static_cast<int>(VERTEX_CACHE_SIZE));
+      const float scaler = 1.f / (VERTEX_CACHE_SIZE - 3);
+      score = std::pow(1.f - (cache_position - 3) * scaler, CACHE_DECAY_POWER);
+    }
+  }
+
+  // bonus points for having a low number of triangles left, so lone vertices are taken care of early
+  score += VALENCE_BOOST_SCALE * std::pow(static_cast<float>(remaining_tris), -VALENCE_BOOST_POWER);
+
+  return score;
+}
+
+std::vector<std::uint32_t> wbs_kernel::bl_utils::mesh::optimize_triangle_order(std::uint16_t const* indices
+                                                                              , std::size_t n_indices
+                                                                              , unsigned first_vertex
+                                                                              , unsigned n_vertices)
+{
+  assert(!(n_indices % 3) && "Bad triangle list format.");
+
+  std::size_t n_tris = n_indices / 3;
+
+  std::vector<std::uint32_t> tri_order;
+  tri_order.reserve(n_tris);
+
+  if (!n_tris)
+    return tri_order;
+
+  // vertex -> triangles adjacency, stored contiguously
+  std::vector<unsigned> remaining_tris(n_vertices, 0);
+
+  for (std::size_t i = 0; i < n_indices; ++i)
+  {
+    assert(indices[i] >= first_vertex && indices[i] - first_vertex < n_vertices);
+    remaining_tris[indices[i] - first_vertex]++;
+  }
+
+  std::vector<std::size_t> adjacency_offsets(n_vertices + 1, 0);
+
+  for (unsigned v = 0; v < n_vertices; ++v)
+  {
+    adjacency_offsets[v + 1] = adjacency_offsets[v] + remaining_tris[v];
+  }
+
+  std::vector<std::uint32_t> adjacency(n_indices);
+  std::vector<unsigned> fill(n_vertices, 0);
+
+  for (std::size_t tri = 0; tri < n_tris; ++tri)
+  {
+    for (unsigned j = 0; j < 3; ++j)
+    {
+      unsigned v = indices[tri * 3 + j] - first_vertex;
+      adjacency[adjacency_offsets[v] + fill[v]++] = tri;
+    }
+  }
+
+  std::vector<int> cache_positions(n_vertices, -1);
+  std::vector<float> vertex_scores(n_vertices);
+
+  for (unsigned v = 0; v < n_vertices; ++v)
+  {
+    vertex_scores[v] = vertex_score(-1, remaining_tris[v]);
+  }
+
+  std::vector<float> tri_scores(n_tris);
+  std::vector<bool> tri_added(n_tris, false);
+
+  for (std::size_t tri = 0; tri < n_tris; ++tri)
+  {
+    tri_scores[tri] = vertex_scores[indices[tri * 3] - first_vertex]
+      + vertex_scores[indices[tri * 3 + 1] - first_vertex]
+      + vertex_scores[indices[tri * 3 + 2] - first_vertex];
+  }
+
+  // cache holds local vertex indices, 3 extra slots for vertices pushed out by the newly added triangle
+  std::array<unsigned, VERTEX_CACHE_SIZE + 3> cache{};
+  std::array<unsigned, VERTEX_CACHE_SIZE + 3> new_cache{};
+  unsigned cache_count = 0;
+
+  std::int64_t best_tri = std::max_element(tri_scores.begin(), tri_scores.end()) - tri_scores.begin();
+  std::size_t scan_cursor = 0;
+
+  while (tri_order.size() < n_tris)
+  {
+    if (best_tri < 0)
+    {
+      // nothing adjacent to the cache, continue with the next unused triangle in input order
+      while (tri_added[scan_cursor])
+        scan_cursor++;
+
+      best_tri = scan_cursor;
+    }
+
+    tri_order.push_back(best_tri);
+    tri_added[best_tri] = true;
+
+    unsigned new_cache_count = 0;
+
+    for (unsigned j = 0; j < 3; ++j)
+    {
+      unsigned v = indices[best_tri * 3 + j] - first_vertex;
+      new_cache[new_cache_count++] = v;
+
+      // remove triangle from the vertex adjacency
+      std::uint32_t* tris_begin = &adjacency[adjacency_offsets[v]];
+      std::uint32_t* tris_end = tris_begin + remaining_tris[v];
+      std::uint32_t* it = std::find(tris_begin, tris_end, static_cast<std::uint32_t>(best_tri));
+      assert(it != tris_end);
+      std::swap(*it, *(tris_end - 1));
+      remaining_tris[v]--;
+    }
+
+    for (unsigned j = 0; j < cache_count; ++j)
+    {
+      unsigned v = cache[j];
+
+      if (v != new_cache[0] && v != new_cache[1] && v != new_cache[2])
+        new_cache[new_cache_count++] = v;
+    }
+
+    std::swap(cache, new_cache);
+    cache_count = new_cache_count;
+
+    // update vertex scores, vertices pushed out of the cache get their position reset
+    for (unsigned j = 0; j < cache_count; ++j)
+    {
+      unsigned v = cache[j];
+      cache_positions[v] = j < VERTEX_CACHE_SIZE ? static_cast<int>(j) : -1;
+      vertex_scores[v] = vertex_score(cache_positions[v], remaining_tris[v]);
+    }
+
+    // score triangles touching the cache and pick the best one
+    best_tri = -1;
+    float best_score = -1.f;
+
+    for (unsigned j = 0; j < cache_count; ++j)
+    {
+      unsigned v = cache[j];
+
+      for (std::size_t k = adjacency_offsets[v]; k < adjacency_offsets[v] + remaining_tris[v]; ++k)
+      {
+        std::uint32_t tri = adjacency[k];
+
+        float score = vertex_scores[indices[tri * 3] - first_vertex]
+          + vertex_scores[indices[tri * 3 + 1] - first_vertex]
+          + vertex_scores[indices[tri * 3 + 2] - first_vertex];
+
+        if (score > best_score)
+        {
+          best_score = score;
+          best_tri = tri;
+        }
+      }
+    }
+
+    cache_count = std::min(cache_count, VERTEX_CACHE_SIZE);
+  }
+
+  return tri_order;
+}
+
+std::size_t wbs_kernel::bl_utils::mesh::count_cache_misses(std::uint16_t const* indices
+                                                          , std::size_t n_indices
+                                                          , unsigned cache_size)
+{
+  std::deque<std::uint16_t> cache;
+  std::size_t misses = 0;
+
+  for (std::size_t i = 0; i < n_indices; ++i)
+  {
+    if (std::find(cache.begin(), cache.end(), indices[i]) != cache.end())
+      continue;
+
+    misses++;
+    cache.push_back(indices[i]);
+
+    if (cache.size() > cache_size)
+      cache.pop_front();
+  }
+
+  return misses;
+}
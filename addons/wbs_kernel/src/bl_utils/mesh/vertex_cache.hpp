@@ -0,0 +1,28 @@
+#ifndef WBS_KERNEL_VERTEX_CACHE_HPP
+#define WBS_KERNEL_VERTEX_CACHE_HPP
+
+#include <cstdint>
+#include <cstddef>
+#include <vector>
+
+namespace wbs_kernel::bl_utils::mesh
+{
+  // Size of the post-transform cache used for simulation and optimization.
+  constexpr unsigned VERTEX_CACHE_SIZE = 32;
+
+  // Linear-speed vertex cache optimisation (Tom Forsyth, 2006).
+  // Indices must reference vertices in range [first_vertex, first_vertex + n_vertices).
+  // Returns the optimized order of triangles, as indices of triangles in the passed triangle list.
+  [[nodiscard]]
+  std::vector<std::uint32_t> optimize_triangle_order(std::uint16_t const* indices
+                                                     , std::size_t n_indices
+                                                     , unsigned first_vertex
+                                                     , unsigned n_vertices);
+
+  // Returns amount of vertex transforms needed to render the triangle list with a FIFO post-transform cache.
+  // Divided by the amount of triangles, this gives the average cache miss ratio (ACMR).
+  [[nodiscard]]
+  std::size_t count_cache_misses(std::uint16_t const* indices, std::size_t n_indices, unsigned cache_size);
+}
+
+#endif //WBS_KERNEL_VERTEX_CACHE_HPP
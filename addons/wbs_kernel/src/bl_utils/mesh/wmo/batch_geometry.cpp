@@ -1,5 +1,5 @@
 #include "batch_geometry.hpp"
-#include <bl_utils/mesh/custom_data.hpp>
+#include <bl_utils/mesh/vertex_cache.hpp>
 #include <bl_utils/mesh/wmo/bsp_tree.hpp>
 #include <bl_utils/mesh/wmo/wmo_liquid_exporter.hpp>
 #include <extern/glm/gtc/type_ptr.hpp>
@@ -7,13 +7,7 @@
 #include <cassert>
 #include <algorithm>
 #include <limits>
-
-#include <BKE_mesh_types.h>
-#include <DNA_mesh_types.h>
-#include <DNA_meshdata_types.h>
-#include <DNA_material_types.h>
-#include <DNA_ID.h>
-#include <BKE_customdata.h>
+#include <tuple>
 
 using namespace wbs_kernel::bl_utils::math_utils;
 using namespace wbs_kernel::bl_utils::color_utils;
@@ -30,102 +24,114 @@ WMOGeometryBatcher::WMOGeometryBatcher(std::uintptr_t mesh_ptr
   , bool use_custom_normals
   , int vg_collision_index
   , unsigned node_size
+  , bool optimize_vertex_cache
   , std::vector<int> const& material_mapping
   , const LiquidParams* liquid_params
 
 )
-: _mesh(reinterpret_cast<Mesh*>(mesh_ptr))
+: _mesh_source(new BlenderMeshSource(mesh_ptr, vg_collision_index))
+, _collision_source(nullptr)
 , _mesh_mtx_world(glm::make_mat4(mesh_matrix_world))
-, _bsp_tree(nullptr)
-, _liquid_exporter(nullptr)
 , _trans_batch_count(0)
 , _int_batch_count(0)
 , _ext_batch_count(0)
-, _use_vertex_color(use_vertex_color)
-, _use_large_material_id(use_large_material_id)
-, _vg_collision_index(vg_collision_index)
 , _bounding_box_min(Vector3D{std::numeric_limits<float>::max()
                              , std::numeric_limits<float>::max()
                              , std::numeric_limits<float>::max()})
 , _bounding_box_max(Vector3D{std::numeric_limits<float>::lowest()
                               , std::numeric_limits<float>::lowest()
                               , std::numeric_limits<float>::lowest()})
-, _bl_loops(static_cast<MLoop*>(WBS_CustomData_get_layer(&_mesh->ldata, eCustomDataType::CD_MLOOP)))
-, _bl_verts(static_cast<MVert*>(WBS_CustomData_get_layer(&_mesh->vdata, eCustomDataType::CD_MVERT)))
-, _bl_polygons(static_cast<MPoly*>(WBS_CustomData_get_layer(&_mesh->pdata, eCustomDataType::CD_MPOLY)))
-, _bl_looptris(_mesh->runtime->looptris.array)
-, _bl_vertex_normals(reinterpret_cast<const float(*)[3]>(_mesh->runtime->vert_normals))
-, _has_collision_vg(_vg_collision_index >= 0)
-, _bl_batch_map_trans(_mesh, "BatchmapTrans")
-, _bl_batch_map_int(_mesh, "BatchmapInt")
-, _bl_lightmap(_mesh, "Lightmap")
-, _bl_blendmap(_mesh, "Blendmap")
-, _bl_vertex_color(_mesh, "Col")
-, _bl_uv(get_custom_data_layer_named<MLoopUV>(&_mesh->ldata, "UVMap"))
-, _bl_uv2(get_custom_data_layer_named<MLoopUV>(&_mesh->ldata, "UVMap.001"))
-, _last_error(WMOGeometryBatcherError::NO_ERROR)
-, _collision_mesh(nullptr)
 , _material_ids(material_mapping)
-, _mesh_materials_per_poly(static_cast<std::int32_t*>(WBS_CustomData_get_layer_named(&_mesh->pdata, eCustomDataType::CD_PROP_INT32, "material_index")))
+, _last_error(WMOGeometryBatcherError::NO_ERROR)
+, _acmr_before(0.f)
+, _acmr_after(0.f)
+, _use_vertex_color(use_vertex_color)
+, _use_large_material_id(use_large_material_id)
+, _use_custom_normals(false)
+, _bsp_tree(nullptr)
+, _liquid_exporter(nullptr)
 {
-  assert(!_mesh->runtime->vert_normals_dirty && "Vertex normals were not calculated for group mesh.");
-  assert(!_mesh->runtime->poly_normals_dirty && "Poly normals were not calculated for group mesh.");
-
   if (collision_mesh_ptr)
   {
-    _collision_mesh = reinterpret_cast<Mesh*>(collision_mesh_ptr);
-
-    assert(!_collision_mesh->runtime->vert_normals_dirty && "Vertex normals were not calculated for collision mesh.");
-    assert(!_collision_mesh->runtime->poly_normals_dirty && "Poly normals were not calculated for collision mesh.");
-
-    _bl_col_loops = static_cast<MLoop *>(WBS_CustomData_get_layer(&_collision_mesh->ldata, eCustomDataType::CD_MLOOP));
-    _bl_col_verts = static_cast<MVert*>(WBS_CustomData_get_layer(&_collision_mesh->vdata, eCustomDataType::CD_MVERT));
-    _bl_col_vertex_normals = reinterpret_cast<const float(*)[3]>(_collision_mesh->runtime->vert_normals);
-    _bl_col_looptris = _collision_mesh->runtime->looptris.array;
+    _collision_source = new BlenderMeshSource(collision_mesh_ptr, -1);
 
     assert(collision_mesh_matrix_world && "Collision is present but its world matrix is nullptr.");
     _collision_mtx_world = glm::make_mat4(collision_mesh_matrix_world);
   }
 
-  if (_has_collision_vg)
-  {
-    _bl_vg_data = static_cast<MDeformVert*>(WBS_CustomData_get_layer(&_mesh->vdata,
-                                                                     eCustomDataType::CD_MDEFORMVERT));
-
-    if (!_bl_vg_data)
-    {
-      _has_collision_vg = false;
-    }
-  }
+  _batch(use_custom_normals, node_size, optimize_vertex_cache, liquid_params);
+}
 
-  // custom normals
-  _use_custom_normals = use_custom_normals && WBS_CustomData_has_layer(&_mesh->ldata,
-                                                                       eCustomDataType::CD_CUSTOMLOOPNORMAL);
+WMOGeometryBatcher::WMOGeometryBatcher(const MeshArrays* mesh_arrays
+  , const float* mesh_matrix_world
+  , const MeshArrays* collision_mesh_arrays
+  , const float* collision_mesh_matrix_world
+  , bool use_large_material_id
+  , bool use_vertex_color
+  , bool use_custom_normals
+  , unsigned node_size
+  , bool optimize_vertex_cache
+  , std::vector<int> const& material_mapping
+  , const LiquidParams* liquid_params
 
-  if (_use_custom_normals)
+)
+: _mesh_source(new ArrayMeshSource(*mesh_arrays))
+, _collision_source(nullptr)
+, _mesh_mtx_world(glm::make_mat4(mesh_matrix_world))
+, _trans_batch_count(0)
+, _int_batch_count(0)
+, _ext_batch_count(0)
+, _bounding_box_min(Vector3D{std::numeric_limits<float>::max()
+                             , std::numeric_limits<float>::max()
+                             , std::numeric_limits<float>::max()})
+, _bounding_box_max(Vector3D{std::numeric_limits<float>::lowest()
+                              , std::numeric_limits<float>::lowest()
+                              , std::numeric_limits<float>::lowest()})
+, _material_ids(material_mapping)
+, _last_error(WMOGeometryBatcherError::NO_ERROR)
+, _acmr_before(0.f)
+, _acmr_after(0.f)
+, _use_vertex_color(use_vertex_color)
+, _use_large_material_id(use_large_material_id)
+, _use_custom_normals(false)
+, _bsp_tree(nullptr)
+, _liquid_exporter(nullptr)
+{
+  if (collision_mesh_arrays)
   {
-    _bl_loop_normals = reinterpret_cast<const float(*)[3]>(WBS_CustomData_get_layer(&_mesh->ldata,
-                                                                                    eCustomDataType::CD_NORMAL));
+    _collision_source = new ArrayMeshSource(*collision_mesh_arrays);
+
+    assert(collision_mesh_matrix_world && "Collision is present but its world matrix is nullptr.");
+    _collision_mtx_world = glm::make_mat4(collision_mesh_matrix_world);
   }
 
+  _batch(use_custom_normals, node_size, optimize_vertex_cache, liquid_params);
+}
+
+void WMOGeometryBatcher::_batch(bool use_custom_normals
+                               , unsigned node_size
+                               , bool optimize_vertex_cache
+                               , const LiquidParams* liquid_params)
+{
+  _use_custom_normals = use_custom_normals && _mesh_source->has_loop_normals();
 
-  unsigned n_loop_tris = _mesh->totloop - (_mesh->totpoly * 2);
-  std::vector<std::pair<const MLoopTri*, BatchType>> polys_per_mat;
+  std::size_t n_loop_tris = _mesh_source->n_looptris();
+  std::vector<std::pair<std::size_t, BatchType>> polys_per_mat;
   polys_per_mat.resize(n_loop_tris);
 
-  for (int i = 0; i < n_loop_tris; ++i)
+  for (std::size_t i = 0; i < n_loop_tris; ++i)
   {
-    polys_per_mat[i] = std::make_pair(&_bl_looptris[i], WMOGeometryBatcher::get_batch_type(&_bl_looptris[i]));
+    polys_per_mat[i] = std::make_pair(i, WMOGeometryBatcher::get_batch_type(i));
   }
 
   // presort faces by their batch type and material_id forming the batches
-  if (_mesh_materials_per_poly)
+  if (_mesh_source->has_material_indices())
   {
     std::sort(polys_per_mat.begin(), polys_per_mat.end(),
-        [this](std::pair<const MLoopTri*, BatchType> const& lhs, std::pair<const MLoopTri*, BatchType> const& rhs) -> bool
+        [this](std::pair<std::size_t, BatchType> const& lhs, std::pair<std::size_t, BatchType> const& rhs) -> bool
         {
-          return std::tie(lhs.second, _mesh_materials_per_poly[lhs.first->poly])
-            < std::tie(rhs.second, _mesh_materials_per_poly[rhs.first->poly]);
+          return std::make_tuple(lhs.second, _mesh_source->material_index(_mesh_source->looptri_polygon(lhs.first)))
+            < std::make_tuple(rhs.second, _mesh_source->material_index(_mesh_source->looptri_polygon(rhs.first)));
         });
   }
 
@@ -138,7 +144,7 @@ WMOGeometryBatcher::WMOGeometryBatcher(std::uintptr_t mesh_ptr
     if (WMOGeometryBatcher::_needs_new_batch(cur_batch, looptri, cur_batch_type,
                                              batch_type, cur_batch_mat_id))
     {
-      _create_new_batch(_material_ids[_get_poly_material_index(looptri->poly)],
+      _create_new_batch(_material_ids[_mesh_source->material_index(_mesh_source->looptri_polygon(looptri))],
                         batch_type, cur_batch, cur_batch_mat_id, cur_batch_type);
     }
     
@@ -151,12 +157,18 @@ WMOGeometryBatcher::WMOGeometryBatcher(std::uintptr_t mesh_ptr
     cur_batch->max_index = _vertices.size() - 1;
   }
 
+  // must happen before collision faces are added and before BSP tree is built, as both rely on face order
+  if (optimize_vertex_cache)
+  {
+    _optimize_vertex_cache();
+  }
+
   // handle collision only faces
-  if (_collision_mesh)
+  if (_collision_source)
   {
-    for (std::size_t i = 0; i < _collision_mesh->totloop - (_collision_mesh->totpoly * 2); ++i)
+    for (std::size_t i = 0; i < _collision_source->n_looptris(); ++i)
     {
-      _create_new_collision_triangle(&_bl_col_looptris[i]);
+      _create_new_collision_triangle(i);
     }
   }
 
@@ -176,7 +188,7 @@ WMOGeometryBatcher::WMOGeometryBatcher(std::uintptr_t mesh_ptr
   }
 }
 
-void WMOGeometryBatcher::_create_new_collision_triangle(const MLoopTri* tri)
+void WMOGeometryBatcher::_create_new_collision_triangle(std::size_t looptri_index)
 {
 
   MOPYTriangleMaterial& tri_mat = _triangle_materials.emplace_back();
@@ -184,17 +196,16 @@ void WMOGeometryBatcher::_create_new_collision_triangle(const MLoopTri* tri)
   tri_mat.flags.F_COLLISION = true;
   tri_mat.material_id = 0xFF;
 
-  for (unsigned loop_index : tri->tri)
+  for (unsigned loop_index : _collision_source->looptri_loops(looptri_index))
   {
-    const MLoop* loop = &_bl_col_loops[loop_index];
-    const MVert* vert = &_bl_col_verts[loop->v];
+    unsigned vert_index = _collision_source->loop_vertex(loop_index);
 
-    auto it = _collision_vertex_map.find(loop->v);
+    auto it = _collision_vertex_map.find(vert_index);
 
     // add new vertex if required
     if (it == _collision_vertex_map.end())
     {
-      _create_new_collision_vert(vert, loop);
+      _create_new_collision_vert(vert_index);
     }
     else
     {
@@ -208,16 +219,16 @@ void WMOGeometryBatcher::_unpack_vertex(BatchVertexInfo& v_info
     , MOPYTriangleMaterial& tri_mat
     , unsigned loop_index)
 {
-  if (_use_vertex_color && _bl_vertex_color.exists())
+  if (_use_vertex_color && _mesh_source->has_color_layer(MeshColorLayer::VERTEX_COLOR))
   {
-    RGBA color = _bl_vertex_color[loop_index];
+    RGBA color = _mesh_source->color(MeshColorLayer::VERTEX_COLOR, loop_index);
     v_info.col.r = color.b;
     v_info.col.g = color.g;
     v_info.col.b = color.r;
 
-    if (_bl_lightmap.exists())
+    if (_mesh_source->has_color_layer(MeshColorLayer::LIGHTMAP))
     {
-      unsigned char attenuation = _get_grayscale_factor(_bl_lightmap[loop_index]);
+      unsigned char attenuation = _get_grayscale_factor(_mesh_source->color(MeshColorLayer::LIGHTMAP, loop_index));
 
       // TODO: verify what this actually does and if needed
       if (attenuation > 0)
@@ -229,53 +240,49 @@ void WMOGeometryBatcher::_unpack_vertex(BatchVertexInfo& v_info
     }
   }
 
-  if (_bl_blendmap.exists())
+  if (_mesh_source->has_color_layer(MeshColorLayer::BLENDMAP))
   {
-    RGBA color = _bl_blendmap[loop_index];
+    RGBA color = _mesh_source->color(MeshColorLayer::BLENDMAP, loop_index);
     v_info.col2.a = _get_grayscale_factor(color);
   }
 
-  if (_bl_uv)
+  if (_mesh_source->has_uv())
   {
-    const MLoopUV* uv_coord = &_bl_uv[loop_index];
-    v_info.uv = {uv_coord->uv[0], 1.0f - uv_coord->uv[1]};
+    Vector2D uv_coord = _mesh_source->uv(loop_index);
+    v_info.uv = {uv_coord.x, 1.0f - uv_coord.y};
   }
 
-  if (_bl_uv2)
+  if (_mesh_source->has_uv2())
   {
-    const MLoopUV* uv_coord = &_bl_uv2[loop_index];
-    v_info.uv2 = {uv_coord->uv[0], 1.0f - uv_coord->uv[1]};
+    Vector2D uv_coord = _mesh_source->uv2(loop_index);
+    v_info.uv2 = {uv_coord.x, 1.0f - uv_coord.y};
   }
 
   if (_use_custom_normals)
   {
-    v_info.loop_normal = Vector3D({_bl_loop_normals[loop_index][0],
-                                   _bl_loop_normals[loop_index][1],
-                                   _bl_loop_normals[loop_index][2]});
+    v_info.loop_normal = _mesh_source->loop_normal(loop_index);
   }
 }
 
-void WMOGeometryBatcher::_create_new_collision_vert(const MVert* vertex
-                                                   , const MLoop* loop)
+void WMOGeometryBatcher::_create_new_collision_vert(unsigned vert_index)
 {
   unsigned v_local_index = _vertices.size();
 
-  glm::vec4 vertex_co_4 = glm::vec4(vertex->co[0], vertex->co[1], vertex->co[2], 1.f);
+  glm::vec4 vertex_co_4 = glm::vec4(_collision_source->vertex_co(vert_index), 1.f);
   glm::vec3 vertex_co = glm::vec3(_collision_mtx_world * vertex_co_4);
 
   _vertices.emplace_back(Vector3D{vertex_co.x, vertex_co.y, vertex_co.z});
 
   glm::mat3 normal_mtx = glm::inverse(glm::transpose( glm::mat3(_collision_mtx_world)));
 
-  glm::vec3 normal = glm::vec3{_bl_col_vertex_normals[loop->v][0], _bl_col_vertex_normals[loop->v][1],
-                                 _bl_col_vertex_normals[loop->v][2]};
+  glm::vec3 normal = _collision_source->vertex_normal(vert_index);
   normal = glm::normalize(glm::vec3(normal_mtx * normal));
 
   _normals.emplace_back(Vector3D{normal.x, normal.y, normal.z});
 
   _tex_coords.emplace_back(Vector2D{0.f, 0.f});
 
-  if (_bl_uv2)
+  if (_mesh_source->has_uv2())
   {
     _tex_coords2.emplace_back(Vector2D{0.f, 0.f});
   }
@@ -285,25 +292,24 @@ void WMOGeometryBatcher::_create_new_collision_vert(const MVert* vertex
     _vertex_colors.emplace_back(RGBA{0x7F, 0x7F, 0x7F, 0x0});
   }
 
-  if (_bl_blendmap.exists())
+  if (_mesh_source->has_color_layer(MeshColorLayer::BLENDMAP))
   {
     _vertex_colors2.emplace_back(RGBA{0x0, 0x0, 0x0, 0x0});
   }
 
   _triangle_indices.emplace_back(v_local_index);
-  _collision_vertex_map[loop->v] = v_local_index;
+  _collision_vertex_map[vert_index] = v_local_index;
 
   _calculate_bounding_for_vertex(vertex_co);
 }
 
 void WMOGeometryBatcher::_create_new_vert(BatchVertexInfo& v_info
                                          , MOBABatch* cur_batch
-                                         , const MVert* vertex
-                                         , const MLoop* loop)
+                                         , unsigned vert_index)
 {
   v_info.local_index = _vertices.size();
 
-  glm::vec4 vertex_co_4 = glm::vec4(vertex->co[0], vertex->co[1], vertex->co[2], 1.f);
+  glm::vec4 vertex_co_4 = glm::vec4(_mesh_source->vertex_co(vert_index), 1.f);
   glm::vec3 vertex_co = glm::vec3(_mesh_mtx_world * vertex_co_4);
 
   _vertices.emplace_back(Vector3D{vertex_co.x, vertex_co.y, vertex_co.z});
@@ -313,12 +319,11 @@ void WMOGeometryBatcher::_create_new_vert(BatchVertexInfo& v_info
   glm::vec3 normal;
   if (_use_custom_normals)
   {
-    normal = glm::vec4{v_info.loop_normal.x, v_info.loop_normal.y, v_info.loop_normal.z, 0.f};
+    normal = glm::vec3{v_info.loop_normal.x, v_info.loop_normal.y, v_info.loop_normal.z};
   }
   else
   {
-    normal = glm::vec4{_bl_vertex_normals[loop->v][0], _bl_vertex_normals[loop->v][1],
-                         _bl_vertex_normals[loop->v][2], 0.f};
+    normal = _mesh_source->vertex_normal(vert_index);
   }
 
   normal = glm::normalize(normal_mtx * normal);
@@ -327,7 +332,7 @@ void WMOGeometryBatcher::_create_new_vert(BatchVertexInfo& v_info
 
   _tex_coords.emplace_back(v_info.uv);
 
-  if (_bl_uv2)
+  if (_mesh_source->has_uv2())
     _tex_coords2.emplace_back(v_info.uv2);
 
   if (_use_vertex_color)
@@ -335,18 +340,17 @@ void WMOGeometryBatcher::_create_new_vert(BatchVertexInfo& v_info
     _vertex_colors.emplace_back(v_info.col);
   }
 
-  if (_bl_blendmap.exists())
+  if (_mesh_source->has_color_layer(MeshColorLayer::BLENDMAP))
   {
     _vertex_colors2.emplace_back(v_info.col2);
   }
 
-  _cur_batch_vertex_map[loop->v].emplace_back(v_info);
+  _cur_batch_vertex_map[vert_index].emplace_back(v_info);
 
   _calculate_bounding_for_vertex(vertex_co);
   _calculate_batch_bounding_for_vertex(cur_batch, vertex_co);
 }
 
-
 bool WMOGeometryBatcher::_needs_new_vert(unsigned vert_index, BatchVertexInfo& cur_v_info)
 {
   // Checks if new vertex needs to be created for processed vertex.
@@ -382,13 +386,13 @@ bool WMOGeometryBatcher::_needs_new_vert(unsigned vert_index, BatchVertexInfo& c
 }
 
 bool WMOGeometryBatcher::_needs_new_batch(MOBABatch* cur_batch
-    , const MLoopTri* cur_tri
+    , std::size_t cur_looptri
     , BatchType cur_batch_type
     , BatchType cur_poly_batch_type
     , std::uint16_t cur_batch_mat_id)
 {
   return !cur_batch || cur_batch_type != cur_poly_batch_type
-    || _material_ids[_get_poly_material_index(cur_tri->poly)] != cur_batch_mat_id;
+    || _material_ids[_mesh_source->material_index(_mesh_source->looptri_polygon(cur_looptri))] != cur_batch_mat_id;
 }
 
 unsigned char WMOGeometryBatcher::_get_grayscale_factor(RGBA const& color)
@@ -396,20 +400,23 @@ unsigned char WMOGeometryBatcher::_get_grayscale_factor(RGBA const& color)
   return (color.r + color.g + color.b) / 3;
 }
 
-BatchType WMOGeometryBatcher::get_batch_type(const MLoopTri* poly)
+BatchType WMOGeometryBatcher::get_batch_type(std::size_t looptri_index)
 {
-  if (!_bl_batch_map_trans.exists() && !_bl_batch_map_int.exists())
+  bool has_batch_map_trans = _mesh_source->has_color_layer(MeshColorLayer::BATCH_MAP_TRANS);
+  bool has_batch_map_int = _mesh_source->has_color_layer(MeshColorLayer::BATCH_MAP_INT);
+
+  if (!has_batch_map_trans && !has_batch_map_int)
     return BatchType::EXT;
 
   unsigned trans_count = 0;
   unsigned int_count = 0;
 
-  for (int i = 0; i < 3; ++i)
+  for (unsigned loop_index : _mesh_source->looptri_loops(looptri_index))
   {
 
-    if (_bl_batch_map_trans.exists())
+    if (has_batch_map_trans)
     {
-      RGBA color = _bl_batch_map_trans[poly->tri[i]];
+      RGBA color = _mesh_source->color(MeshColorLayer::BATCH_MAP_TRANS, loop_index);
 
       if (comp_color_key(color))
       {
@@ -418,9 +425,9 @@ BatchType WMOGeometryBatcher::get_batch_type(const MLoopTri* poly)
 
     }
 
-    if (_bl_batch_map_int.exists())
+    if (has_batch_map_int)
     {
-      RGBA color = _bl_batch_map_int[poly->tri[i]];
+      RGBA color = _mesh_source->color(MeshColorLayer::BATCH_MAP_INT, loop_index);
 
       if (comp_color_key(color))
       {
@@ -443,11 +450,6 @@ BatchType WMOGeometryBatcher::get_batch_type(const MLoopTri* poly)
   }
 }
 
-std::int32_t WMOGeometryBatcher::_get_poly_material_index(std::size_t poly_index) const
-{
-  return _mesh_materials_per_poly ? _mesh_materials_per_poly[poly_index] : 0;
-}
-
 void WMOGeometryBatcher::_create_new_batch(std::uint16_t mat_id
                                           , BatchType batch_type
                                           , MOBABatch*& cur_batch
@@ -502,13 +504,13 @@ void WMOGeometryBatcher::_create_new_batch(std::uint16_t mat_id
 
 bool WMOGeometryBatcher::_is_vertex_collidable(unsigned int vert_index)
 {
-  if (!_has_collision_vg)
+  if (!_mesh_source->has_collision_group())
     return false;
 
-  return WBS_BKE_defvert_find_index(&_bl_vg_data[vert_index], _vg_collision_index);
+  return _mesh_source->is_vertex_collidable(vert_index);
 }
 
-void WMOGeometryBatcher::_create_new_render_triangle(const MLoopTri* tri, MOBABatch* cur_batch)
+void WMOGeometryBatcher::_create_new_render_triangle(std::size_t looptri_index, MOBABatch* cur_batch)
 {
   MOPYTriangleMaterial& tri_mat = _triangle_materials.emplace_back();
   tri_mat.flags_int = 0;
@@ -520,10 +522,9 @@ void WMOGeometryBatcher::_create_new_render_triangle(const MLoopTri* tri, MOBABa
 
 
   unsigned collision_counter = 0;
-  for (unsigned loop_index : tri->tri)
+  for (unsigned loop_index : _mesh_source->looptri_loops(looptri_index))
   {
-    const MLoop* loop = &_bl_loops[loop_index];
-    const MVert* vertex = &_bl_verts[loop->v];
+    unsigned vert_index = _mesh_source->loop_vertex(loop_index);
 
     BatchVertexInfo v_info{};
     v_info.col = {0x7F, 0x7F, 0x7F, 0x00};
@@ -534,12 +535,12 @@ void WMOGeometryBatcher::_create_new_render_triangle(const MLoopTri* tri, MOBABa
     _unpack_vertex(v_info, tri_mat, loop_index);
 
     // create new vertex if necessary
-    if (WMOGeometryBatcher::_needs_new_vert(loop->v, v_info))
+    if (WMOGeometryBatcher::_needs_new_vert(vert_index, v_info))
     {
-      _create_new_vert(v_info, cur_batch, vertex, loop);
+      _create_new_vert(v_info, cur_batch, vert_index);
     }
 
-    if (_is_vertex_collidable(loop->v))
+    if (_is_vertex_collidable(vert_index))
     {
       collision_counter++;
     }
@@ -554,6 +555,112 @@ void WMOGeometryBatcher::_create_new_render_triangle(const MLoopTri* tri, MOBABa
   }
 }
 
+template<typename T>
+void WMOGeometryBatcher::_reorder_vertex_range(std::vector<T>& data
+                                               , unsigned first_vertex
+                                               , std::vector<unsigned> const& old_indices)
+{
+  // optional attributes are not stored at all when unused
+  if (data.empty())
+    return;
+
+  std::vector<T> old_data(data.begin() + first_vertex, data.begin() + first_vertex + old_indices.size());
+
+  for (std::size_t i = 0; i < old_indices.size(); ++i)
+  {
+    data[first_vertex + i] = old_data[old_indices[i]];
+  }
+}
+
+void WMOGeometryBatcher::_optimize_vertex_cache()
+{
+  _acmr_before = _calculate_acmr();
+
+  for (auto& batch : _batches)
+  {
+    if (!batch.indices_count)
+      continue;
+
+    std::uint16_t* batch_indices = &_triangle_indices[batch.start_index];
+    unsigned first_vertex = batch.min_index;
+    unsigned n_vertices = batch.max_index - batch.min_index + 1;
+
+    // reorder triangles along with their materials
+    std::vector<std::uint32_t> tri_order = optimize_triangle_order(batch_indices, batch.indices_count
+                                                                   , first_vertex, n_vertices);
+
+    std::vector<std::uint16_t> old_indices(batch_indices, batch_indices + batch.indices_count);
+    std::size_t first_tri = batch.start_index / 3;
+    std::vector<MOPYTriangleMaterial> old_materials(_triangle_materials.begin() + first_tri
+                                                    , _triangle_materials.begin() + first_tri + tri_order.size());
+
+    for (std::size_t i = 0; i < tri_order.size(); ++i)
+    {
+      std::uint32_t tri = tri_order[i];
+      batch_indices[i * 3] = old_indices[tri * 3];
+      batch_indices[i * 3 + 1] = old_indices[tri * 3 + 1];
+      batch_indices[i * 3 + 2] = old_indices[tri * 3 + 2];
+      _triangle_materials[first_tri + i] = old_materials[tri];
+    }
+
+    // reorder vertices in order of first use, so that vertex fetch follows the triangle order
+    constexpr unsigned UNUSED = std::numeric_limits<unsigned>::max();
+    std::vector<unsigned> new_indices(n_vertices, UNUSED);
+    std::vector<unsigned> reordered_vertices;
+    reordered_vertices.reserve(n_vertices);
+
+    for (std::size_t i = 0; i < batch.indices_count; ++i)
+    {
+      unsigned v = batch_indices[i] - first_vertex;
+
+      if (new_indices[v] == UNUSED)
+      {
+        new_indices[v] = reordered_vertices.size();
+        reordered_vertices.push_back(v);
+      }
+
+      batch_indices[i] = first_vertex + new_indices[v];
+    }
+
+    // vertices not referenced by any triangle keep their relative order at the end of the range
+    for (unsigned v = 0; v < n_vertices; ++v)
+    {
+      if (new_indices[v] == UNUSED)
+      {
+        new_indices[v] = reordered_vertices.size();
+        reordered_vertices.push_back(v);
+      }
+    }
+
+    _reorder_vertex_range(_vertices, first_vertex, reordered_vertices);
+    _reorder_vertex_range(_normals, first_vertex, reordered_vertices);
+    _reorder_vertex_range(_tex_coords, first_vertex, reordered_vertices);
+    _reorder_vertex_range(_tex_coords2, first_vertex, reordered_vertices);
+    _reorder_vertex_range(_vertex_colors, first_vertex, reordered_vertices);
+    _reorder_vertex_range(_vertex_colors2, first_vertex, reordered_vertices);
+
+    auto [min_it, max_it] = std::minmax_element(batch_indices, batch_indices + batch.indices_count);
+    batch.min_index = *min_it;
+    batch.max_index = *max_it;
+  }
+
+  _acmr_after = _calculate_acmr();
+}
+
+float WMOGeometryBatcher::_calculate_acmr() const
+{
+  std::size_t n_misses = 0;
+  std::size_t n_indices = 0;
+
+  for (auto& batch : _batches)
+  {
+    n_misses += count_cache_misses(&_triangle_indices[batch.start_index], batch.indices_count, VERTEX_CACHE_SIZE);
+    n_indices += batch.indices_count;
+  }
+
+  return n_indices ? static_cast<float>(n_misses) / (n_indices / 3) : 0.f;
+}
+
 void WMOGeometryBatcher::_calculate_bounding_for_vertex(glm::vec3 const& vertex)
 {
   _bounding_box_min.x = std::min(_bounding_box_min.x, vertex[0]);
@@ -640,10 +747,17 @@ BufferKey WMOGeometryBatcher::bsp_faces()
   return {reinterpret_cast<char*>(_bsp_tree->faces().data()), _bsp_tree->faces().size() * sizeof(std::uint16_t)};
 }
 
+const BSPTreeStats* WMOGeometryBatcher::bsp_stats() const
+{
+  return &_bsp_tree->stats();
+}
+
 WMOGeometryBatcher::~WMOGeometryBatcher()
 {
   delete _bsp_tree;
   delete _liquid_exporter;
+  delete _mesh_source;
+  delete _collision_source;
 }
 
 BufferKey WMOGeometryBatcher::liquid_vertices()
@@ -666,77 +780,3 @@ BufferKey WMOGeometryBatcher::liquid_header()
   assert(_liquid_exporter && "Attempted accessing liquid data, but not liquid params were provided.");
   return {reinterpret_cast<char*>(&_liquid_exporter->header()), sizeof(MLIQHeader)};
 }
-
-VertexColorLayer::VertexColorLayer(const Mesh* mesh, std::string const& name)
-: _mesh(mesh)
-, _is_per_loop(false)
-, _exists(false)
-, _bl_loops(static_cast<MLoop*>(WBS_CustomData_get_layer(&_mesh->ldata, eCustomDataType::CD_MLOOP)))
-{
-  int per_loop_index = WBS_CustomData_get_named_layer_index(&mesh->ldata, name.c_str());
-
-  if (per_loop_index >= 0)
-  {
-    int type = WBS_CustomData_get_layer_type(&mesh->ldata, per_loop_index);
-
-    if (type == CD_PROP_BYTE_COLOR)
-    {
-      _exists = true;
-      _is_per_loop = true;
-      _color_layer = static_cast<MLoopCol*>(mesh->ldata.layers[per_loop_index].data);
-    }
-    else if (type == CD_PROP_COLOR)
-    {
-      _is_per_loop = true;
-      _exists = true;
-      _color_layer = static_cast<MPropCol*>(mesh->ldata.layers[per_loop_index].data);
-    }
-
-    return;
-  }
-
-  int per_vert_index = WBS_CustomData_get_named_layer_index(&mesh->vdata, name.c_str());
-
-  if (per_vert_index >= 0)
-  {
-    int type = WBS_CustomData_get_layer_type(&mesh->vdata, per_vert_index);
-
-    if (type == CD_PROP_BYTE_COLOR)
-    {
-      _exists = true;
-      _is_per_loop = false;
-      _color_layer = static_cast<MLoopCol*>(mesh->vdata.layers[per_vert_index].data);
-    }
-    else if (type == CD_PROP_COLOR)
-    {
-      _is_per_loop = false;
-      _exists = true;
-      _color_layer = static_cast<MPropCol*>(mesh->vdata.layers[per_vert_index].data);
-    }
-  }
-
-}
-
-RGBA VertexColorLayer::operator[](std::size_t index) const
-{
-  assert(_exists && "Attempt accessing non existing non-existing layer.");
-
-  if (!_is_per_loop)
-  {
-    index = _bl_loops[index].v;
-  }
-
-  if (std::holds_alternative<MLoopCol*>(_color_layer))
-  {
-    MLoopCol* col = &std::get<MLoopCol*>(_color_layer)[index];
-    return RGBA{col->r, col->g, col->b, 0xFF};
-  }
-  else
-  {
-    MPropCol* col = &std::get<MPropCol*>(_color_layer)[index];
-    return linear_to_SRGB({static_cast<unsigned char>(col->color[0] * 255.f)
-                          , static_cast<unsigned char>(col->color[1] * 255.f)
-                          , static_cast<unsigned char>(col->color[2] * 255.f)
-                          , 0xFF});
-  }
-}
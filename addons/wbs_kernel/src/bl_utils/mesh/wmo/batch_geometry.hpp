@@ -3,26 +3,18 @@
 
 #include <bl_utils/math_utils.hpp>
 #include <bl_utils/color_utils.hpp>
+#include <bl_utils/mesh/wmo/mesh_source.hpp>
 
 #include <cstdint>
 #include <vector>
-#include <string>
 #include <unordered_map>
-#include <variant>
-
-
-struct Mesh;
-struct MPoly;
-struct MLoop;
-struct MLoopCol;
-struct MPropCol;
-struct MDeformVert;
 
 
 namespace wbs_kernel::bl_utils::mesh::wmo
 {
   class BSPTree;
   class LiquidExporter;
+  struct BSPTreeStats;
 
   enum MOBAFlags
   {
@@ -121,26 +113,6 @@ namespace wbs_kernel::bl_utils::mesh::wmo
     bool is_water;
   };
 
-  struct VertexColorLayer
-  {
-    VertexColorLayer(const Mesh* mesh, std::string const& name);
-
-    [[nodiscard]]
-    bool exists() const { return _exists; };
-
-    [[nodiscard]]
-    bool is_per_loop() const { return _is_per_loop; };
-
-    color_utils::RGBA operator[] (std::size_t index) const;
-
-  private:
-    bool _exists;
-    bool _is_per_loop;
-    const Mesh* _mesh;
-    MLoop *_bl_loops;
-    std::variant<std::monostate, MLoopCol*, MPropCol*> _color_layer;
-  };
-
   class WMOGeometryBatcher
   {
   public:
@@ -153,6 +125,22 @@ namespace wbs_kernel::bl_utils::mesh::wmo
                        , bool use_custom_normals
                        , int vg_collision_index
                        , unsigned node_size
+                       , bool optimize_vertex_cache
+                       , std::vector<int> const& material_mapping
+                       , const LiquidParams* liquid_params
+    );
+
+    // Batches geometry from flat arrays, see MeshArrays. Arrays must outlive the constructor call only.
+    // Collision vertex group is given by MeshArrays::collision_weights. Liquid still requires a Blender mesh.
+    WMOGeometryBatcher(const MeshArrays* mesh_arrays
+                       , const float* mesh_matrix_world
+                       , const MeshArrays* collision_mesh_arrays
+                       , const float* collision_mesh_matrix_world
+                       , bool use_large_material_id
+                       , bool use_vertex_color
+                       , bool use_custom_normals
+                       , unsigned node_size
+                       , bool optimize_vertex_cache
                        , std::vector<int> const& material_mapping
                        , const LiquidParams* liquid_params
     );
@@ -192,6 +180,9 @@ namespace wbs_kernel::bl_utils::mesh::wmo
     [[nodiscard]]
     BufferKey bsp_faces();
 
+    [[nodiscard]]
+    const BSPTreeStats* bsp_stats() const;
+
     [[nodiscard]]
     BufferKey liquid_vertices();
 
@@ -219,19 +210,30 @@ namespace wbs_kernel::bl_utils::mesh::wmo
     [[nodiscard]]
     WMOGeometryBatcherError get_last_error() const { return _last_error; };
 
+    // Average cache miss ratio of render batches before and after vertex cache optimization, 0 if not optimized
+    [[nodiscard]]
+    float acmr_before() const { return _acmr_before; };
+
+    [[nodiscard]]
+    float acmr_after() const { return _acmr_after; };
+
   private:
 
+    // Batch geometry provided by mesh sources, shared by all constructors
+    void _batch(bool use_custom_normals
+               , unsigned node_size
+               , bool optimize_vertex_cache
+               , const LiquidParams* liquid_params);
+
     void _create_new_vert(BatchVertexInfo& v_info
                          , MOBABatch* cur_batch
-                         , const MVert* vertex
-                         , const MLoop* loop);
+                         , unsigned vert_index);
 
-    void _create_new_collision_vert(const MVert* vertex
-                                   , const MLoop* loop);
+    void _create_new_collision_vert(unsigned vert_index);
 
-    void _create_new_collision_triangle(const MLoopTri* tri);
+    void _create_new_collision_triangle(std::size_t looptri_index);
 
-    void _create_new_render_triangle(const MLoopTri* tri, MOBABatch* cur_batch);
+    void _create_new_render_triangle(std::size_t looptri_index, MOBABatch* cur_batch);
 
     // Initalize
     void _unpack_vertex(BatchVertexInfo& v_info
@@ -256,9 +258,19 @@ namespace wbs_kernel::bl_utils::mesh::wmo
 
     void _set_last_error(WMOGeometryBatcherError error) { _last_error = error; };
 
+    // Reorder triangles of each batch for post-transform vertex cache efficiency, then reorder batch vertices
+    // in order of first use to match.
+    void _optimize_vertex_cache();
+
+    [[nodiscard]]
+    float _calculate_acmr() const;
+
+    template<typename T>
+    static void _reorder_vertex_range(std::vector<T>& data, unsigned first_vertex, std::vector<unsigned> const& old_indices);
+
     [[nodiscard]]
     bool _needs_new_batch(MOBABatch* cur_batch
-        , const MLoopTri* cur_tri
+        , std::size_t cur_looptri
         , BatchType cur_batch_type
         , BatchType cur_poly_batch_type
         , std::uint16_t cur_batch_mat_id);
@@ -267,13 +279,10 @@ namespace wbs_kernel::bl_utils::mesh::wmo
     static unsigned char _get_grayscale_factor(color_utils::RGBA const& color);
 
     [[nodiscard]]
-    BatchType get_batch_type(const MLoopTri* poly);
-
-    [[nodiscard]] 
-    std::int32_t _get_poly_material_index(std::size_t poly_index) const;
+    BatchType get_batch_type(std::size_t looptri_index);
 
-    Mesh* _mesh;
-    Mesh* _collision_mesh;
+    MeshSource* _mesh_source;
+    MeshSource* _collision_source;
 
     glm::mat4 _mesh_mtx_world;
     glm::mat4 _collision_mtx_world;
@@ -302,38 +311,12 @@ namespace wbs_kernel::bl_utils::mesh::wmo
 
     WMOGeometryBatcherError _last_error;
 
-    int _vg_collision_index;
+    float _acmr_before;
+    float _acmr_after;
 
     bool _use_vertex_color;
     bool _use_large_material_id;
     bool _use_custom_normals;
-    bool _has_collision_vg;
-
-    const MLoop* _bl_loops;
-    const MVert* _bl_verts;
-    const MPoly* _bl_polygons;
-    const MLoopTri* _bl_looptris;
-    const float(*_bl_vertex_normals)[3];
-    const float(*_bl_loop_normals)[3];
-
-    VertexColorLayer _bl_batch_map_trans;
-    VertexColorLayer _bl_batch_map_int;
-    VertexColorLayer _bl_lightmap;
-    VertexColorLayer _bl_blendmap;
-    VertexColorLayer _bl_vertex_color;
-    MLoopUV* _bl_uv;
-    MLoopUV* _bl_uv2;
-    MDeformVert* _bl_vg_data;
-
-    // collision mesh data  
-    const MLoop* _bl_col_loops;
-    const MVert* _bl_col_verts;
-    const MLoopTri* _bl_col_looptris;
-    const float(*_bl_col_vertex_normals)[3];
-
-    // other attribute layers
-
-    std::int32_t* _mesh_materials_per_poly; // may be null, then mat_id is always 0 
 
     BSPTree* _bsp_tree;
     LiquidExporter* _liquid_exporter;
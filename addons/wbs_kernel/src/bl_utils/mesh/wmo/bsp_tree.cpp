@@ -1,10 +1,25 @@
 #include "bsp_tree.hpp"
 
+#include <algorithm>
 #include <cassert>
+#include <chrono>
+#include <cmath>
+#include <future>
+#include <iterator>
+#include <limits>
 
 using namespace wbs_kernel::bl_utils::mesh::wmo;
 using namespace wbs_kernel::bl_utils::math_utils;
 
+// amount of bins used for SAH split candidates per axis
+static constexpr unsigned SAH_BIN_COUNT = 16;
+
+// subtrees with fewer faces than that are not worth a separate task
+static constexpr std::size_t MIN_TASK_FACES = 4096;
+
+// amount of tree levels subtrees are spawned as separate tasks on, up to 2^MAX_TASK_DEPTH tasks
+static constexpr int MAX_TASK_DEPTH = 3;
+
 static float length(const wbs_kernel::bl_utils::math_utils::Vector3D& v)
 {
     return std::sqrt(v.x*v.x + v.y*v.y + v.z*v.z);
@@ -18,6 +33,7 @@ BSPTree::BSPTree(std::vector<math_utils::Vector3D> const& vertices
 , _triangle_indices(triangle_indices)
 , _bb_box(bb_box)
 // , _node_size(user_node_size)
+, _stats{}
 {
   // user_node_size = 0;
 
@@ -78,138 +94,215 @@ BSPTree::BSPTree(std::vector<math_utils::Vector3D> const& vertices
   // std::cout << "[BSPTree] final node_size = " << _node_size << std::endl;
 
   // 5) Build the BSP tree
+  auto build_start = std::chrono::steady_clock::now();
   _generate_bsp(computedDepth);
+  _stats.build_time_ms = std::chrono::duration<double, std::milli>(std::chrono::steady_clock::now() - build_start).count();
+
+  _calculate_stats();
 }
 
 void BSPTree::_generate_bsp(int max_depth)
 {
-  std::vector<std::uint32_t> faces;
   assert(!(_triangle_indices.size() % 3) && "Bad mesh format for BSP.");
-  faces.resize(_triangle_indices.size() / 3);
+  std::size_t n_faces = _triangle_indices.size() / 3;
+
+  // per-face bounds and vertices are computed once and reused by split selection and face distribution at every node
+  _face_bounds.resize(n_faces);
+  _face_vertices.resize(n_faces);
+  std::vector<std::uint32_t> faces;
+  faces.resize(n_faces);
 
-  for (std::size_t i = 0; i < _triangle_indices.size() / 3; ++i)
+  for (std::size_t i = 0; i < n_faces; ++i)
   {
+    std::array<Vector3D, 3> tri = {
+        _vertices[_triangle_indices[i * 3]],
+        _vertices[_triangle_indices[i * 3 + 1]],
+        _vertices[_triangle_indices[i * 3 + 2]]
+    };
+
+    auto [tri_min, tri_max] = BSPTree::_get_min_max(tri);
+    _face_bounds[i] = BoundingBox{tri_min, tri_max};
+    _face_vertices[i] = tri;
     faces[i] = i;
   }
 
-  _add_node(_bb_box, faces, max_depth); // TODO TESTING ONLY
+  BSPSubtree tree;
+  _add_node(tree, _bb_box, faces, max_depth, MAX_TASK_DEPTH);
+
+  _nodes = std::move(tree.nodes);
+  _faces = std::move(tree.faces);
+}
+
+std::int16_t BSPTree::_add_leaf(BSPSubtree& tree, std::int16_t i_node, const std::vector<std::uint32_t>& faces_in_box)
+{
+  auto& node = tree.nodes[i_node];
+  node.plane_type = BSPPlaneType::Leaf;
+  node.children[0] = -1;
+  node.children[1] = -1;
+  node.num_faces = faces_in_box.size();
+  node.first_face = tree.faces.size();
+  node.dist = 0.f;
+
+  tree.faces.insert(tree.faces.end(), faces_in_box.begin(), faces_in_box.end());
+  return i_node;
+}
+
+std::int16_t BSPTree::_merge_subtree(BSPSubtree& tree, const BSPSubtree& subtree)
+{
+  std::int16_t node_offset = tree.nodes.size();
+  std::uint32_t face_offset = tree.faces.size();
+
+  tree.nodes.reserve(tree.nodes.size() + subtree.nodes.size());
+
+  for (BSPNode node : subtree.nodes)
+  {
+    if (node.plane_type == BSPPlaneType::Leaf)
+    {
+      node.first_face += face_offset;
+    }
+    else
+    {
+      for (auto& child : node.children)
+      {
+        if (child >= 0)
+          child += node_offset;
+      }
+    }
+
+    tree.nodes.push_back(node);
+  }
+
+  tree.faces.insert(tree.faces.end(), subtree.faces.begin(), subtree.faces.end());
+  return node_offset;
 }
 
-std::int16_t BSPTree::_add_node(const BoundingBox& box, const std::vector<std::uint32_t>& faces_in_box, int depth)
+std::int16_t BSPTree::_add_node(BSPSubtree& tree
+                                , const BoundingBox& box
+                                , const std::vector<std::uint32_t>& faces_in_box
+                                , int depth
+                                , int task_depth)
 {
   // Max depth for safety, blizz WMOs rarely seem to go beyond depth 10. We're doing something really wrong if we reach that
-  // const int MAX_DEPTH = 10;
-  const int MIN_FACES = _node_size / 2;
+  const unsigned MIN_FACES = _node_size / 2;
   constexpr float MIN_SPLIT_RATIO = 0.2f;
   constexpr float MAX_DUPLICATION_RATIO = 1.3f;
 
-  // if (depth <= 0) {
-// 
-  //   //std::cout << "BSP Tree: Maximum depth reached. Stopping further subdivision." << std::endl;
-  //   BSPNode& node = _nodes.emplace_back();
-  //   node.plane_type = BSPPlaneType::Leaf;
-  //   node.children[0] = -1;
-  //   node.children[1] = -1;
-  //   node.num_faces = faces_in_box.size();
-  //   node.first_face = _faces.size();
-  //   node.dist = 0.f;
-// 
-  //   _faces.reserve(_faces.size() + distance(faces_in_box.begin(), faces_in_box.end()));
-  //   _faces.insert(_faces.end(), faces_in_box.begin(), faces_in_box.end());
-  //   return _nodes.size() - 1;
-  // }
-
-  std::int16_t i_node = _nodes.size();
-
-  BSPNode& node = _nodes.emplace_back();
-
-  uint32_t total_size  = faces_in_box.size();
-
-  // part contain less than 30 polygons, lets end this, add final node
+  std::int16_t i_node = tree.nodes.size();
+  tree.nodes.emplace_back();
+
+  std::uint32_t total_size = faces_in_box.size();
+
+  // part contains few enough polygons, lets end this, add final node
   if (depth <= 0 || total_size <= _node_size)
   {
-    node.plane_type = BSPPlaneType::Leaf;
-    node.children[0] = -1;
-    node.children[1] = -1;
-    node.num_faces = total_size;
-    node.first_face = _faces.size();
-    node.dist = 0.f;
-
-    _faces.reserve(_faces.size() + distance(faces_in_box.begin(), faces_in_box.end()));
-    _faces.insert(_faces.end(), faces_in_box.begin(), faces_in_box.end());
-    return i_node;
+    return _add_leaf(tree, i_node, faces_in_box);
   }
 
-  // split bigger side
-  float box_size_x =  box.max.x - box.min.x;
-  float box_size_y =  box.max.y - box.min.y;
-  float box_size_z =  box.max.z - box.min.z;
+  auto [plane_type, split_dist, child1_box, child2_box] = _split_box(box, faces_in_box, MIN_FACES);
 
-  BSPPlaneType plane_type;
+  // distribute faces between children. Faces entirely on one side of the split plane already overlap this box,
+  // so they can only belong to the child on that side. Only faces crossing the plane need the exact test,
+  // which is done in batches once all of them are known.
+  constexpr std::uint8_t IN_CHILD1 = 1 << 0;
+  constexpr std::uint8_t IN_CHILD2 = 1 << 1;
 
-  if (box_size_x >= box_size_y && box_size_x >= box_size_z)
-  {
-    // split on axis X (YZ plane)
-    plane_type = BSPPlaneType::YZ_plane;
-  }
-  else if ( box_size_y >= box_size_x && box_size_y >= box_size_z)
+  std::vector<std::uint8_t> face_sides(total_size, 0);
+  std::vector<std::uint32_t> crossing_faces;
+  std::vector<std::uint32_t> crossing_faces_pos;
+
+  for (std::size_t i = 0; i < total_size; ++i)
   {
-    // split on axis Y (XZ plane)
-    plane_type = BSPPlaneType::XZ_plane;
+    BoundingBox const& face_box = _face_bounds[faces_in_box[i]];
+
+    if (face_box.max[plane_type] < split_dist)
+    {
+      face_sides[i] = IN_CHILD1;
+    }
+    else if (face_box.min[plane_type] > split_dist)
+    {
+      face_sides[i] = IN_CHILD2;
+    }
+    else
+    {
+      crossing_faces.emplace_back(faces_in_box[i]);
+      crossing_faces_pos.emplace_back(i);
+    }
   }
-  else
+
+  TriangleBatch batch;
+  bool in_child1[OVERLAP_BATCH_SIZE];
+  bool in_child2[OVERLAP_BATCH_SIZE];
+
+  for (std::size_t i = 0; i < crossing_faces.size(); i += OVERLAP_BATCH_SIZE)
   {
-    // split on axis Z (XY plane)
-    plane_type = BSPPlaneType::XY_plane;
-  }
+    std::size_t n_batch_faces = std::min(OVERLAP_BATCH_SIZE, crossing_faces.size() - i);
 
-  auto [split_dist, child1_box, child2_box] = BSPTree::_split_box(box, plane_type, faces_in_box);
+    _gather_triangles(&crossing_faces[i], n_batch_faces, batch);
+    _collide_box_tris(child1_box, batch, in_child1);
+    _collide_box_tris(child2_box, batch, in_child2);
 
+    for (std::size_t j = 0; j < n_batch_faces; ++j)
+    {
+      face_sides[crossing_faces_pos[i + j]] = (in_child1[j] ? IN_CHILD1 : 0) | (in_child2[j] ? IN_CHILD2 : 0);
+    }
+  }
 
-  // caculate faces in child1 box
+  // keep the original face order within children
   std::vector<std::uint32_t> child1_faces, child2_faces;
-  for (auto f : faces_in_box)
+  child1_faces.reserve(total_size / 2);
+  child2_faces.reserve(total_size / 2);
+
+  for (std::size_t i = 0; i < total_size; ++i)
   {
-      std::array<Vector3D, 3> tri = {
-          _vertices[_triangle_indices[f * 3]],
-          _vertices[_triangle_indices[f * 3 + 1]],
-          _vertices[_triangle_indices[f * 3 + 2]]
-      };
-      if (_collide_box_tri(child1_box, tri))
-        child1_faces.emplace_back(f);
-      if (_collide_box_tri(child2_box, tri))
-        child2_faces.emplace_back(f);
+    if (face_sides[i] & IN_CHILD1)
+      child1_faces.emplace_back(faces_in_box[i]);
+    if (face_sides[i] & IN_CHILD2)
+      child2_faces.emplace_back(faces_in_box[i]);
   }
 
-  uint32_t child1_size = child1_faces.size();
-  uint32_t child2_size = child2_faces.size();
+  std::uint32_t child1_size = child1_faces.size();
+  std::uint32_t child2_size = child2_faces.size();
 
-  float duplication_ratio = (float)(child1_size + child2_size) / total_size;
-  float ratio = float(std::min(child1_size, child2_size)) / float(total_size); // distribution ratio between the two children
-  // allow up to 20% duplicated faces
-  if ( (duplication_ratio > MAX_DUPLICATION_RATIO /*&& total_size <= (_node_size * 2)*/) // detect ineffective splits, if size didn't reduce, it will recurse endlessly. Mostly caused by duplicate faces
+  float duplication_ratio = static_cast<float>(child1_size + child2_size) / total_size;
+  float ratio = static_cast<float>(std::min(child1_size, child2_size)) / static_cast<float>(total_size); // distribution ratio between the two children
+
+  // allow up to 30% duplicated faces
+  if (duplication_ratio > MAX_DUPLICATION_RATIO // detect ineffective splits, if size didn't reduce, it will recurse endlessly. Mostly caused by duplicate faces
       || child1_size < MIN_FACES || child2_size < MIN_FACES // hard minimum requirement to avoid tiny leaves.
       || (ratio < MIN_SPLIT_RATIO && total_size <= (_node_size * 1.5f)) // soft balance requirement to avoid very lopsided splits
-     ) // the 1.5 and 2.0 _node_size checks are too make sure we don't return too early on too large nodes
+     ) // the 1.5 _node_size check is to make sure we don't return too early on too large nodes
   {
-      // fallback to leaf
-      node.plane_type = BSPPlaneType::Leaf;
-      node.children[0] = -1;
-      node.children[1] = -1;
-      node.num_faces = total_size;
-      node.first_face = _faces.size();
-      node.dist = 0.f;
-  
-      _faces.reserve(_faces.size() + total_size);
-      _faces.insert(_faces.end(), faces_in_box.begin(), faces_in_box.end());
-      return i_node;
+    return _add_leaf(tree, i_node, faces_in_box);
   }
 
-  // don't add child if there is no faces inside
-  std::int16_t i_child1 = child1_faces.empty() ? -1 : _add_node(child1_box, std::move(child1_faces), depth - 1);
-  std::int16_t i_child2 = child2_faces.empty() ? -1 : _add_node(child2_box, std::move(child2_faces), depth - 1);
+  std::int16_t i_child1 = -1;
+  std::int16_t i_child2 = -1;
+
+  // large subtrees are built concurrently and appended afterwards, preserving the sequential node order
+  if (task_depth > 0 && child1_size >= MIN_TASK_FACES && child2_size >= MIN_TASK_FACES)
+  {
+    BSPSubtree subtree1, subtree2;
+
+    auto task = std::async(std::launch::async
+                           , [&]()
+                           {
+                             _add_node(subtree1, child1_box, child1_faces, depth - 1, task_depth - 1);
+                           });
+
+    _add_node(subtree2, child2_box, child2_faces, depth - 1, task_depth - 1);
+    task.get();
 
-  auto& this_node = _nodes[i_node]; // needed here because of reference invalidation
+    i_child1 = _merge_subtree(tree, subtree1);
+    i_child2 = _merge_subtree(tree, subtree2);
+  }
+  else
+  {
+    // don't add child if there is no faces inside
+    i_child1 = child1_faces.empty() ? -1 : _add_node(tree, child1_box, child1_faces, depth - 1, 0);
+    i_child2 = child2_faces.empty() ? -1 : _add_node(tree, child2_box, child2_faces, depth - 1, 0);
+  }
+
+  auto& this_node = tree.nodes[i_node]; // needed here because of reference invalidation
   this_node.plane_type = plane_type;
   this_node.children[0] = i_child1;
   this_node.children[1] = i_child2;
@@ -220,157 +313,301 @@ std::int16_t BSPTree::_add_node(const BoundingBox& box, const std::vector<std::u
   return i_node;
 }
 
-std::tuple<float, BoundingBox, BoundingBox> BSPTree::_split_box(BoundingBox const& box, BSPPlaneType axis, const std::vector<std::uint32_t>& faces_in_box)
+float BSPTree::_surface_area(const BoundingBox& box)
 {
-  assert(axis != BSPPlaneType::Leaf);
+  float dx = box.max.x - box.min.x;
+  float dy = box.max.y - box.min.y;
+  float dz = box.max.z - box.min.z;
 
-  float split_dist = 0.0f;
+  return 2.f * (dx * dy + dy * dz + dz * dx);
+}
 
-  // get average pos
-//  int count = 0;
-//  float sum = 0.0f;
-//  for (uint32_t f : faces_in_box)
-//  {
-//    sum += _vertices[_triangle_indices[f * 3]][axis];
-//    sum += _vertices[_triangle_indices[f * 3 + 1]][axis];
-//    sum += _vertices[_triangle_indices[f * 3 + 2]][axis];
-//    count ++;
-//  }
-//  split_dist = sum / count;
+std::tuple<BSPPlaneType, float, BoundingBox, BoundingBox> BSPTree::_split_box(BoundingBox const& box
+                                                                             , const std::vector<std::uint32_t>& faces_in_box
+                                                                             , unsigned min_faces) const
+{
+  constexpr float MAX_DUPLICATION_RATIO = 1.3f;
 
+  std::size_t n_faces = faces_in_box.size();
 
-  // get median position
-  std::vector<float> positions;
-  for (uint32_t f : faces_in_box)
+  BSPPlaneType best_axis = BSPPlaneType::Leaf;
+  float best_dist = 0.f;
+  float best_cost = std::numeric_limits<float>::max();
+
+  for (unsigned axis = 0; axis < 3; ++axis)
   {
-      const auto& v0 = _vertices[_triangle_indices[f * 3]];
-      const auto& v1 = _vertices[_triangle_indices[f * 3 + 1]];
-      const auto& v2 = _vertices[_triangle_indices[f * 3 + 2]];
-  
-      positions.push_back(v0[axis]);
-      positions.push_back(v1[axis]);
-      positions.push_back(v2[axis]);
+    float axis_min = box.min[axis];
+    float extent = box.max[axis] - axis_min;
+
+    if (extent <= 0.f)
+      continue;
+
+    // count faces starting and ending in each bin. A face starting left of a bin boundary lands in the left child,
+    // a face ending right of it lands in the right child, faces crossing the boundary land in both.
+    std::array<std::uint32_t, SAH_BIN_COUNT> bin_starts{};
+    std::array<std::uint32_t, SAH_BIN_COUNT> bin_ends{};
+    float bin_scale = SAH_BIN_COUNT / extent;
+
+    for (auto f : faces_in_box)
+    {
+      BoundingBox const& face_box = _face_bounds[f];
+      float start = (face_box.min[axis] - axis_min) * bin_scale;
+      float end = (face_box.max[axis] - axis_min) * bin_scale;
+
+      bin_starts[std::clamp(static_cast<int>(start), 0, static_cast<int>(SAH_BIN_COUNT) - 1)]++;
+      bin_ends[std::clamp(static_cast<int>(end), 0, static_cast<int>(SAH_BIN_COUNT) - 1)]++;
+    }
+
+    std::array<std::uint32_t, SAH_BIN_COUNT> right_counts{};
+    std::uint32_t n_right = 0;
+
+    for (int i = SAH_BIN_COUNT - 1; i >= 0; --i)
+    {
+      n_right += bin_ends[i];
+      right_counts[i] = n_right;
+    }
+
+    std::uint32_t n_left = 0;
+
+    for (unsigned i = 1; i < SAH_BIN_COUNT; ++i)
+    {
+      n_left += bin_starts[i - 1];
+      n_right = right_counts[i];
+
+      // skip candidates which would be rejected as a leaf anyway
+      if (n_left < min_faces || n_right < min_faces || !n_left || !n_right
+          || static_cast<float>(n_left + n_right) > n_faces * MAX_DUPLICATION_RATIO)
+        continue;
+
+      float dist = axis_min + extent * (static_cast<float>(i) / SAH_BIN_COUNT);
+
+      BoundingBox left_box = box;
+      left_box.max[axis] = dist;
+
+      BoundingBox right_box = box;
+      right_box.min[axis] = dist;
+
+      float cost = _surface_area(left_box) * n_left + _surface_area(right_box) * n_right;
+
+      if (cost < best_cost)
+      {
+        best_cost = cost;
+        best_axis = static_cast<BSPPlaneType>(axis);
+        best_dist = dist;
+      }
+    }
   }
-  // Sort the positions along the axis to find the median
-  std::sort(positions.begin(), positions.end());
-  // Calculate the median
-  split_dist = positions[positions.size() / 2];
-  /////
 
-  // if split is out of box, just use center
-  if (split_dist <= box.min[axis] || split_dist >= box.max[axis] || split_dist == 0.0f)
+  if (best_axis == BSPPlaneType::Leaf)
   {
-    // std::cout << "[BSPTree] split_dist out of bound = " << axis << std::endl;
-    // center of Bounding box
-    split_dist = (box.min[axis] + box.max[axis]) / 2;
+    std::tie(best_axis, best_dist) = _median_split(box, faces_in_box);
   }
 
-  // test
-  float center = (box.min[axis] + box.max[axis]) / 2.0f;
-  float offset_from_center = split_dist - center;
-  //
-
   BoundingBox new_box1 = box;
-  new_box1.max[axis] = split_dist;
+  new_box1.max[best_axis] = best_dist;
 
   BoundingBox new_box2 = box;
-  new_box2.min[axis] = split_dist;
+  new_box2.min[best_axis] = best_dist;
 
-  //split dist absolute coordinate on split axis
-  // auto ret_splitDist = split_dist - ((box.min[axis] + box.max[axis]) / 2);
-
-  return {split_dist, new_box1, new_box2};
+  return {best_axis, best_dist, new_box1, new_box2};
 }
 
-bool BSPTree::_collide_box_tri(const BoundingBox& box, const std::array<math_utils::Vector3D, 3>& tri)
+std::pair<BSPPlaneType, float> BSPTree::_median_split(BoundingBox const& box
+                                                      , const std::vector<std::uint32_t>& faces_in_box) const
 {
-  auto [triangle_min, triangle_max] = BSPTree::_get_min_max(tri);
+  // split bigger side
+  float box_size_x = box.max.x - box.min.x;
+  float box_size_y = box.max.y - box.min.y;
+  float box_size_z = box.max.z - box.min.z;
+
+  BSPPlaneType axis;
 
-  // check if overlap on box axis
-  if (!BSPTree::_proj_overlap(box.min.x, box.max.x, triangle_min.x, triangle_max.x)
-    || !BSPTree::_proj_overlap(box.min.y, box.max.y, triangle_min.y, triangle_max.y)
-    || !BSPTree::_proj_overlap(box.min.z, box.max.z, triangle_min.z, triangle_max.z))
+  if (box_size_x >= box_size_y && box_size_x >= box_size_z)
+  {
+    // split on axis X (YZ plane)
+    axis = BSPPlaneType::YZ_plane;
+  }
+  else if (box_size_y >= box_size_x && box_size_y >= box_size_z)
   {
-    return false;
+    // split on axis Y (XZ plane)
+    axis = BSPPlaneType::XZ_plane;
+  }
+  else
+  {
+    // split on axis Z (XY plane)
+    axis = BSPPlaneType::XY_plane;
   }
 
-  std::vector<Vector3D> pt_box = {
-      box.min,
-      Vector3D{box.min.x, box.max.y, box.min.z},
-      Vector3D{box.max.x, box.max.y, box.min.z},
-      Vector3D{box.max.x, box.min.y, box.min.z},
-      box.max,
-      Vector3D{box.min.x, box.max.y, box.max.z},
-      Vector3D{box.max.x, box.max.y, box.max.z},
-      Vector3D{box.max.x, box.min.y, box.max.z}
-  };
+  // get median position of face centers
+  std::vector<float> positions;
+  positions.reserve(faces_in_box.size());
 
-  // project on edge 1 axis
-  Vector3D E0 = tri[1] - tri[0];
+  for (uint32_t f : faces_in_box)
+  {
+    BoundingBox const& face_box = _face_bounds[f];
+    positions.push_back((face_box.min[axis] + face_box.max[axis]) * 0.5f);
+  }
 
-  std::vector<Vector3D> pt_box_projected;
-  std::vector<Vector3D> pt_triangle_projected;
+  auto median = positions.begin() + positions.size() / 2;
+  std::nth_element(positions.begin(), median, positions.end());
+  float split_dist = *median;
 
-  for (auto& pt : pt_box)
+  // if split is out of box, just use center
+  if (split_dist <= box.min[axis] || split_dist >= box.max[axis] || split_dist == 0.0f)
   {
-    pt_box_projected.emplace_back(BSPTree::_project_point(pt, E0));
+    // center of Bounding box
+    split_dist = (box.min[axis] + box.max[axis]) / 2;
   }
 
-  for (auto& pt : tri)
+  return {axis, split_dist};
+}
+
+void BSPTree::_calculate_stats()
+{
+  _stats.n_nodes = _nodes.size();
+  _stats.n_leaves = 0;
+  _stats.depth = 0;
+  _stats.min_leaf_faces = 0;
+  _stats.max_leaf_faces = 0;
+  _stats.avg_leaf_faces = 0.f;
+  _stats.n_face_refs = _faces.size();
+
+  if (_nodes.empty())
+    return;
+
+  _stats.min_leaf_faces = std::numeric_limits<std::uint32_t>::max();
+
+  std::vector<std::pair<std::int16_t, std::uint32_t>> stack = {{0, 1}};
+
+  while (!stack.empty())
   {
-    pt_triangle_projected.emplace_back(BSPTree::_project_point(pt, E0));
+    auto [i_node, node_depth] = stack.back();
+    stack.pop_back();
+
+    BSPNode const& node = _nodes[i_node];
+    _stats.depth = std::max(_stats.depth, node_depth);
+
+    if (node.plane_type == BSPPlaneType::Leaf)
+    {
+      _stats.n_leaves++;
+      _stats.min_leaf_faces = std::min<std::uint32_t>(_stats.min_leaf_faces, node.num_faces);
+      _stats.max_leaf_faces = std::max<std::uint32_t>(_stats.max_leaf_faces, node.num_faces);
+      continue;
+    }
+
+    for (auto child : node.children)
+    {
+      if (child >= 0)
+        stack.emplace_back(child, node_depth + 1);
+    }
   }
 
-  auto [E0_pt_box_min, E0_pt_box_max] = BSPTree::_get_min_max(pt_box_projected);
-  auto [E0_pt_tri_min, E0_pt_tri_max] = BSPTree::_get_min_max(pt_triangle_projected);
-  if (BSPTree::_check_overlaps(E0_pt_box_min, E0_pt_box_max
-                               , E0_pt_tri_min, E0_pt_tri_max))
-    return false;
+  _stats.avg_leaf_faces = _stats.n_leaves ? static_cast<float>(_stats.n_face_refs) / _stats.n_leaves : 0.f;
+}
 
-  // project on edge 2 axis
-  Vector3D E1 = tri[2] - tri[1];
-  pt_box_projected.clear();
-  pt_triangle_projected.clear();
+void BSPTree::_gather_triangles(std::uint32_t const* faces, std::size_t n_faces, TriangleBatch& batch) const
+{
+  assert(n_faces > 0 && n_faces <= OVERLAP_BATCH_SIZE);
 
-  for (auto& pt : pt_box)
+  for (std::size_t lane = 0; lane < OVERLAP_BATCH_SIZE; ++lane)
   {
-    pt_box_projected.emplace_back(BSPTree::_project_point(pt, E1));
+    auto const& tri = _face_vertices[faces[std::min(lane, n_faces - 1)]];
+
+    for (int i_vert = 0; i_vert < 3; ++i_vert)
+    {
+      for (int axis = 0; axis < 3; ++axis)
+      {
+        batch.co[i_vert][axis][lane] = tri[i_vert][axis];
+      }
+    }
   }
+}
+
+void BSPTree::_collide_box_tris(BoundingBox const& box
+                                , TriangleBatch const& batch
+                                , bool (&result)[OVERLAP_BATCH_SIZE])
+{
+  constexpr std::size_t N = OVERLAP_BATCH_SIZE;
 
-  for (auto& pt : tri)
+  float center[3];
+  float half_size[3];
+
+  for (int axis = 0; axis < 3; ++axis)
   {
-    pt_triangle_projected.emplace_back(BSPTree::_project_point(pt, E1));
+    center[axis] = (box.min[axis] + box.max[axis]) * 0.5f;
+    half_size[axis] = (box.max[axis] - box.min[axis]) * 0.5f;
   }
 
-  auto [E1_pt_box_min, E1_pt_box_max] = BSPTree::_get_min_max(pt_box_projected);
-  auto [E1_pt_tri_min, E1_pt_tri_max] = BSPTree::_get_min_max(pt_triangle_projected);
-  if (BSPTree::_check_overlaps(E1_pt_box_min, E1_pt_box_max
-      , E1_pt_tri_min, E1_pt_tri_max))
-    return false;
+  // vertices relative to box center, and triangle edges
+  float v[3][3][N];
+  float e[3][3][N];
+
+  for (int i_vert = 0; i_vert < 3; ++i_vert)
+    for (int axis = 0; axis < 3; ++axis)
+      for (std::size_t lane = 0; lane < N; ++lane)
+        v[i_vert][axis][lane] = batch.co[i_vert][axis][lane] - center[axis];
+
+  for (int i_edge = 0; i_edge < 3; ++i_edge)
+    for (int axis = 0; axis < 3; ++axis)
+      for (std::size_t lane = 0; lane < N; ++lane)
+        e[i_edge][axis][lane] = v[(i_edge + 1) % 3][axis][lane] - v[i_edge][axis][lane];
 
-  // project on edge 3 axis
-  Vector3D E2 = tri[0] - tri[2];
-  pt_box_projected.clear();
-  pt_triangle_projected.clear();
+  // lanes are never early-outed, overlap is accumulated over all axes
+  std::uint8_t overlap[N];
+  std::fill(std::begin(overlap), std::end(overlap), 1);
 
-  for (auto& pt : pt_box)
+  // box face normals, same as comparing triangle bounds with the box
+  for (int axis = 0; axis < 3; ++axis)
   {
-    pt_box_projected.emplace_back(BSPTree::_project_point(pt, E2));
+    for (std::size_t lane = 0; lane < N; ++lane)
+    {
+      float p_min = std::min({v[0][axis][lane], v[1][axis][lane], v[2][axis][lane]});
+      float p_max = std::max({v[0][axis][lane], v[1][axis][lane], v[2][axis][lane]});
+      overlap[lane] &= (p_min <= half_size[axis]) & (p_max >= -half_size[axis]);
+    }
   }
 
-  for (auto& pt : tri)
+  // cross products of box axes and triangle edges
+  for (int i_edge = 0; i_edge < 3; ++i_edge)
   {
-    pt_triangle_projected.emplace_back(BSPTree::_project_point(pt, E2));
+    for (int axis = 0; axis < 3; ++axis)
+    {
+      int a1 = (axis + 1) % 3;
+      int a2 = (axis + 2) % 3;
+
+      for (std::size_t lane = 0; lane < N; ++lane)
+      {
+        // box axis crossed with the edge, e.g. (0, -e.z, e.y) for X
+        float e1 = e[i_edge][a1][lane];
+        float e2 = e[i_edge][a2][lane];
+
+        float p0 = e1 * v[0][a2][lane] - e2 * v[0][a1][lane];
+        float p1 = e1 * v[1][a2][lane] - e2 * v[1][a1][lane];
+        float p2 = e1 * v[2][a2][lane] - e2 * v[2][a1][lane];
+        float r = half_size[a1] * std::fabs(e2) + half_size[a2] * std::fabs(e1);
+
+        overlap[lane] &= (std::min({p0, p1, p2}) <= r) & (std::max({p0, p1, p2}) >= -r);
+      }
+    }
   }
 
-  auto [E2_pt_box_min, E2_pt_box_max] = BSPTree::_get_min_max(pt_box_projected);
-  auto [E2_pt_tri_min, E2_pt_tri_max] = BSPTree::_get_min_max(pt_triangle_projected);
-  if (BSPTree::_check_overlaps(E2_pt_box_min, E2_pt_box_max
-      , E2_pt_tri_min, E2_pt_tri_max)
-      || !BSPTree::_plane_box_overlap(E0.cross(E1), tri[0], box))
-    return false;
+  // triangle plane
+  for (std::size_t lane = 0; lane < N; ++lane)
+  {
+    float n_x = e[0][1][lane] * e[1][2][lane] - e[0][2][lane] * e[1][1][lane];
+    float n_y = e[0][2][lane] * e[1][0][lane] - e[0][0][lane] * e[1][2][lane];
+    float n_z = e[0][0][lane] * e[1][1][lane] - e[0][1][lane] * e[1][0][lane];
+
+    float d = n_x * v[0][0][lane] + n_y * v[0][1][lane] + n_z * v[0][2][lane];
+    float r = half_size[0] * std::fabs(n_x) + half_size[1] * std::fabs(n_y) + half_size[2] * std::fabs(n_z);
 
-  return true;
+    overlap[lane] &= std::fabs(d) <= r;
+  }
+
+  for (std::size_t lane = 0; lane < N; ++lane)
+  {
+    result[lane] = overlap[lane];
+  }
 }
 
 template<typename T>
@@ -400,78 +637,3 @@ std::pair<Vector3D, Vector3D> BSPTree::_get_min_max(T const& vert_array)
 
   return {min, max};
 }
-
-bool BSPTree::_proj_overlap(float poly1_min, float poly1_max, float poly2_min, float poly2_max)
-{
-  return !(poly1_max < poly2_min || poly2_max < poly1_min);
-}
-
-bool BSPTree::_check_overlaps(Vector3D const& projected_box_min, Vector3D const& projected_box_max,
-                               Vector3D const& projected_triangle_min, Vector3D const& projected_triangle_max)
-{
-  return (!BSPTree::_proj_overlap(projected_box_min.x,
-                              projected_box_max.x,
-                              projected_triangle_min.x,
-                              projected_triangle_max.x)
-    || !BSPTree::_proj_overlap(projected_box_min.y,
-                               projected_box_max.y,
-                               projected_triangle_min.y,
-                               projected_triangle_max.y)
-    || !BSPTree::_proj_overlap(projected_box_min.z,
-                               projected_box_max.z,
-                               projected_triangle_min.z,
-                               projected_triangle_max.z));
-}
-
-Vector3D BSPTree::_project_point(Vector3D const& pt, Vector3D const & v)
-{
-  Vector3D proj{};
-  float l;
-
-  // project on X
-  if (math_utils::compare_ff(v.y, 0.f, STD_UV_CONNECT_LIMIT))
-    l = 0;
-  else
-  {
-    l = -pt.y / v.y;
-  }
-  proj.z = pt.x + l * v.x;
-
-  //project on Y
-  if (math_utils::compare_ff(v.z, 0.f, STD_UV_CONNECT_LIMIT))
-    l = 0;
-  else
-  {
-    l = -pt.z / v.z;
-  }
-
-  proj.y = pt.x + l * v.x;
-  // project on Z
-  proj.x = pt.y + l * v.y;
-
-  return proj;
-}
-
-bool BSPTree::_plane_box_overlap(Vector3D const& normal, Vector3D const& vert, BoundingBox const& box)
-{
-  //Vector3D v_min;
-  Vector3D v_max{};
-
-  for (int i = 0; i < 3; ++i)
-  {
-    float v = vert[i];
-
-    if (normal[i] > 0.f)
-    {
-      //v_min[i] = box.min[i] - v;
-      v_max[i] = box.max[i] - v;
-    }
-    else
-    {
-      //v_min[i] = box.max[i] - v;
-      v_max[i]= box.min[i] - v;
-    }
-  }
-
-  return normal.dot(v_max) >= 0.f;
-}
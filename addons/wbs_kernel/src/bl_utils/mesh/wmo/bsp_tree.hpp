@@ -7,6 +7,7 @@
 #include <vector>
 #include <tuple>
 #include <array>
+#include <utility>
 
 namespace wbs_kernel::bl_utils::mesh::wmo
 {
@@ -33,6 +34,19 @@ namespace wbs_kernel::bl_utils::mesh::wmo
     math_utils::Vector3D max;
   };
 
+  // Build statistics, used to compare generated trees between exports
+  struct BSPTreeStats
+  {
+    double build_time_ms;
+    std::uint32_t n_nodes;
+    std::uint32_t n_leaves;
+    std::uint32_t depth;
+    std::uint32_t min_leaf_faces;
+    std::uint32_t max_leaf_faces;
+    float avg_leaf_faces;
+    std::uint32_t n_face_refs; // total amount of faces referenced by leaves, including duplicates
+  };
+
   class BSPTree
   {
   public:
@@ -47,47 +61,78 @@ namespace wbs_kernel::bl_utils::mesh::wmo
     [[nodiscard]]
     std::vector<std::uint16_t>& faces() { return _faces; };
 
+    [[nodiscard]]
+    BSPTreeStats const& stats() const { return _stats; };
+
   private:
 
+    // Nodes and faces of a subtree, node and face indices are local to it
+    struct BSPSubtree
+    {
+      std::vector<BSPNode> nodes;
+      std::vector<std::uint16_t> faces;
+    };
+
     void _generate_bsp(int max_depth);
-    std::int16_t _add_node(BoundingBox  const& box, std::vector<std::uint32_t> const& faces_in_box, int depth);
+    std::int16_t _add_node(BSPSubtree& tree
+                           , BoundingBox const& box
+                           , std::vector<std::uint32_t> const& faces_in_box
+                           , int depth
+                           , int task_depth);
 
-    // Return true if AABB and triangle overlap
-    [[nodiscard]]
-    static bool _collide_box_tri(BoundingBox const& box, std::array<math_utils::Vector3D, 3> const& tri);
+    static std::int16_t _add_leaf(BSPSubtree& tree, std::int16_t i_node, std::vector<std::uint32_t> const& faces_in_box);
 
-    template<typename T>
-    [[nodiscard]]
-    static std::pair<math_utils::Vector3D, math_utils::Vector3D> _get_min_max(T const& vert_array);
+    // append subtree to tree, returns index of the subtree root in tree
+    static std::int16_t _merge_subtree(BSPSubtree& tree, BSPSubtree const& subtree);
 
-    [[nodiscard]]
-    static bool _proj_overlap(float poly1_min, float poly1_max, float poly2_min, float poly2_max);
+    void _calculate_stats();
+
+    // amount of triangles tested against a box at once, lanes are laid out for the compiler to vectorize
+    static constexpr std::size_t OVERLAP_BATCH_SIZE = 8;
+
+    // triangle vertices in SoA layout, unused lanes repeat the last triangle
+    struct TriangleBatch
+    {
+      float co[3][3][OVERLAP_BATCH_SIZE]; // [vertex][axis][lane]
+    };
+
+    void _gather_triangles(std::uint32_t const* faces, std::size_t n_faces, TriangleBatch& batch) const;
+
+    // Set result[lane] to true if AABB and triangle overlap, separating axis test
+    static void _collide_box_tris(BoundingBox const& box
+                                  , TriangleBatch const& batch
+                                  , bool (&result)[OVERLAP_BATCH_SIZE]);
 
+    template<typename T>
     [[nodiscard]]
-    static bool _check_overlaps(math_utils::Vector3D const& projected_box_min
-                                , math_utils::Vector3D const& projected_box_max
-                                , math_utils::Vector3D const& projected_triangle_min
-                                , math_utils::Vector3D const& projected_triangle_max);
+    static std::pair<math_utils::Vector3D, math_utils::Vector3D> _get_min_max(T const& vert_array);
 
+    // split box in two smaller ones, axis and dist are picked internally using binned SAH
     [[nodiscard]]
-    static math_utils::Vector3D _project_point(math_utils::Vector3D const& pt, math_utils::Vector3D const& v);
+    std::tuple<BSPPlaneType, float, BoundingBox, BoundingBox> _split_box(BoundingBox const& box
+                                                                         , const std::vector<std::uint32_t>& faces_in_box
+                                                                         , unsigned min_faces) const;
 
+    // fallback split of the longest box side at the median of face centers
     [[nodiscard]]
-    static bool _plane_box_overlap(math_utils::Vector3D const& normal
-                                   , math_utils::Vector3D const& vert
-                                   , BoundingBox const& box);
+    std::pair<BSPPlaneType, float> _median_split(BoundingBox const& box
+                                                 , const std::vector<std::uint32_t>& faces_in_box) const;
 
-    // split box in two smaller ones, at dist calculated internally
     [[nodiscard]]
-    std::tuple<float, BoundingBox, BoundingBox> _split_box(BoundingBox const& box, BSPPlaneType axis, const std::vector<std::uint32_t>& faces_in_box);
+    static float _surface_area(BoundingBox const& box);
 
     std::vector<math_utils::Vector3D> const& _vertices;
     std::vector<std::uint16_t> const& _triangle_indices;
     BoundingBox const& _bb_box;
     unsigned _node_size;
 
+    std::vector<BoundingBox> _face_bounds;
+    std::vector<std::array<math_utils::Vector3D, 3>> _face_vertices;
+
     std::vector<BSPNode> _nodes;
     std::vector<std::uint16_t> _faces;
+
+    BSPTreeStats _stats;
   };
 }
 
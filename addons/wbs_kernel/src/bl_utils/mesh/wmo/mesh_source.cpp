@@ -0,0 +1,256 @@
+#include "mesh_source.hpp"
+#include <bl_utils/mesh/custom_data.hpp>
+
+#include <cassert>
+
+#include <BKE_mesh_types.h>
+#include <DNA_mesh_types.h>
+#include <DNA_meshdata_types.h>
+#include <DNA_ID.h>
+#include <BKE_customdata.h>
+
+using namespace wbs_kernel::bl_utils::math_utils;
+using namespace wbs_kernel::bl_utils::color_utils;
+using namespace wbs_kernel::bl_utils::mesh::wmo;
+using namespace wbs_kernel::bl_utils::mesh;
+
+
+BlenderMeshSource::BlenderMeshSource(std::uintptr_t mesh_ptr, int vg_collision_index)
+: _mesh(reinterpret_cast<Mesh*>(mesh_ptr))
+, _vg_collision_index(vg_collision_index)
+, _bl_loops(static_cast<MLoop*>(WBS_CustomData_get_layer(&_mesh->ldata, eCustomDataType::CD_MLOOP)))
+, _bl_verts(static_cast<MVert*>(WBS_CustomData_get_layer(&_mesh->vdata, eCustomDataType::CD_MVERT)))
+, _bl_looptris(_mesh->runtime->looptris.array)
+, _bl_vertex_normals(reinterpret_cast<const float(*)[3]>(_mesh->runtime->vert_normals))
+, _bl_loop_normals(nullptr)
+, _bl_uv(get_custom_data_layer_named<MLoopUV>(&_mesh->ldata, "UVMap"))
+, _bl_uv2(get_custom_data_layer_named<MLoopUV>(&_mesh->ldata, "UVMap.001"))
+, _bl_vg_data(nullptr)
+, _mesh_materials_per_poly(static_cast<std::int32_t*>(WBS_CustomData_get_layer_named(&_mesh->pdata, eCustomDataType::CD_PROP_INT32, "material_index")))
+, _color_layers{VertexColorLayer(_mesh, "BatchmapTrans")
+                , VertexColorLayer(_mesh, "BatchmapInt")
+                , VertexColorLayer(_mesh, "Lightmap")
+                , VertexColorLayer(_mesh, "Blendmap")
+                , VertexColorLayer(_mesh, "Col")}
+{
+  assert(!_mesh->runtime->vert_normals_dirty && "Vertex normals were not calculated for mesh.");
+  assert(!_mesh->runtime->poly_normals_dirty && "Poly normals were not calculated for mesh.");
+
+  if (_vg_collision_index >= 0)
+  {
+    _bl_vg_data = static_cast<MDeformVert*>(WBS_CustomData_get_layer(&_mesh->vdata,
+                                                                     eCustomDataType::CD_MDEFORMVERT));
+  }
+
+  // custom normals
+  if (WBS_CustomData_has_layer(&_mesh->ldata, eCustomDataType::CD_CUSTOMLOOPNORMAL))
+  {
+    _bl_loop_normals = reinterpret_cast<const float(*)[3]>(WBS_CustomData_get_layer(&_mesh->ldata,
+                                                                                    eCustomDataType::CD_NORMAL));
+  }
+}
+
+std::size_t BlenderMeshSource::n_looptris() const
+{
+  return _mesh->totloop - (_mesh->totpoly * 2);
+}
+
+std::array<unsigned, 3> BlenderMeshSource::looptri_loops(std::size_t looptri_index) const
+{
+  const MLoopTri* tri = &_bl_looptris[looptri_index];
+  return {tri->tri[0], tri->tri[1], tri->tri[2]};
+}
+
+unsigned BlenderMeshSource::looptri_polygon(std::size_t looptri_index) const
+{
+  return _bl_looptris[looptri_index].poly;
+}
+
+unsigned BlenderMeshSource::loop_vertex(std::size_t loop_index) const
+{
+  return _bl_loops[loop_index].v;
+}
+
+glm::vec3 BlenderMeshSource::vertex_co(std::size_t vertex_index) const
+{
+  const MVert* vertex = &_bl_verts[vertex_index];
+  return {vertex->co[0], vertex->co[1], vertex->co[2]};
+}
+
+glm::vec3 BlenderMeshSource::vertex_normal(std::size_t vertex_index) const
+{
+  return {_bl_vertex_normals[vertex_index][0], _bl_vertex_normals[vertex_index][1],
+          _bl_vertex_normals[vertex_index][2]};
+}
+
+std::int32_t BlenderMeshSource::material_index(std::size_t polygon_index) const
+{
+  return _mesh_materials_per_poly ? _mesh_materials_per_poly[polygon_index] : 0;
+}
+
+Vector3D BlenderMeshSource::loop_normal(std::size_t loop_index) const
+{
+  assert(_bl_loop_normals && "Attempted accessing non-existing custom normals.");
+  return {_bl_loop_normals[loop_index][0], _bl_loop_normals[loop_index][1], _bl_loop_normals[loop_index][2]};
+}
+
+Vector2D BlenderMeshSource::uv(std::size_t loop_index) const
+{
+  return {_bl_uv[loop_index].uv[0], _bl_uv[loop_index].uv[1]};
+}
+
+Vector2D BlenderMeshSource::uv2(std::size_t loop_index) const
+{
+  return {_bl_uv2[loop_index].uv[0], _bl_uv2[loop_index].uv[1]};
+}
+
+RGBA BlenderMeshSource::color(MeshColorLayer layer, std::size_t loop_index) const
+{
+  return _color_layers[layer][loop_index];
+}
+
+bool BlenderMeshSource::is_vertex_collidable(std::size_t vertex_index) const
+{
+  if (!_bl_vg_data)
+    return false;
+
+  return WBS_BKE_defvert_find_index(&_bl_vg_data[vertex_index], _vg_collision_index);
+}
+
+std::array<unsigned, 3> ArrayMeshSource::looptri_loops(std::size_t looptri_index) const
+{
+  const std::int32_t* tri = &_arrays.looptri_loops[looptri_index * 3];
+  return {static_cast<unsigned>(tri[0]), static_cast<unsigned>(tri[1]), static_cast<unsigned>(tri[2])};
+}
+
+unsigned ArrayMeshSource::looptri_polygon(std::size_t looptri_index) const
+{
+  return _arrays.looptri_polygons[looptri_index];
+}
+
+unsigned ArrayMeshSource::loop_vertex(std::size_t loop_index) const
+{
+  return _arrays.loop_vertex_indices[loop_index];
+}
+
+glm::vec3 ArrayMeshSource::vertex_co(std::size_t vertex_index) const
+{
+  const float* co = &_arrays.positions[vertex_index * 3];
+  return {co[0], co[1], co[2]};
+}
+
+glm::vec3 ArrayMeshSource::vertex_normal(std::size_t vertex_index) const
+{
+  const float* normal = &_arrays.vertex_normals[vertex_index * 3];
+  return {normal[0], normal[1], normal[2]};
+}
+
+std::int32_t ArrayMeshSource::material_index(std::size_t polygon_index) const
+{
+  return _arrays.material_indices ? _arrays.material_indices[polygon_index] : 0;
+}
+
+Vector3D ArrayMeshSource::loop_normal(std::size_t loop_index) const
+{
+  assert(_arrays.loop_normals && "Attempted accessing non-existing custom normals.");
+  const float* normal = &_arrays.loop_normals[loop_index * 3];
+  return {normal[0], normal[1], normal[2]};
+}
+
+Vector2D ArrayMeshSource::uv(std::size_t loop_index) const
+{
+  return {_arrays.uv[loop_index * 2], _arrays.uv[loop_index * 2 + 1]};
+}
+
+Vector2D ArrayMeshSource::uv2(std::size_t loop_index) const
+{
+  return {_arrays.uv2[loop_index * 2], _arrays.uv2[loop_index * 2 + 1]};
+}
+
+RGBA ArrayMeshSource::color(MeshColorLayer layer, std::size_t loop_index) const
+{
+  assert(_arrays.colors[layer] && "Attempt accessing non-existing layer.");
+  const std::uint8_t* col = &_arrays.colors[layer][loop_index * 4];
+
+  // alpha is ignored, same as for Blender byte color layers
+  return RGBA{col[0], col[1], col[2], 0xFF};
+}
+
+bool ArrayMeshSource::is_vertex_collidable(std::size_t vertex_index) const
+{
+  return _arrays.collision_weights && _arrays.collision_weights[vertex_index] > 0.f;
+}
+
+VertexColorLayer::VertexColorLayer(const Mesh* mesh, std::string const& name)
+: _mesh(mesh)
+, _is_per_loop(false)
+, _exists(false)
+, _bl_loops(static_cast<MLoop*>(WBS_CustomData_get_layer(&_mesh->ldata, eCustomDataType::CD_MLOOP)))
+{
+  int per_loop_index = WBS_CustomData_get_named_layer_index(&mesh->ldata, name.c_str());
+
+  if (per_loop_index >= 0)
+  {
+    int type = WBS_CustomData_get_layer_type(&mesh->ldata, per_loop_index);
+
+    if (type == CD_PROP_BYTE_COLOR)
+    {
+      _exists = true;
+      _is_per_loop = true;
+      _color_layer = static_cast<MLoopCol*>(mesh->ldata.layers[per_loop_index].data);
+    }
+    else if (type == CD_PROP_COLOR)
+    {
+      _is_per_loop = true;
+      _exists = true;
+      _color_layer = static_cast<MPropCol*>(mesh->ldata.layers[per_loop_index].data);
+    }
+
+    return;
+  }
+
+  int per_vert_index = WBS_CustomData_get_named_layer_index(&mesh->vdata, name.c_str());
+
+  if (per_vert_index >= 0)
+  {
+    int type = WBS_CustomData_get_layer_type(&mesh->vdata, per_vert_index);
+
+    if (type == CD_PROP_BYTE_COLOR)
+    {
+      _exists = true;
+      _is_per_loop = false;
+      _color_layer = static_cast<MLoopCol*>(mesh->vdata.layers[per_vert_index].data);
+    }
+    else if (type == CD_PROP_COLOR)
+    {
+      _is_per_loop = false;
+      _exists = true;
+      _color_layer = static_cast<MPropCol*>(mesh->vdata.layers[per_vert_index].data);
+    }
+  }
+
+}
+
+RGBA VertexColorLayer::operator[](std::size_t index) const
+{
+  assert(_exists && "Attempt accessing non existing non-existing layer.");
+
+  if (!_is_per_loop)
+  {
+    index = _bl_loops[index].v;
+  }
+
+  if (std::holds_alternative<MLoopCol*>(_color_layer))
+  {
+    MLoopCol* col = &std::get<MLoopCol*>(_color_layer)[index];
+    return RGBA{col->r, col->g, col->b, 0xFF};
+  }
+  else
+  {
+    MPropCol* col = &std::get<MPropCol*>(_color_layer)[index];
+    return linear_to_SRGB({static_cast<unsigned char>(col->color[0] * 255.f)
+                          , static_cast<unsigned char>(col->color[1] * 255.f)
+                          , static_cast<unsigned char>(col->color[2] * 255.f)
+                          , 0xFF});
+  }
+}
@@ -0,0 +1,280 @@
+#ifndef WBS_KERNEL_MESH_SOURCE_HPP
+#define WBS_KERNEL_MESH_SOURCE_HPP
+
+#include <bl_utils/math_utils.hpp>
+#include <bl_utils/color_utils.hpp>
+
+#include <cstdint>
+#include <array>
+#include <string>
+#include <variant>
+
+
+struct Mesh;
+struct MLoop;
+struct MVert;
+struct MLoopTri;
+struct MLoopUV;
+struct MLoopCol;
+struct MPropCol;
+struct MDeformVert;
+
+
+namespace wbs_kernel::bl_utils::mesh::wmo
+{
+  enum MeshColorLayer
+  {
+    BATCH_MAP_TRANS = 0,
+    BATCH_MAP_INT = 1,
+    LIGHTMAP = 2,
+    BLENDMAP = 3,
+    VERTEX_COLOR = 4,
+    N_COLOR_LAYERS = 5
+  };
+
+  // Flat mesh data, as gathered with foreach_get() on Blender meshes. Optional arrays are nullptr when absent.
+  struct MeshArrays
+  {
+    std::size_t n_vertices;
+    std::size_t n_loops;
+    std::size_t n_looptris;
+    std::size_t n_polygons;
+
+    const float* positions;                   // n_vertices * 3
+    const float* vertex_normals;              // n_vertices * 3
+    const std::int32_t* loop_vertex_indices;  // n_loops
+    const std::int32_t* looptri_loops;        // n_looptris * 3
+    const std::int32_t* looptri_polygons;     // n_looptris
+    const std::int32_t* material_indices;     // n_polygons, optional
+    const float* loop_normals;                // n_loops * 3, optional
+    const float* uv;                          // n_loops * 2, optional
+    const float* uv2;                         // n_loops * 2, optional
+    const std::uint8_t* colors[N_COLOR_LAYERS]; // n_loops * 4, sRGB RGBA per loop, optional
+    const float* collision_weights;           // n_vertices, vertex is collidable if weight > 0, optional
+  };
+
+  // Read access to mesh geometry used by WMOGeometryBatcher, independent of where the data is stored.
+  class MeshSource
+  {
+  public:
+    virtual ~MeshSource() = default;
+
+    [[nodiscard]]
+    virtual std::size_t n_looptris() const = 0;
+
+    [[nodiscard]]
+    virtual std::array<unsigned, 3> looptri_loops(std::size_t looptri_index) const = 0;
+
+    [[nodiscard]]
+    virtual unsigned looptri_polygon(std::size_t looptri_index) const = 0;
+
+    [[nodiscard]]
+    virtual unsigned loop_vertex(std::size_t loop_index) const = 0;
+
+    [[nodiscard]]
+    virtual glm::vec3 vertex_co(std::size_t vertex_index) const = 0;
+
+    [[nodiscard]]
+    virtual glm::vec3 vertex_normal(std::size_t vertex_index) const = 0;
+
+    [[nodiscard]]
+    virtual bool has_material_indices() const = 0;
+
+    // 0 if mesh has no material indices
+    [[nodiscard]]
+    virtual std::int32_t material_index(std::size_t polygon_index) const = 0;
+
+    [[nodiscard]]
+    virtual bool has_loop_normals() const = 0;
+
+    [[nodiscard]]
+    virtual math_utils::Vector3D loop_normal(std::size_t loop_index) const = 0;
+
+    [[nodiscard]]
+    virtual bool has_uv() const = 0;
+
+    [[nodiscard]]
+    virtual bool has_uv2() const = 0;
+
+    [[nodiscard]]
+    virtual math_utils::Vector2D uv(std::size_t loop_index) const = 0;
+
+    [[nodiscard]]
+    virtual math_utils::Vector2D uv2(std::size_t loop_index) const = 0;
+
+    [[nodiscard]]
+    virtual bool has_color_layer(MeshColorLayer layer) const = 0;
+
+    [[nodiscard]]
+    virtual color_utils::RGBA color(MeshColorLayer layer, std::size_t loop_index) const = 0;
+
+    [[nodiscard]]
+    virtual bool has_collision_group() const = 0;
+
+    [[nodiscard]]
+    virtual bool is_vertex_collidable(std::size_t vertex_index) const = 0;
+  };
+
+  struct VertexColorLayer
+  {
+    VertexColorLayer(const Mesh* mesh, std::string const& name);
+
+    [[nodiscard]]
+    bool exists() const { return _exists; };
+
+    [[nodiscard]]
+    bool is_per_loop() const { return _is_per_loop; };
+
+    color_utils::RGBA operator[] (std::size_t index) const;
+
+  private:
+    bool _exists;
+    bool _is_per_loop;
+    const Mesh* _mesh;
+    MLoop *_bl_loops;
+    std::variant<std::monostate, MLoopCol*, MPropCol*> _color_layer;
+  };
+
+  // Reads Blender DNA structs directly, mesh must have its loop triangles and normals calculated.
+  class BlenderMeshSource : public MeshSource
+  {
+  public:
+    BlenderMeshSource(std::uintptr_t mesh_ptr, int vg_collision_index);
+
+    [[nodiscard]]
+    std::size_t n_looptris() const override;
+
+    [[nodiscard]]
+    std::array<unsigned, 3> looptri_loops(std::size_t looptri_index) const override;
+
+    [[nodiscard]]
+    unsigned looptri_polygon(std::size_t looptri_index) const override;
+
+    [[nodiscard]]
+    unsigned loop_vertex(std::size_t loop_index) const override;
+
+    [[nodiscard]]
+    glm::vec3 vertex_co(std::size_t vertex_index) const override;
+
+    [[nodiscard]]
+    glm::vec3 vertex_normal(std::size_t vertex_index) const override;
+
+    [[nodiscard]]
+    bool has_material_indices() const override { return _mesh_materials_per_poly; };
+
+    [[nodiscard]]
+    std::int32_t material_index(std::size_t polygon_index) const override;
+
+    [[nodiscard]]
+    bool has_loop_normals() const override { return _bl_loop_normals; };
+
+    [[nodiscard]]
+    math_utils::Vector3D loop_normal(std::size_t loop_index) const override;
+
+    [[nodiscard]]
+    bool has_uv() const override { return _bl_uv; };
+
+    [[nodiscard]]
+    bool has_uv2() const override { return _bl_uv2; };
+
+    [[nodiscard]]
+    math_utils::Vector2D uv(std::size_t loop_index) const override;
+
+    [[nodiscard]]
+    math_utils::Vector2D uv2(std::size_t loop_index) const override;
+
+    [[nodiscard]]
+    bool has_color_layer(MeshColorLayer layer) const override { return _color_layers[layer].exists(); };
+
+    [[nodiscard]]
+    color_utils::RGBA color(MeshColorLayer layer, std::size_t loop_index) const override;
+
+    [[nodiscard]]
+    bool has_collision_group() const override { return _bl_vg_data; };
+
+    [[nodiscard]]
+    bool is_vertex_collidable(std::size_t vertex_index) const override;
+
+  private:
+    Mesh* _mesh;
+    int _vg_collision_index;
+
+    const MLoop* _bl_loops;
+    const MVert* _bl_verts;
+    const MLoopTri* _bl_looptris;
+    const float(*_bl_vertex_normals)[3];
+    const float(*_bl_loop_normals)[3];
+    MLoopUV* _bl_uv;
+    MLoopUV* _bl_uv2;
+    MDeformVert* _bl_vg_data;
+    std::int32_t* _mesh_materials_per_poly; // may be null, then mat_id is always 0
+
+    std::array<VertexColorLayer, N_COLOR_LAYERS> _color_layers;
+  };
+
+  // Reads flat arrays, does not depend on Blender data layout. Arrays pointed to must outlive the source.
+  class ArrayMeshSource : public MeshSource
+  {
+  public:
+    explicit ArrayMeshSource(MeshArrays const& arrays) : _arrays(arrays) {};
+
+    [[nodiscard]]
+    std::size_t n_looptris() const override { return _arrays.n_looptris; };
+
+    [[nodiscard]]
+    std::array<unsigned, 3> looptri_loops(std::size_t looptri_index) const override;
+
+    [[nodiscard]]
+    unsigned looptri_polygon(std::size_t looptri_index) const override;
+
+    [[nodiscard]]
+    unsigned loop_vertex(std::size_t loop_index) const override;
+
+    [[nodiscard]]
+    glm::vec3 vertex_co(std::size_t vertex_index) const override;
+
+    [[nodiscard]]
+    glm::vec3 vertex_normal(std::size_t vertex_index) const override;
+
+    [[nodiscard]]
+    bool has_material_indices() const override { return _arrays.material_indices; };
+
+    [[nodiscard]]
+    std::int32_t material_index(std::size_t polygon_index) const override;
+
+    [[nodiscard]]
+    bool has_loop_normals() const override { return _arrays.loop_normals; };
+
+    [[nodiscard]]
+    math_utils::Vector3D loop_normal(std::size_t loop_index) const override;
+
+    [[nodiscard]]
+    bool has_uv() const override { return _arrays.uv; };
+
+    [[nodiscard]]
+    bool has_uv2() const override { return _arrays.uv2; };
+
+    [[nodiscard]]
+    math_utils::Vector2D uv(std::size_t loop_index) const override;
+
+    [[nodiscard]]
+    math_utils::Vector2D uv2(std::size_t loop_index) const override;
+
+    [[nodiscard]]
+    bool has_color_layer(MeshColorLayer layer) const override { return _arrays.colors[layer]; };
+
+    [[nodiscard]]
+    color_utils::RGBA color(MeshColorLayer layer, std::size_t loop_index) const override;
+
+    [[nodiscard]]
+    bool has_collision_group() const override { return _arrays.collision_weights; };
+
+    [[nodiscard]]
+    bool is_vertex_collidable(std::size_t vertex_index) const override;
+
+  private:
+    MeshArrays _arrays;
+  };
+}
+
+#endif //WBS_KERNEL_MESH_SOURCE_HPP
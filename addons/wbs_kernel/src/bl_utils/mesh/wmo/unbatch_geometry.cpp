@@ -0,0 +1,388 @@
+#include "unbatch_geometry.hpp"
+
+#include <algorithm>
+#include <cmath>
+#include <unordered_set>
+
+using namespace wbs_kernel::bl_utils::math_utils;
+using namespace wbs_kernel::bl_utils::color_utils;
+using namespace wbs_kernel::bl_utils::mesh::wmo;
+
+static constexpr std::uint8_t COLLISION_MATERIAL_ID = 0xFF;
+
+// sRGB byte -> linear float, same conversion as utils.colors.srgb_to_linear
+static std::array<float, 256> const& srgb_to_linear_table()
+{
+  static const std::array<float, 256> table = []
+  {
+    std::array<float, 256> result{};
+
+    for (unsigned i = 0; i < 256; ++i)
+    {
+      float c = i / 255.f;
+      result[i] = c <= 0.04045f ? c / 12.92f : std::pow((c + 0.055f) / 1.055f, 2.4f);
+    }
+
+    return result;
+  }();
+
+  return table;
+}
+
+template<typename T>
+static BufferKey make_buffer_key(std::vector<T>& data)
+{
+  return {reinterpret_cast<char*>(data.data()), data.size() * sizeof(T)};
+}
+
+WMOGeometryUnbatcher::WMOGeometryUnbatcher(WMOGroupBuffers const& buffers)
+{
+  _partition_triangles(buffers);
+  _unpack_loops(buffers);
+  _assign_materials(buffers);
+  _collect_collision_vertices(buffers);
+}
+
+bool WMOGeometryUnbatcher::_is_collision_triangle(WMOGroupBuffers const& buffers, std::size_t tri_index)
+{
+  return tri_index < buffers.n_triangle_materials
+    && buffers.triangle_materials[tri_index].material_id == COLLISION_MATERIAL_ID;
+}
+
+void WMOGeometryUnbatcher::_partition_triangles(WMOGroupBuffers const& buffers)
+{
+  std::size_t n_tris = buffers.n_indices / 3;
+
+  std::vector<bool> used_by_render(buffers.n_vertices, false);
+  std::vector<bool> used_by_collision(buffers.n_vertices, false);
+  std::vector<std::uint32_t> collision_triangle_source;
+
+  _render_triangle_source.reserve(n_tris);
+
+  for (std::size_t i = 0; i < n_tris; ++i)
+  {
+    const std::uint16_t* tri = &buffers.indices[i * 3];
+
+    // skip corrupted triangles instead of reading out of bounds
+    if (tri[0] >= buffers.n_vertices || tri[1] >= buffers.n_vertices || tri[2] >= buffers.n_vertices)
+      continue;
+
+    bool is_collision = _is_collision_triangle(buffers, i);
+    std::vector<bool>& used = is_collision ? used_by_collision : used_by_render;
+    used[tri[0]] = used[tri[1]] = used[tri[2]] = true;
+
+    if (is_collision)
+    {
+      collision_triangle_source.push_back(i);
+    }
+    else
+    {
+      _render_triangle_source.push_back(i);
+    }
+  }
+
+  // vertices only used by collision triangles are not part of the render mesh, loose vertices are kept
+  _render_vertex_map.resize(buffers.n_vertices, -1);
+  _render_vertices.reserve(buffers.n_vertices);
+
+  for (std::size_t v = 0; v < buffers.n_vertices; ++v)
+  {
+    if (used_by_render[v] || !used_by_collision[v])
+    {
+      _render_vertex_map[v] = _render_vertices.size();
+      _render_vertices.push_back(buffers.vertices[v]);
+    }
+  }
+
+  _render_triangles.reserve(_render_triangle_source.size() * 3);
+
+  for (std::uint32_t tri_index : _render_triangle_source)
+  {
+    for (unsigned k = 0; k < 3; ++k)
+    {
+      _render_triangles.push_back(_render_vertex_map[buffers.indices[tri_index * 3 + k]]);
+    }
+  }
+
+  // collision mesh, vertices in order of first use. Degenerate and duplicate faces can't exist in a Blender mesh.
+  std::vector<std::int32_t> collision_vertex_map(buffers.n_vertices, -1);
+  std::unordered_set<std::uint64_t> collision_faces;
+
+  for (std::uint32_t tri_index : collision_triangle_source)
+  {
+    std::array<std::uint16_t, 3> tri{buffers.indices[tri_index * 3]
+                                     , buffers.indices[tri_index * 3 + 1]
+                                     , buffers.indices[tri_index * 3 + 2]};
+
+    std::array<std::uint16_t, 3> key = tri;
+    std::sort(key.begin(), key.end());
+
+    if (key[0] == key[1] || key[1] == key[2])
+      continue;
+
+    if (!collision_faces.insert((std::uint64_t(key[0]) << 32) | (std::uint64_t(key[1]) << 16) | key[2]).second)
+      continue;
+
+    for (std::uint16_t v : tri)
+    {
+      if (collision_vertex_map[v] < 0)
+      {
+        collision_vertex_map[v] = _collision_vertices.size();
+        _collision_vertices.push_back(buffers.vertices[v]);
+      }
+
+      _collision_triangles.push_back(collision_vertex_map[v]);
+    }
+  }
+}
+
+void WMOGeometryUnbatcher::_unpack_loops(WMOGroupBuffers const& buffers)
+{
+  std::size_t n_loops = _render_triangle_source.size() * 3;
+  auto const& to_linear = srgb_to_linear_table();
+
+  // batch maps mark vertex ranges of trans and int batches, matching the legacy importer
+  std::int64_t batch_a_end = 0;
+  std::int64_t batch_b_start = -1;
+  std::int64_t batch_b_end = -1;
+
+  bool has_batch_map_a = buffers.n_batches_a && buffers.n_batches_a <= buffers.n_batches;
+  bool has_batch_map_b = buffers.n_batches_b && buffers.n_batches_a + buffers.n_batches_b <= buffers.n_batches;
+
+  if (has_batch_map_a)
+  {
+    batch_a_end = buffers.batches[buffers.n_batches_a - 1].max_index + 1;
+  }
+
+  if (has_batch_map_b)
+  {
+    batch_b_start = batch_a_end - 1;
+    batch_b_end = buffers.batches[buffers.n_batches_a + buffers.n_batches_b - 1].max_index + 1;
+  }
+
+  _loop_normals.reserve(n_loops);
+
+  if (buffers.tex_coords)
+    _loop_tex_coords.reserve(n_loops);
+
+  if (buffers.tex_coords2)
+    _loop_tex_coords2.reserve(n_loops);
+
+  if (buffers.vertex_colors)
+  {
+    _loop_colors[MeshColorLayer::VERTEX_COLOR].reserve(n_loops * 4);
+    _loop_colors[MeshColorLayer::LIGHTMAP].reserve(n_loops * 4);
+  }
+
+  if (buffers.blend_colors)
+    _loop_colors[MeshColorLayer::BLENDMAP].reserve(n_loops * 4);
+
+  if (has_batch_map_a)
+    _loop_colors[MeshColorLayer::BATCH_MAP_TRANS].reserve(n_loops * 4);
+
+  if (has_batch_map_b)
+    _loop_colors[MeshColorLayer::BATCH_MAP_INT].reserve(n_loops * 4);
+
+  auto push_color = [this](MeshColorLayer layer, float r, float g, float b, float a)
+  {
+    std::vector<float>& colors = _loop_colors[layer];
+    colors.push_back(r);
+    colors.push_back(g);
+    colors.push_back(b);
+    colors.push_back(a);
+  };
+
+  for (std::uint32_t tri_index : _render_triangle_source)
+  {
+    for (unsigned k = 0; k < 3; ++k)
+    {
+      std::uint16_t v = buffers.indices[tri_index * 3 + k];
+
+      _loop_normals.push_back(buffers.normals[v]);
+
+      if (buffers.tex_coords)
+      {
+        _loop_tex_coords.push_back(Vector2D{buffers.tex_coords[v].x, 1.f - buffers.tex_coords[v].y});
+      }
+
+      if (buffers.tex_coords2)
+      {
+        _loop_tex_coords2.push_back(Vector2D{buffers.tex_coords2[v].x, 1.f - buffers.tex_coords2[v].y});
+      }
+
+      if (buffers.vertex_colors)
+      {
+        // MOCV is stored as BGRA
+        RGBA const& col = buffers.vertex_colors[v];
+        push_color(MeshColorLayer::VERTEX_COLOR, to_linear[col.b], to_linear[col.g], to_linear[col.r], 1.f);
+
+        float attenuation = to_linear[col.a];
+        push_color(MeshColorLayer::LIGHTMAP, attenuation, attenuation, attenuation, 1.f);
+      }
+
+      if (buffers.blend_colors)
+      {
+        float blend = to_linear[buffers.blend_colors[v].a];
+        push_color(MeshColorLayer::BLENDMAP, blend, blend, blend, 1.f);
+      }
+
+      if (has_batch_map_a)
+      {
+        float value = v < batch_a_end ? 1.f : 0.f;
+        push_color(MeshColorLayer::BATCH_MAP_TRANS, value, value, value, value);
+      }
+
+      if (has_batch_map_b)
+      {
+        float value = v >= batch_b_start && v < batch_b_end ? 1.f : 0.f;
+        push_color(MeshColorLayer::BATCH_MAP_INT, value, value, value, value);
+      }
+    }
+  }
+}
+
+void WMOGeometryUnbatcher::_assign_materials(WMOGroupBuffers const& buffers)
+{
+  std::size_t n_tris = buffers.n_indices / 3;
+  std::vector<std::int32_t> triangle_slots(n_tris, 0);
+
+  for (std::size_t i = 0; i < buffers.n_batches; ++i)
+  {
+    MOBABatch const& batch = buffers.batches[i];
+
+    std::uint32_t material_id = batch.flags & MOBAFlags::FLAG_USE_MATERIAL_ID_LARGE
+      ? batch.material_id_large.id : batch.material_id;
+
+    auto it = std::find(_material_ids.begin(), _material_ids.end(), material_id);
+    std::int32_t slot = it - _material_ids.begin();
+
+    if (it == _material_ids.end())
+    {
+      _material_ids.push_back(material_id);
+    }
+
+    std::size_t first_tri = std::min<std::size_t>(batch.start_index / 3, n_tris);
+    std::size_t last_tri = std::min<std::size_t>((batch.start_index + batch.indices_count) / 3, n_tris);
+    std::fill(triangle_slots.begin() + first_tri, triangle_slots.begin() + last_tri, slot);
+  }
+
+  _polygon_material_indices.reserve(_render_triangle_source.size());
+
+  for (std::uint32_t tri_index : _render_triangle_source)
+  {
+    _polygon_material_indices.push_back(triangle_slots[tri_index]);
+  }
+}
+
+void WMOGeometryUnbatcher::_collect_collision_vertices(WMOGroupBuffers const& buffers)
+{
+  if (!buffers.bsp_nodes || !buffers.n_bsp_nodes)
+    return;
+
+  std::vector<bool> is_collidable(buffers.n_vertices, false);
+  std::vector<bool> visited(buffers.n_bsp_nodes, false);
+  std::vector<std::size_t> stack{0};
+
+  while (!stack.empty())
+  {
+    std::size_t i_node = stack.back();
+    stack.pop_back();
+
+    // guard against cycles in malformed files
+    if (visited[i_node])
+      continue;
+
+    visited[i_node] = true;
+    BSPNode const& node = buffers.bsp_nodes[i_node];
+
+    if (node.plane_type & BSPPlaneType::Leaf)
+    {
+      std::size_t faces_end = std::min<std::size_t>(node.first_face + node.num_faces, buffers.n_bsp_faces);
+
+      for (std::size_t i = node.first_face; i < faces_end; ++i)
+      {
+        std::size_t face = buffers.bsp_faces[i];
+
+        if (face >= buffers.n_triangle_materials || face * 3 + 2 >= buffers.n_indices
+            || buffers.triangle_materials[face].flags.F_DETAIL)
+          continue;
+
+        for (unsigned k = 0; k < 3; ++k)
+        {
+          std::uint16_t v = buffers.indices[face * 3 + k];
+
+          if (v < buffers.n_vertices)
+            is_collidable[v] = true;
+        }
+      }
+    }
+
+    for (std::int16_t child : node.children)
+    {
+      if (child >= 0 && static_cast<std::size_t>(child) < buffers.n_bsp_nodes)
+        stack.push_back(child);
+    }
+  }
+
+  for (std::size_t v = 0; v < buffers.n_vertices; ++v)
+  {
+    // vertices removed from the render mesh can't be in its vertex group
+    if (is_collidable[v] && _render_vertex_map[v] >= 0)
+      _collision_vertex_indices.push_back(_render_vertex_map[v]);
+  }
+}
+
+BufferKey WMOGeometryUnbatcher::render_vertices()
+{
+  return make_buffer_key(_render_vertices);
+}
+
+BufferKey WMOGeometryUnbatcher::render_triangles()
+{
+  return make_buffer_key(_render_triangles);
+}
+
+BufferKey WMOGeometryUnbatcher::loop_normals()
+{
+  return make_buffer_key(_loop_normals);
+}
+
+BufferKey WMOGeometryUnbatcher::loop_tex_coords()
+{
+  return make_buffer_key(_loop_tex_coords);
+}
+
+BufferKey WMOGeometryUnbatcher::loop_tex_coords2()
+{
+  return make_buffer_key(_loop_tex_coords2);
+}
+
+BufferKey WMOGeometryUnbatcher::loop_colors(MeshColorLayer layer)
+{
+  return make_buffer_key(_loop_colors[layer]);
+}
+
+BufferKey WMOGeometryUnbatcher::polygon_material_indices()
+{
+  return make_buffer_key(_polygon_material_indices);
+}
+
+BufferKey WMOGeometryUnbatcher::material_ids()
+{
+  return make_buffer_key(_material_ids);
+}
+
+BufferKey WMOGeometryUnbatcher::collision_vertices()
+{
+  return make_buffer_key(_collision_vertices);
+}
+
+BufferKey WMOGeometryUnbatcher::collision_triangles()
+{
+  return make_buffer_key(_collision_triangles);
+}
+
+BufferKey WMOGeometryUnbatcher::collision_vertex_indices()
+{
+  return make_buffer_key(_collision_vertex_indices);
+}
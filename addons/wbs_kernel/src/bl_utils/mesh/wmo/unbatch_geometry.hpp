@@ -0,0 +1,116 @@
+#ifndef WBS_KERNEL_UNBATCH_GEOMETRY_HPP
+#define WBS_KERNEL_UNBATCH_GEOMETRY_HPP
+
+#include <bl_utils/math_utils.hpp>
+#include <bl_utils/color_utils.hpp>
+#include <bl_utils/mesh/wmo/batch_geometry.hpp>
+#include <bl_utils/mesh/wmo/bsp_tree.hpp>
+
+#include <cstdint>
+#include <array>
+#include <vector>
+
+
+namespace wbs_kernel::bl_utils::mesh::wmo
+{
+  // Raw WMO group chunk data, as stored in the file. Optional buffers are nullptr when the chunk is absent.
+  struct WMOGroupBuffers
+  {
+    const math_utils::Vector3D* vertices;       // MOVT
+    std::size_t n_vertices;
+    const math_utils::Vector3D* normals;        // MONR, n_vertices
+    const math_utils::Vector2D* tex_coords;     // MOTV, n_vertices, optional
+    const math_utils::Vector2D* tex_coords2;    // MOTV (second), n_vertices, optional
+    const color_utils::RGBA* vertex_colors;     // MOCV (BGRA), n_vertices, optional
+    const color_utils::RGBA* blend_colors;      // MOCV layer holding blendmap in alpha, n_vertices, optional
+    const std::uint16_t* indices;               // MOVI
+    std::size_t n_indices;
+    const MOPYTriangleMaterial* triangle_materials; // MOPY
+    std::size_t n_triangle_materials;
+    const MOBABatch* batches;                   // MOBA
+    std::size_t n_batches;
+    unsigned n_batches_a;
+    unsigned n_batches_b;
+    const BSPNode* bsp_nodes;                   // MOBN, optional
+    std::size_t n_bsp_nodes;
+    const std::uint16_t* bsp_faces;             // MOBR, optional
+    std::size_t n_bsp_faces;
+  };
+
+  // Converts WMO group geometry into Blender mesh layout. Triangles with material 0xFF are split into a separate
+  // collision mesh. All per-loop data matches the order of render_triangles(), colors are linear float RGBA.
+  class WMOGeometryUnbatcher
+  {
+  public:
+    explicit WMOGeometryUnbatcher(WMOGroupBuffers const& buffers);
+
+    [[nodiscard]]
+    BufferKey render_vertices();
+
+    [[nodiscard]]
+    BufferKey render_triangles();
+
+    [[nodiscard]]
+    BufferKey loop_normals();
+
+    [[nodiscard]]
+    BufferKey loop_tex_coords();
+
+    [[nodiscard]]
+    BufferKey loop_tex_coords2();
+
+    [[nodiscard]]
+    BufferKey loop_colors(MeshColorLayer layer);
+
+    // Index of the mesh material slot per render triangle
+    [[nodiscard]]
+    BufferKey polygon_material_indices();
+
+    // WMO material ID per mesh material slot, in order of first use by batches
+    [[nodiscard]]
+    BufferKey material_ids();
+
+    [[nodiscard]]
+    BufferKey collision_vertices();
+
+    [[nodiscard]]
+    BufferKey collision_triangles();
+
+    // Render vertices belonging to collidable BSP faces, for the collision vertex group
+    [[nodiscard]]
+    BufferKey collision_vertex_indices();
+
+  private:
+    void _partition_triangles(WMOGroupBuffers const& buffers);
+
+    void _unpack_loops(WMOGroupBuffers const& buffers);
+
+    void _assign_materials(WMOGroupBuffers const& buffers);
+
+    void _collect_collision_vertices(WMOGroupBuffers const& buffers);
+
+    [[nodiscard]]
+    static bool _is_collision_triangle(WMOGroupBuffers const& buffers, std::size_t tri_index);
+
+    // MOVI triangle index of each render triangle
+    std::vector<std::uint32_t> _render_triangle_source;
+
+    // MOVT index -> render vertex index, -1 if vertex is not used by the render mesh
+    std::vector<std::int32_t> _render_vertex_map;
+
+    std::vector<math_utils::Vector3D> _render_vertices;
+    std::vector<std::int32_t> _render_triangles;
+    std::vector<math_utils::Vector3D> _loop_normals;
+    std::vector<math_utils::Vector2D> _loop_tex_coords;
+    std::vector<math_utils::Vector2D> _loop_tex_coords2;
+    std::array<std::vector<float>, N_COLOR_LAYERS> _loop_colors;
+    std::vector<std::int32_t> _polygon_material_indices;
+    std::vector<std::uint32_t> _material_ids;
+
+    std::vector<math_utils::Vector3D> _collision_vertices;
+    std::vector<std::int32_t> _collision_triangles;
+    std::vector<std::int32_t> _collision_vertex_indices;
+  };
+}
+
+#endif //WBS_KERNEL_UNBATCH_GEOMETRY_HPP
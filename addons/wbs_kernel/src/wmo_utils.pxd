@@ -1,4 +1,4 @@
-from libc.stdint cimport uintptr_t, uint16_t
+from libc.stdint cimport uintptr_t, uint8_t, uint16_t, int32_t
 from libcpp.vector cimport vector
 from libcpp cimport bool
 
@@ -8,12 +8,80 @@ cdef extern from "bl_utils/mesh/wmo/batch_geometry.hpp" namespace "wbs_kernel::b
         float y
         float z
 
+    cdef struct Vector2D:
+        float x
+        float y
+
+cdef extern from "bl_utils/color_utils.hpp" namespace "wbs_kernel::bl_utils::color_utils":
+    cdef struct RGBA:
+        pass
+
+cdef extern from "bl_utils/mesh/wmo/bsp_tree.hpp" namespace "wbs_kernel::bl_utils::mesh::wmo":
+    cdef struct BSPNode:
+        pass
+
+    cdef struct BoundingBox:
+        Vector3D min
+        Vector3D max
+
+    cdef struct BSPTreeStats:
+        double build_time_ms
+        unsigned n_nodes
+        unsigned n_leaves
+        unsigned depth
+        unsigned min_leaf_faces
+        unsigned max_leaf_faces
+        float avg_leaf_faces
+        unsigned n_face_refs
+
+    cdef cppclass BSPTree:
+        BSPTree(const vector[Vector3D]& vertices
+                , const vector[uint16_t]& triangle_indices
+                , const BoundingBox& bb_box
+                , unsigned node_size) except + nogil
+
+        vector[BSPNode]& nodes()
+        vector[uint16_t]& faces()
+        const BSPTreeStats& stats() const
+
+cdef extern from "bl_utils/mesh/wmo/mesh_source.hpp" namespace "wbs_kernel::bl_utils::mesh::wmo":
+    cdef enum MeshColorLayer:
+        BATCH_MAP_TRANS = 0,
+        BATCH_MAP_INT = 1,
+        LIGHTMAP = 2,
+        BLENDMAP = 3,
+        VERTEX_COLOR = 4,
+        N_COLOR_LAYERS = 5
+
+    cdef struct MeshArrays:
+        size_t n_vertices
+        size_t n_loops
+        size_t n_looptris
+        size_t n_polygons
+        const float* positions
+        const float* vertex_normals
+        const int32_t* loop_vertex_indices
+        const int32_t* looptri_loops
+        const int32_t* looptri_polygons
+        const int32_t* material_indices
+        const float* loop_normals
+        const float* uv
+        const float* uv2
+        const uint8_t* colors[5]
+        const float* collision_weights
+
 cdef extern from "bl_utils/math_utils.hpp" namespace "wbs_kernel::bl_utils::mesh::wmo":
 
     cdef struct BufferKey:
         char* data
         size_t size
 
+    cdef struct MOBABatch:
+        pass
+
+    cdef struct MOPYTriangleMaterial:
+        pass
+
     cdef enum WMOGeometryBatcherError:
         NO_ERROR = 0,
         LOOSE_MATERIAL_ID = 1
@@ -36,6 +104,19 @@ cdef extern from "bl_utils/math_utils.hpp" namespace "wbs_kernel::bl_utils::mesh
                            , bool use_custom_normals
                            , int vg_collision_index
                            , unsigned node_size
+                           , bool optimize_vertex_cache
+                           , const vector[int]& material_mapping
+                           , const LiquidParams* liquid_params) nogil
+
+        WMOGeometryBatcher(const MeshArrays* mesh_arrays
+                           , const float* mesh_matrix_world
+                           , const MeshArrays* collision_mesh_arrays
+                           , const float* collision_mesh_matrix_world
+                           , bool use_large_material_id
+                           , bool use_vertex_color
+                           , bool use_custom_normals
+                           , unsigned node_size
+                           , bool optimize_vertex_cache
                            , const vector[int]& material_mapping
                            , const LiquidParams* liquid_params) nogil
 
@@ -50,6 +131,7 @@ cdef extern from "bl_utils/math_utils.hpp" namespace "wbs_kernel::bl_utils::mesh
         BufferKey vertex_colors2()
         BufferKey bsp_nodes()
         BufferKey bsp_faces()
+        const BSPTreeStats* bsp_stats() const
         BufferKey liquid_header()
         BufferKey liquid_vertices()
         BufferKey liquid_tiles()
@@ -58,4 +140,43 @@ cdef extern from "bl_utils/math_utils.hpp" namespace "wbs_kernel::bl_utils::mesh
         uint16_t ext_batch_count() const
         const Vector3D* bb_min() const
         const Vector3D* bb_max() const
-        WMOGeometryBatcherError get_last_error() const
\ No newline at end of file
+        WMOGeometryBatcherError get_last_error() const
+        float acmr_before() const
+        float acmr_after() const
+
+cdef extern from "bl_utils/mesh/wmo/unbatch_geometry.hpp" namespace "wbs_kernel::bl_utils::mesh::wmo":
+    cdef struct WMOGroupBuffers:
+        const Vector3D* vertices
+        size_t n_vertices
+        const Vector3D* normals
+        const Vector2D* tex_coords
+        const Vector2D* tex_coords2
+        const RGBA* vertex_colors
+        const RGBA* blend_colors
+        const uint16_t* indices
+        size_t n_indices
+        const MOPYTriangleMaterial* triangle_materials
+        size_t n_triangle_materials
+        const MOBABatch* batches
+        size_t n_batches
+        unsigned n_batches_a
+        unsigned n_batches_b
+        const BSPNode* bsp_nodes
+        size_t n_bsp_nodes
+        const uint16_t* bsp_faces
+        size_t n_bsp_faces
+
+    cdef cppclass WMOGeometryUnbatcher:
+        WMOGeometryUnbatcher(const WMOGroupBuffers& buffers) nogil
+
+        BufferKey render_vertices()
+        BufferKey render_triangles()
+        BufferKey loop_normals()
+        BufferKey loop_tex_coords()
+        BufferKey loop_tex_coords2()
+        BufferKey loop_colors(MeshColorLayer layer)
+        BufferKey polygon_material_indices()
+        BufferKey material_ids()
+        BufferKey collision_vertices()
+        BufferKey collision_triangles()
+        BufferKey collision_vertex_indices()
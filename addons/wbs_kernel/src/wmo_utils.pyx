@@ -1,15 +1,43 @@
 cimport wmo_utils
+cimport cython
 from cpython.memoryview cimport PyMemoryView_FromMemory
 from cpython.buffer cimport PyBUF_READ
 from cython.parallel cimport prange, parallel
 from cython.operator cimport dereference as deref, preincrement as inc
 from libc.stdlib cimport malloc, free
+from libc.float cimport FLT_MAX
 
 from typing import Tuple, Optional, List
 
 from enum import Enum
 
-import mathutils
+import numpy as np
+
+try:
+    import mathutils
+except ImportError:
+    # standalone usage outside of Blender, see build_bsp_tree()
+    mathutils = None
+
+
+# memory layout of wbs_kernel::bl_utils::mesh::wmo::BSPNode, matches MOBN entries
+BSP_NODE_DTYPE = np.dtype([('plane_type', '<i2')
+                           , ('children', '<i2', (2,))
+                           , ('num_faces', '<u2')
+                           , ('first_face', '<u4')
+                           , ('dist', '<f4')])
+
+# memory layout of wbs_kernel::bl_utils::mesh::wmo::MOBABatch
+MOBA_BATCH_DTYPE = np.dtype([('bounding_box', '<i2', (6,))
+                             , ('start_index', '<u4')
+                             , ('indices_count', '<u2')
+                             , ('min_index', '<u2')
+                             , ('max_index', '<u2')
+                             , ('flags', 'u1')
+                             , ('material_id', 'u1')])
+
+# memory layout of wbs_kernel::bl_utils::mesh::wmo::MOPYTriangleMaterial
+MOPY_TRIANGLE_MATERIAL_DTYPE = np.dtype([('flags', 'u1'), ('material_id', 'u1')])
 
 
 class CBatchCountInfo:
@@ -30,10 +58,45 @@ class CBoundingBox:
         self.min = min
         self.max = max
 
+class CBSPTreeStats:
+    build_time_ms: float
+    n_nodes: int
+    n_leaves: int
+    depth: int
+    min_leaf_faces: int
+    max_leaf_faces: int
+    avg_leaf_faces: float
+    n_face_refs: int
+
+    def __init__(self
+                 , build_time_ms: float
+                 , n_nodes: int
+                 , n_leaves: int
+                 , depth: int
+                 , min_leaf_faces: int
+                 , max_leaf_faces: int
+                 , avg_leaf_faces: float
+                 , n_face_refs: int):
+        self.build_time_ms = build_time_ms
+        self.n_nodes = n_nodes
+        self.n_leaves = n_leaves
+        self.depth = depth
+        self.min_leaf_faces = min_leaf_faces
+        self.max_leaf_faces = max_leaf_faces
+        self.avg_leaf_faces = avg_leaf_faces
+        self.n_face_refs = n_face_refs
+
 class CWMOGeometryBatcherError(Enum):
     NO_ERROR = 0
     LOOSE_MATERIAL_ID = 1
 
+class CMeshColorLayer(Enum):
+    BATCH_MAP_TRANS = 0
+    BATCH_MAP_INT = 1
+    LIGHTMAP = 2
+    BLENDMAP = 3
+    VERTEX_COLOR = 4
+
 
 class LiquidExportParams:
     liquid_mesh_pointer: int
@@ -43,6 +106,123 @@ class LiquidExportParams:
     mat_id: int
     is_water: bool
 
+class WMOGeometryBatcherMeshArrays:
+    """ Flat mesh data for batching without access to Blender memory, e.g. gathered with foreach_get().
+        Per-loop colors are sRGB uint8 RGBA, vertex is collidable if its collision weight is > 0.
+        Optional arrays are None when the corresponding layer is absent.
+    """
+
+    positions: np.ndarray
+    vertex_normals: np.ndarray
+    loop_vertex_indices: np.ndarray
+    looptri_loops: np.ndarray
+    looptri_polygons: np.ndarray
+    material_indices: Optional[np.ndarray]
+    loop_normals: Optional[np.ndarray]
+    uv: Optional[np.ndarray]
+    uv2: Optional[np.ndarray]
+    batch_map_trans: Optional[np.ndarray]
+    batch_map_int: Optional[np.ndarray]
+    lightmap: Optional[np.ndarray]
+    blendmap: Optional[np.ndarray]
+    vertex_color: Optional[np.ndarray]
+    collision_weights: Optional[np.ndarray]
+
+    def __init__(self
+                 , positions: np.ndarray
+                 , vertex_normals: np.ndarray
+                 , loop_vertex_indices: np.ndarray
+                 , looptri_loops: np.ndarray
+                 , looptri_polygons: np.ndarray
+                 , material_indices: Optional[np.ndarray] = None
+                 , loop_normals: Optional[np.ndarray] = None
+                 , uv: Optional[np.ndarray] = None
+                 , uv2: Optional[np.ndarray] = None
+                 , batch_map_trans: Optional[np.ndarray] = None
+                 , batch_map_int: Optional[np.ndarray] = None
+                 , lightmap: Optional[np.ndarray] = None
+                 , blendmap: Optional[np.ndarray] = None
+                 , vertex_color: Optional[np.ndarray] = None
+                 , collision_weights: Optional[np.ndarray] = None):
+
+        self.positions = np.ascontiguousarray(positions, dtype=np.float32).reshape(-1, 3)
+        self.vertex_normals = np.ascontiguousarray(vertex_normals, dtype=np.float32).reshape(-1, 3)
+        self.loop_vertex_indices = np.ascontiguousarray(loop_vertex_indices, dtype=np.int32).reshape(-1)
+        self.looptri_loops = np.ascontiguousarray(looptri_loops, dtype=np.int32).reshape(-1, 3)
+        self.looptri_polygons = np.ascontiguousarray(looptri_polygons, dtype=np.int32).reshape(-1)
+
+        n_vertices = self.positions.shape[0]
+        n_loops = self.loop_vertex_indices.shape[0]
+
+        if self.vertex_normals.shape[0] != n_vertices:
+            raise ValueError('Expected {} vertex normals, got {}.'.format(n_vertices, self.vertex_normals.shape[0]))
+
+        if self.looptri_polygons.shape[0] != self.looptri_loops.shape[0]:
+            raise ValueError('Loop triangle polygon indices count does not match loop triangle count.')
+
+        if n_loops and (self.loop_vertex_indices.min() < 0 or self.loop_vertex_indices.max() >= n_vertices):
+            raise ValueError('Loop vertex indices reference vertices out of range.')
+
+        if self.looptri_loops.size and (self.looptri_loops.min() < 0 or self.looptri_loops.max() >= n_loops):
+            raise ValueError('Loop triangles reference loops out of range.')
+
+        def optional_array(array: Optional[np.ndarray], dtype, width: int, n_items: int, name: str):
+            if array is None:
+                return None
+
+            array = np.ascontiguousarray(array, dtype=dtype).reshape(-1, width)
+
+            if array.shape[0] != n_items:
+                raise ValueError('Expected {} items in \"{}\", got {}.'.format(n_items, name, array.shape[0]))
+
+            return array
+
+        n_polygons = int(self.looptri_polygons.max()) + 1 if self.looptri_polygons.size else 0
+
+        self.material_indices = None if material_indices is None \
+            else np.ascontiguousarray(material_indices, dtype=np.int32).reshape(-1)
+
+        if self.material_indices is not None and self.material_indices.shape[0] < n_polygons:
+            raise ValueError('Expected at least {} material indices, got {}.'.format(n_polygons,
+                                                                                 self.material_indices.shape[0]))
+
+        self.loop_normals = optional_array(loop_normals, np.float32, 3, n_loops, 'loop_normals')
+        self.uv = optional_array(uv, np.float32, 2, n_loops, 'uv')
+        self.uv2 = optional_array(uv2, np.float32, 2, n_loops, 'uv2')
+        self.batch_map_trans = optional_array(batch_map_trans, np.uint8, 4, n_loops, 'batch_map_trans')
+        self.batch_map_int = optional_array(batch_map_int, np.uint8, 4, n_loops, 'batch_map_int')
+        self.lightmap = optional_array(lightmap, np.uint8, 4, n_loops, 'lightmap')
+        self.blendmap = optional_array(blendmap, np.uint8, 4, n_loops, 'blendmap')
+        self.vertex_color = optional_array(vertex_color, np.uint8, 4, n_loops, 'vertex_color')
+        self.collision_weights = optional_array(collision_weights, np.float32, 1, n_vertices, 'collision_weights')
+
+
+cdef uintptr_t _array_ptr(array: Optional[np.ndarray]):
+    return 0 if array is None else array.ctypes.data
+
+
+cdef void _fill_mesh_arrays(MeshArrays* c_arrays, py_arrays: WMOGeometryBatcherMeshArrays):
+    c_arrays.n_vertices = py_arrays.positions.shape[0]
+    c_arrays.n_loops = py_arrays.loop_vertex_indices.shape[0]
+    c_arrays.n_looptris = py_arrays.looptri_loops.shape[0]
+    c_arrays.n_polygons = 0 if py_arrays.material_indices is None else py_arrays.material_indices.shape[0]
+    c_arrays.positions = <const float*>_array_ptr(py_arrays.positions)
+    c_arrays.vertex_normals = <const float*>_array_ptr(py_arrays.vertex_normals)
+    c_arrays.loop_vertex_indices = <const int32_t*>_array_ptr(py_arrays.loop_vertex_indices)
+    c_arrays.looptri_loops = <const int32_t*>_array_ptr(py_arrays.looptri_loops)
+    c_arrays.looptri_polygons = <const int32_t*>_array_ptr(py_arrays.looptri_polygons)
+    c_arrays.material_indices = <const int32_t*>_array_ptr(py_arrays.material_indices)
+    c_arrays.loop_normals = <const float*>_array_ptr(py_arrays.loop_normals)
+    c_arrays.uv = <const float*>_array_ptr(py_arrays.uv)
+    c_arrays.uv2 = <const float*>_array_ptr(py_arrays.uv2)
+    c_arrays.colors[<int>MeshColorLayer.BATCH_MAP_TRANS] = <const uint8_t*>_array_ptr(py_arrays.batch_map_trans)
+    c_arrays.colors[<int>MeshColorLayer.BATCH_MAP_INT] = <const uint8_t*>_array_ptr(py_arrays.batch_map_int)
+    c_arrays.colors[<int>MeshColorLayer.LIGHTMAP] = <const uint8_t*>_array_ptr(py_arrays.lightmap)
+    c_arrays.colors[<int>MeshColorLayer.BLENDMAP] = <const uint8_t*>_array_ptr(py_arrays.blendmap)
+    c_arrays.colors[<int>MeshColorLayer.VERTEX_COLOR] = <const uint8_t*>_array_ptr(py_arrays.vertex_color)
+    c_arrays.collision_weights = <const float*>_array_ptr(py_arrays.collision_weights)
+
+
 class WMOGeometryBatcherMeshParams:
     mesh_pointer: int
     mesh_matrix_world: mathutils.Matrix
@@ -53,8 +233,11 @@ class WMOGeometryBatcherMeshParams:
     use_custom_normals: bool
     vg_collision_index: int
     node_size: int
+    optimize_vertex_cache: bool
     material_mapping: List[int]
     liquid_params: Optional[LiquidExportParams]
+    mesh_arrays: Optional[WMOGeometryBatcherMeshArrays]
+    collision_mesh_arrays: Optional[WMOGeometryBatcherMeshArrays]
 
     def __init__(self
                 , mesh_pointer: int
@@ -66,8 +249,14 @@ class WMOGeometryBatcherMeshParams:
                 , use_custom_normals: bool
                 , vg_collision_index: int
                 , node_size: int
+                , optimize_vertex_cache: bool
                 , material_mapping: List[int]
-                , liquid_params: LiquidExportParams):
+                , liquid_params: LiquidExportParams
+                , mesh_arrays: Optional[WMOGeometryBatcherMeshArrays] = None
+                , collision_mesh_arrays: Optional[WMOGeometryBatcherMeshArrays] = None):
+        """ If mesh_arrays are provided, geometry is read from them instead of the mesh pointers.
+            vg_collision_index is then ignored in favor of WMOGeometryBatcherMeshArrays.collision_weights.
+        """
         self.mesh_pointer = mesh_pointer
         self.mesh_matrix_world = mesh_matrix_world
         self.collision_mesh_pointer = collision_mesh_pointer
@@ -77,8 +266,11 @@ class WMOGeometryBatcherMeshParams:
         self.use_custom_normals = use_custom_normals
         self.vg_collision_index = vg_collision_index
         self.node_size = node_size
+        self.optimize_vertex_cache = optimize_vertex_cache
         self.material_mapping = material_mapping
         self.liquid_params = liquid_params
+        self.mesh_arrays = mesh_arrays
+        self.collision_mesh_arrays = collision_mesh_arrays
 
 cdef struct CWMOGeometryBatcherMeshParams:
     uintptr_t mesh_pointer
@@ -90,11 +282,17 @@ cdef struct CWMOGeometryBatcherMeshParams:
     bool use_custom_normals
     int vg_collision_index
     int node_size
+    bool optimize_vertex_cache
     vector[int] material_mapping
 
     bool has_liquid
     LiquidParams liquid_params
 
+    bool use_mesh_arrays
+    bool has_collision_mesh_arrays
+    MeshArrays mesh_arrays
+    MeshArrays collision_mesh_arrays
+
 cdef class CWMOGeometryBatcher:
     cdef vector[WMOGeometryBatcher*] _c_batchers
     cdef vector[CWMOGeometryBatcherMeshParams] _c_params
@@ -121,7 +319,20 @@ cdef class CWMOGeometryBatcher:
 
             self._c_params[x].mesh_matrix_world = group_matrix_world
 
-            if py_param.collision_mesh_pointer:
+            use_mesh_arrays = py_param.mesh_arrays is not None
+            has_collision = py_param.collision_mesh_arrays is not None if use_mesh_arrays \
+                else py_param.collision_mesh_pointer
+
+            self._c_params[x].use_mesh_arrays = use_mesh_arrays
+            self._c_params[x].has_collision_mesh_arrays = use_mesh_arrays and has_collision
+
+            if use_mesh_arrays:
+                _fill_mesh_arrays(&self._c_params[x].mesh_arrays, py_param.mesh_arrays)
+
+                if has_collision:
+                    _fill_mesh_arrays(&self._c_params[x].collision_mesh_arrays, py_param.collision_mesh_arrays)
+
+            if has_collision:
                 self._c_params[x].collision_mesh_pointer = py_param.collision_mesh_pointer
 
                 collision_matrix_world = <float*>malloc(16 * sizeof(float))
@@ -142,6 +353,7 @@ cdef class CWMOGeometryBatcher:
             self._c_params[x].use_custom_normals = py_param.use_custom_normals
             self._c_params[x].vg_collision_index = py_param.vg_collision_index
             self._c_params[x].node_size = py_param.node_size
+            self._c_params[x].optimize_vertex_cache = py_param.optimize_vertex_cache
             self._c_params[x].material_mapping = py_param.material_mapping
 
             if py_param.liquid_params:
@@ -166,17 +378,33 @@ cdef class CWMOGeometryBatcher:
         cdef CWMOGeometryBatcherMeshParams* param
         for i in prange(n_groups, nogil=True):
             param = &self._c_params[i]
-            self._c_batchers[i] = new WMOGeometryBatcher(param.mesh_pointer
-                                                         , param.mesh_matrix_world
-                                                         , param.collision_mesh_pointer
-                                                         , param.collision_mesh_matrix_world
-                                                         , param.use_large_material_id
-                                                         , param.use_vertex_color
-                                                         , param.use_custom_normals
-                                                         , param.vg_collision_index
-                                                         , param.node_size
-                                                         , param.material_mapping
-                                                         , (&param.liquid_params) if param.has_liquid else NULL)
+
+            if param.use_mesh_arrays:
+                self._c_batchers[i] = new WMOGeometryBatcher(&param.mesh_arrays
+                                                             , param.mesh_matrix_world
+                                                             , (&param.collision_mesh_arrays)
+                                                                if param.has_collision_mesh_arrays else NULL
+                                                             , param.collision_mesh_matrix_world
+                                                             , param.use_large_material_id
+                                                             , param.use_vertex_color
+                                                             , param.use_custom_normals
+                                                             , param.node_size
+                                                             , param.optimize_vertex_cache
+                                                             , param.material_mapping
+                                                             , (&param.liquid_params) if param.has_liquid else NULL)
+            else:
+                self._c_batchers[i] = new WMOGeometryBatcher(param.mesh_pointer
+                                                             , param.mesh_matrix_world
+                                                             , param.collision_mesh_pointer
+                                                             , param.collision_mesh_matrix_world
+                                                             , param.use_large_material_id
+                                                             , param.use_vertex_color
+                                                             , param.use_custom_normals
+                                                             , param.vg_collision_index
+                                                             , param.node_size
+                                                             , param.optimize_vertex_cache
+                                                             , param.material_mapping
+                                                             , (&param.liquid_params) if param.has_liquid else NULL)
 
         cdef vector[float*].iterator it = matrices_temp.begin()
         cdef WMOGeometryBatcher * ptr
@@ -275,6 +503,17 @@ cdef class CWMOGeometryBatcher:
 
         return PyMemoryView_FromMemory(c_key.data, c_key.size, PyBUF_READ).tobytes()
 
+    def bsp_stats(self, group_index: int) -> CBSPTreeStats:
+        cdef const BSPTreeStats* stats = self._c_batchers[group_index].bsp_stats()
+        return CBSPTreeStats(stats.build_time_ms
+                             , stats.n_nodes
+                             , stats.n_leaves
+                             , stats.depth
+                             , stats.min_leaf_faces
+                             , stats.max_leaf_faces
+                             , stats.avg_leaf_faces
+                             , stats.n_face_refs)
+
     def liquid(self, group_index: int) -> bytes:
         cdef BufferKey c_key_header = self._c_batchers[group_index].liquid_header()
         header = PyMemoryView_FromMemory(c_key_header.data, c_key_header.size, PyBUF_READ).tobytes()
@@ -301,6 +540,10 @@ cdef class CWMOGeometryBatcher:
     def get_last_error(self, group_index: int) -> CWMOGeometryBatcherError:
         return self._c_batchers[group_index].get_last_error()
 
+    def acmr(self, group_index: int) -> Tuple[float, float]:
+        """ Average cache miss ratio of render batches before and after vertex cache optimization. """
+        return self._c_batchers[group_index].acmr_before(), self._c_batchers[group_index].acmr_after()
+
     def __dealloc__(self):
        cdef vector[WMOGeometryBatcher*].iterator it = self._c_batchers.begin()
        cdef WMOGeometryBatcher * ptr
@@ -309,3 +552,256 @@ cdef class CWMOGeometryBatcher:
            ptr = deref(it)
            del ptr
            inc(it)
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def build_bsp_tree(vertices: np.ndarray, triangle_indices: np.ndarray, node_size: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """ Build a WMO collision BSP tree from raw geometry, without Blender.
+        vertices: array of shape (n, 3) in WMO space, triangle_indices: flat or (n, 3) array of vertex indices.
+        node_size: max amount of faces per leaf, 0 to pick it automatically like on export.
+        Returns MOBN nodes as a BSP_NODE_DTYPE array and MOBR face indices as an uint16 array.
+    """
+
+    vertices = np.ascontiguousarray(vertices, dtype=np.float32).reshape(-1, 3)
+    triangle_indices = np.asarray(triangle_indices).reshape(-1)
+
+    if triangle_indices.shape[0] % 3:
+        raise ValueError('Triangle indices count must be a multiple of 3, got {}.'.format(triangle_indices.shape[0]))
+
+    if vertices.shape[0] > 0xFFFF:
+        raise ValueError('WMO groups are limited to 65535 vertices, got {}.'.format(vertices.shape[0]))
+
+    if triangle_indices.shape[0] // 3 > 0xFFFF:
+        raise ValueError('WMO groups are limited to 65535 triangles, got {}.'.format(triangle_indices.shape[0] // 3))
+
+    if triangle_indices.shape[0] and (triangle_indices.min() < 0 or triangle_indices.max() >= vertices.shape[0]):
+        raise ValueError('Triangle indices reference vertices out of range.')
+
+    triangle_indices = np.ascontiguousarray(triangle_indices, dtype=np.uint16)
+
+    cdef const float[:, ::1] c_vertices = vertices
+    cdef const uint16_t[::1] c_triangle_indices = triangle_indices
+    cdef vector[Vector3D] c_vertex_vec
+    cdef vector[uint16_t] c_index_vec
+    cdef BoundingBox c_bb_box
+    cdef BSPTree* c_tree
+    cdef unsigned c_node_size = node_size
+    cdef Py_ssize_t i
+
+    c_vertex_vec.resize(c_vertices.shape[0])
+    c_index_vec.resize(c_triangle_indices.shape[0])
+
+    c_bb_box.min.x = c_bb_box.min.y = c_bb_box.min.z = FLT_MAX
+    c_bb_box.max.x = c_bb_box.max.y = c_bb_box.max.z = -FLT_MAX
+
+    with nogil:
+        for i in range(c_vertices.shape[0]):
+            c_vertex_vec[i].x = c_vertices[i, 0]
+            c_vertex_vec[i].y = c_vertices[i, 1]
+            c_vertex_vec[i].z = c_vertices[i, 2]
+
+            c_bb_box.min.x = min(c_bb_box.min.x, c_vertices[i, 0])
+            c_bb_box.min.y = min(c_bb_box.min.y, c_vertices[i, 1])
+            c_bb_box.min.z = min(c_bb_box.min.z, c_vertices[i, 2])
+            c_bb_box.max.x = max(c_bb_box.max.x, c_vertices[i, 0])
+            c_bb_box.max.y = max(c_bb_box.max.y, c_vertices[i, 1])
+            c_bb_box.max.z = max(c_bb_box.max.z, c_vertices[i, 2])
+
+        for i in range(c_triangle_indices.shape[0]):
+            c_index_vec[i] = c_triangle_indices[i]
+
+        c_tree = new BSPTree(c_vertex_vec, c_index_vec, c_bb_box, c_node_size)
+
+    try:
+        nodes = np.frombuffer(PyMemoryView_FromMemory(<char*>c_tree.nodes().data()
+                                                      , c_tree.nodes().size() * BSP_NODE_DTYPE.itemsize
+                                                      , PyBUF_READ), dtype=BSP_NODE_DTYPE).copy()
+
+        faces = np.frombuffer(PyMemoryView_FromMemory(<char*>c_tree.faces().data()
+                                                      , c_tree.faces().size() * sizeof(uint16_t)
+                                                      , PyBUF_READ), dtype=np.uint16).copy()
+    finally:
+        del c_tree
+
+    return nodes, faces
+
+
+def _as_chunk_array(data, dtype, width: int = 1, name: str = '') -> Optional[np.ndarray]:
+    """ Accept raw chunk bytes or any array-like, return a contiguous array of shape (n, width) or (n,). """
+
+    if data is None:
+        return None
+
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        array = np.frombuffer(data, dtype=dtype)
+    else:
+        array = np.ascontiguousarray(data, dtype=dtype)
+
+    if width > 1:
+        if array.size % width:
+            raise ValueError('Size of \"{}\" is not a multiple of {}.'.format(name, width))
+
+        return np.ascontiguousarray(array.reshape(-1, width))
+
+    return np.ascontiguousarray(array.reshape(-1))
+
+
+class WMOGeometryUnbatcherGroupParams:
+    """ Raw WMO group chunks for import. Each buffer is either the chunk bytes or an array-like of the same layout.
+        vertex_colors is MOCV when group has vertex colors, blend_colors is the MOCV layer holding the blendmap.
+    """
+
+    vertices: np.ndarray
+    normals: np.ndarray
+    tex_coords: Optional[np.ndarray]
+    tex_coords2: Optional[np.ndarray]
+    vertex_colors: Optional[np.ndarray]
+    blend_colors: Optional[np.ndarray]
+    indices: np.ndarray
+    triangle_materials: np.ndarray
+    batches: np.ndarray
+    n_batches_a: int
+    n_batches_b: int
+    bsp_nodes: Optional[np.ndarray]
+    bsp_faces: Optional[np.ndarray]
+
+    def __init__(self
+                 , vertices
+                 , normals
+                 , indices
+                 , triangle_materials
+                 , batches
+                 , n_batches_a: int
+                 , n_batches_b: int
+                 , tex_coords=None
+                 , tex_coords2=None
+                 , vertex_colors=None
+                 , blend_colors=None
+                 , bsp_nodes=None
+                 , bsp_faces=None):
+
+        self.vertices = _as_chunk_array(vertices, np.float32, 3, 'vertices')
+        self.normals = _as_chunk_array(normals, np.float32, 3, 'normals')
+        self.indices = _as_chunk_array(indices, np.uint16, name='indices')
+        self.triangle_materials = _as_chunk_array(triangle_materials, MOPY_TRIANGLE_MATERIAL_DTYPE)
+        self.batches = _as_chunk_array(batches, MOBA_BATCH_DTYPE)
+        self.n_batches_a = n_batches_a
+        self.n_batches_b = n_batches_b
+        self.tex_coords = _as_chunk_array(tex_coords, np.float32, 2, 'tex_coords')
+        self.tex_coords2 = _as_chunk_array(tex_coords2, np.float32, 2, 'tex_coords2')
+        self.vertex_colors = _as_chunk_array(vertex_colors, np.uint8, 4, 'vertex_colors')
+        self.blend_colors = _as_chunk_array(blend_colors, np.uint8, 4, 'blend_colors')
+        self.bsp_nodes = _as_chunk_array(bsp_nodes, BSP_NODE_DTYPE)
+        self.bsp_faces = _as_chunk_array(bsp_faces, np.uint16, name='bsp_faces')
+
+        n_vertices = self.vertices.shape[0]
+
+        for name in ('normals', 'tex_coords', 'tex_coords2', 'vertex_colors', 'blend_colors'):
+            array = getattr(self, name)
+
+            # truncated layers are ignored instead of being read out of bounds
+            if array is not None and array.shape[0] < n_vertices:
+                print('\nWARNING: WMO group layer \"{}\" has {} entries, expected {}. Ignored.'.format(
+                    name, array.shape[0], n_vertices))
+                setattr(self, name, None)
+
+        if self.normals is None:
+            self.normals = np.zeros((n_vertices, 3), dtype=np.float32)
+
+
+cdef void _fill_group_buffers(WMOGroupBuffers* c_buffers, py_params: WMOGeometryUnbatcherGroupParams):
+    c_buffers.vertices = <const Vector3D*>_array_ptr(py_params.vertices)
+    c_buffers.n_vertices = py_params.vertices.shape[0]
+    c_buffers.normals = <const Vector3D*>_array_ptr(py_params.normals)
+    c_buffers.tex_coords = <const Vector2D*>_array_ptr(py_params.tex_coords)
+    c_buffers.tex_coords2 = <const Vector2D*>_array_ptr(py_params.tex_coords2)
+    c_buffers.vertex_colors = <const RGBA*>_array_ptr(py_params.vertex_colors)
+    c_buffers.blend_colors = <const RGBA*>_array_ptr(py_params.blend_colors)
+    c_buffers.indices = <const uint16_t*>_array_ptr(py_params.indices)
+    c_buffers.n_indices = py_params.indices.shape[0]
+    c_buffers.triangle_materials = <const MOPYTriangleMaterial*>_array_ptr(py_params.triangle_materials)
+    c_buffers.n_triangle_materials = py_params.triangle_materials.shape[0]
+    c_buffers.batches = <const MOBABatch*>_array_ptr(py_params.batches)
+    c_buffers.n_batches = py_params.batches.shape[0]
+    c_buffers.n_batches_a = py_params.n_batches_a
+    c_buffers.n_batches_b = py_params.n_batches_b
+    c_buffers.bsp_nodes = <const BSPNode*>_array_ptr(py_params.bsp_nodes)
+    c_buffers.n_bsp_nodes = 0 if py_params.bsp_nodes is None else py_params.bsp_nodes.shape[0]
+    c_buffers.bsp_faces = <const uint16_t*>_array_ptr(py_params.bsp_faces)
+    c_buffers.n_bsp_faces = 0 if py_params.bsp_faces is None else py_params.bsp_faces.shape[0]
+
+
+cdef object _buffer_to_array(BufferKey c_key, dtype, int width = 1):
+    if c_key.data == NULL or not c_key.size:
+        array = np.empty(0, dtype=dtype)
+    else:
+        array = np.frombuffer(PyMemoryView_FromMemory(c_key.data, c_key.size, PyBUF_READ), dtype=dtype).copy()
+
+    return array.reshape(-1, width) if width > 1 else array
+
+
+cdef class CWMOGeometryUnbatcher:
+    """ Convert WMO group chunks into arrays ready for foreach_set(), groups are processed in parallel. """
+
+    cdef vector[WMOGeometryUnbatcher*] _c_unbatchers
+    cdef vector[WMOGroupBuffers] _c_buffers
+
+    def __cinit__(self, param_entries: List[WMOGeometryUnbatcherGroupParams]):
+        cdef int n_groups = len(param_entries)
+        cdef int i
+
+        self._c_buffers.resize(n_groups)
+        self._c_unbatchers.resize(n_groups)
+
+        for x, py_params in enumerate(param_entries):
+            _fill_group_buffers(&self._c_buffers[x], py_params)
+
+        for i in prange(n_groups, nogil=True):
+            self._c_unbatchers[i] = new WMOGeometryUnbatcher(self._c_buffers[i])
+
+    def render_vertices(self, group_index: int) -> np.ndarray:
+        return _buffer_to_array(self._c_unbatchers[group_index].render_vertices(), np.float32, 3)
+
+    def render_triangles(self, group_index: int) -> np.ndarray:
+        return _buffer_to_array(self._c_unbatchers[group_index].render_triangles(), np.int32, 3)
+
+    def loop_normals(self, group_index: int) -> np.ndarray:
+        return _buffer_to_array(self._c_unbatchers[group_index].loop_normals(), np.float32, 3)
+
+    def loop_tex_coords(self, group_index: int) -> Optional[np.ndarray]:
+        cdef BufferKey c_key = self._c_unbatchers[group_index].loop_tex_coords()
+        return _buffer_to_array(c_key, np.float32, 2) if c_key.size else None
+
+    def loop_tex_coords2(self, group_index: int) -> Optional[np.ndarray]:
+        cdef BufferKey c_key = self._c_unbatchers[group_index].loop_tex_coords2()
+        return _buffer_to_array(c_key, np.float32, 2) if c_key.size else None
+
+    def loop_colors(self, group_index: int, layer: CMeshColorLayer) -> Optional[np.ndarray]:
+        """ Linear RGBA float colors per loop, None if layer is not present in the group. """
+        cdef BufferKey c_key = self._c_unbatchers[group_index].loop_colors(<MeshColorLayer><int>layer.value)
+        return _buffer_to_array(c_key, np.float32, 4) if c_key.size else None
+
+    def polygon_material_indices(self, group_index: int) -> np.ndarray:
+        return _buffer_to_array(self._c_unbatchers[group_index].polygon_material_indices(), np.int32)
+
+    def material_ids(self, group_index: int) -> List[int]:
+        return _buffer_to_array(self._c_unbatchers[group_index].material_ids(), np.uint32).tolist()
+
+    def collision_vertices(self, group_index: int) -> np.ndarray:
+        return _buffer_to_array(self._c_unbatchers[group_index].collision_vertices(), np.float32, 3)
+
+    def collision_triangles(self, group_index: int) -> np.ndarray:
+        return _buffer_to_array(self._c_unbatchers[group_index].collision_triangles(), np.int32, 3)
+
+    def collision_vertex_indices(self, group_index: int) -> np.ndarray:
+        return _buffer_to_array(self._c_unbatchers[group_index].collision_vertex_indices(), np.int32)
+
+    def __dealloc__(self):
+       cdef vector[WMOGeometryUnbatcher*].iterator it = self._c_unbatchers.begin()
+       cdef WMOGeometryUnbatcher * ptr
+
+       while it != self._c_unbatchers.end():
+           ptr = deref(it)
+           del ptr
+           inc(it)
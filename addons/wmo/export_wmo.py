@@ -9,7 +9,8 @@ import time
 from pathlib import Path
 
 
-def export_wmo_from_blender_scene(filepath, client_version, export_selected, export_method):
+def export_wmo_from_blender_scene(filepath, client_version, export_selected, export_method,
+                                  optimize_vertex_cache=False):
     """ Export WoW WMO object from Blender scene to files """
 
     try:
@@ -31,7 +32,7 @@ def export_wmo_from_blender_scene(filepath, client_version, export_selected, exp
     bl_scene.save_doodad_sets()
     bl_scene.save_lights()
     bl_scene.save_fogs()
-    bl_scene.prepare_groups()
+    bl_scene.prepare_groups(optimize_vertex_cache)
     bl_scene.save_portals()
     bl_scene.save_groups()
     bl_scene.save_root_header()
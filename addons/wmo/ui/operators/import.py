@@ -4,7 +4,7 @@ import traceback
 from ....ui.preferences import get_project_preferences
 
 from ...import_wmo import import_wmo_to_blender_scene_gamedata
-from ...utils.wmv import wmv_get_last_wmo, wow_export_get_last_wmo, noggit_red_get_last_wmo
+from ...utils.wmv import wmv_get_last_wmo, wow_export_get_last_wmo, noggit_red_get_last_wmo, get_recent_log_items
 from ....utils.misc import load_game_data
 
 
@@ -54,3 +54,54 @@ class WMO_OT_import_last_wmo_from_wmv(bpy.types.Operator):
 
     def invoke(self, context, event):
         return context.window_manager.invoke_confirm(self, event)
+
+
+# enum items are kept referenced, Blender does not own strings returned by dynamic item callbacks
+_recent_wmo_items = []
+
+
+def _get_recent_wmo_items(self, context):
+    try:
+        paths = get_recent_log_items(get_project_preferences().import_method, 'WMO')
+    except OSError:
+        paths = []
+
+    _recent_wmo_items[:] = [(path, path, "") for path in paths]
+    return _recent_wmo_items
+
+
+class WMO_OT_import_recent_wmo_from_wmv(bpy.types.Operator):
+    bl_idname = "scene.wow_import_recent_wmo_from_wmv"
+    bl_label = "Load recent WMO from preferred import method"
+    bl_description = "Search WMOs recently opened in the preferred import method and load one"
+    bl_options = {'UNDO', 'REGISTER'}
+    bl_property = "wmo_path"
+
+    wmo_path: bpy.props.EnumProperty(name="WMO", items=_get_recent_wmo_items)
+
+    def execute(self, context):
+
+        game_data = load_game_data()
+
+        if not game_data or not game_data.files:
+            self.report({'ERROR'}, "Failed to import model. Connect to game client first.")
+            return {'CANCELLED'}
+
+        try:
+            import_wmo_to_blender_scene_gamedata(self.wmo_path, bpy.context.scene.wow_scene.version)
+        except:
+            traceback.print_exc()
+            self.report({'ERROR'}, "Failed to import model.")
+            return {'CANCELLED'}
+
+        self.report({'INFO'}, "Done importing WMO object to scene.")
+        return {'FINISHED'}
+
+    def invoke(self, context, event):
+
+        if not _get_recent_wmo_items(self, context):
+            self.report({'ERROR'}, "Log contains no WMO entries.")
+            return {'CANCELLED'}
+
+        context.window_manager.invoke_search_popup(self)
+        return {'RUNNING_MODAL'}
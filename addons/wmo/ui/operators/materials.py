@@ -4,7 +4,7 @@ import os
 
 from ...bl_render import load_wmo_shader_dependencies, update_wmo_mat_node_tree
 from ...utils.wmv import wmv_get_last_texture, wow_export_get_last_texture
-from ....utils.misc import resolve_texture_path, resolve_outside_texture_path, load_game_data
+from ....utils.misc import resolve_texture_path, resolve_outside_texture_path, load_game_data, texture_path_session
 from ...utils.materials import load_texture
 from ....ui.preferences import get_project_preferences
 from ...ui.handlers import DepsgraphLock
@@ -156,36 +156,37 @@ class WMO_OT_fill_textures(bpy.types.Operator):
 
     def execute(self, context):
 
-        for ob in filter(lambda o: WoWWMOGroup.match(o), bpy.context.selected_objects):
-            mesh = ob.data
-            for material in mesh.materials:
-                if not WoWWMOGroup.match(ob) :
-                    continue 
+        with texture_path_session():
+            for ob in filter(lambda o: WoWWMOGroup.match(o), bpy.context.selected_objects):
+                mesh = ob.data
+                for material in mesh.materials:
+                    if not WoWWMOGroup.match(ob) :
+                        continue 
                 
 
-                texture1 = material.wow_wmo_material.diff_texture_1
-                texture2 = material.wow_wmo_material.diff_texture_2   
+                    texture1 = material.wow_wmo_material.diff_texture_1
+                    texture2 = material.wow_wmo_material.diff_texture_2   
 
 
-                if not texture1 or texture1.type != 'IMAGE':
-                    continue
+                    if not texture1 or texture1.type != 'IMAGE':
+                        continue
 
-                t1_resolved_path = resolve_texture_path(texture1.filepath)
-                if t1_resolved_path is None:
-                    t1_resolved_path = resolve_outside_texture_path(texture1.filepath)
+                    t1_resolved_path = resolve_texture_path(texture1.filepath)
+                    if t1_resolved_path is None:
+                        t1_resolved_path = resolve_outside_texture_path(texture1.filepath)
 
-                texture1.wow_wmo_texture.path = t1_resolved_path    
+                    texture1.wow_wmo_texture.path = t1_resolved_path    
 
-                if not texture2 or texture2.type != 'IMAGE':
-                    continue                          
+                    if not texture2 or texture2.type != 'IMAGE':
+                        continue                          
                 
-                if texture2 is not None:
+                    if texture2 is not None:
 
-                    t2_resolved_path = resolve_texture_path(texture2.filepath)
-                    if t2_resolved_path is None:
-                        t2_resolved_path = resolve_outside_texture_path(texture2.filepath)
+                        t2_resolved_path = resolve_texture_path(texture2.filepath)
+                        if t2_resolved_path is None:
+                            t2_resolved_path = resolve_outside_texture_path(texture2.filepath)
 
-                texture2.wow_wmo_texture.path = t2_resolved_path
+                    texture2.wow_wmo_texture.path = t2_resolved_path
 
         self.report({'INFO'}, "Done filling texture paths")
 
@@ -170,7 +170,8 @@ class WMO_PT_tools_panel_object_mode_add_to_scene(bpy.types.Panel):
             col1_row2.operator("scene.wow_wmo_import_doodad_from_wmv", text='M2',
                             icon_value=ui_icons['WOW_STUDIO_DOODADS_ADD'])        
             col1_row2.operator("scene.wow_import_last_wmo_from_wmv", text='WMO',
-                            icon_value=ui_icons['WOW_STUDIO_WMO_ADD'])                      
+                            icon_value=ui_icons['WOW_STUDIO_WMO_ADD'])
+            col1_row2.operator("scene.wow_import_recent_wmo_from_wmv", text='', icon='RECOVER_LAST')                      
             col1_row3.operator("scene.wow_add_fog", text='Fog', icon_value=ui_icons['WOW_STUDIO_FOG_ADD'])
             col1_row3.operator("scene.wow_add_liquid", text='Liquid', icon_value=ui_icons['WOW_STUDIO_LIQUID_ADD'])                    
 
@@ -266,6 +267,7 @@ class WMO_MT_mesh_wow_components_add(bpy.types.Menu):
             col.operator("scene.wow_wmo_import_doodad_from_wmv", text='M2',
                          icon_value=ui_icons['WOW_STUDIO_DOODADS_ADD'])
             col.operator("scene.wow_import_last_wmo_from_wmv", text='WMO', icon_value=ui_icons['WOW_STUDIO_WMO_ADD'])
+            col.operator("scene.wow_import_recent_wmo_from_wmv", text='Recent WMO', icon='RECOVER_LAST')
 
     @classmethod
     def poll(cls, context):
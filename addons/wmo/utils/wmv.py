@@ -1,104 +1,258 @@
-from typing import Union
+import os
+
+from collections import deque
+from typing import Callable, Dict, List, Tuple, Union
 
 from ...ui.preferences import get_project_preferences
 
 
-def wmv_get_last_wmo() -> Union[None, str]:
-    """Get the path of last WMO model from WoWModelViewer or similar log."""
+class LogWatcher:
+    """ Incremental reader of a model viewer log, collecting file paths matched by a line parser.
+        The log is read backwards from its end in blocks on first use, afterwards only appended bytes are parsed.
+        A last line not terminated yet is parsed as a provisional item and parsed again once completed.
+    """
 
-    project_preferences = get_project_preferences()
-    if project_preferences.wmv_path:
+    BLOCK_SIZE = 64 * 1024
+    HISTORY_SIZE = 32
 
-        lines = open(project_preferences.wmv_path).readlines()
+    # leading bytes compared on every update, to notice a log rewritten in place
+    HEAD_SIZE = 256
 
-        for line in reversed(lines):
-            if 'Loading WMO' in line:
-                return line[22:].rstrip("\n")
+    _watchers: Dict[Tuple[str, Callable], 'LogWatcher'] = {}
 
+    def __init__(self, filepath: str, parse_line: Callable[[str], Union[None, str]]):
+        self.filepath = filepath
+        self.parse_line = parse_line
+        self.history = deque(maxlen=self.HISTORY_SIZE)
+        self.provisional = None
+        self.offset = None
+        self.file_id = None
+        self.head = b''
 
-def wmv_get_last_m2() -> Union[None, str]:
-    """Get the path of last M2 model from WoWModelViewer or similar log."""
+    @classmethod
+    def get(cls, filepath: str, parse_line: Callable[[str], Union[None, str]]) -> 'LogWatcher':
+        key = (os.path.abspath(filepath), parse_line)
+        watcher = cls._watchers.get(key)
+
+        if watcher is None:
+            watcher = cls._watchers[key] = cls(filepath, parse_line)
+
+        return watcher
+
+    def update(self):
+        stat = os.stat(self.filepath)
+        file_id = (stat.st_dev, stat.st_ino)
+
+        with open(self.filepath, 'rb') as f:
+            head = f.read(self.HEAD_SIZE)
+
+            # log was replaced or truncated by a new session of the application
+            if self.offset is None or file_id != self.file_id or stat.st_size < self.offset \
+                    or self._is_rewritten(f, head):
+                self.file_id = file_id
+                self.history.clear()
+                self.provisional = None
+                self._read_tail(f, stat.st_size)
+
+            elif stat.st_size > self.offset:
+                self._read_appended(f, stat.st_size)
+
+            self.head = head
+
+    def _is_rewritten(self, f, head: bytes) -> bool:
+        """ Check if the log was truncated in place and grew past the read offset again. """
+
+        if head[:len(self.head)] != self.head[:len(head)]:
+            return True
+
+        # offset always follows a line break
+        if self.offset:
+            f.seek(self.offset - 1)
+            return f.read(1) != b'\n'
+
+        return False
+
+    def _read_tail(self, f, size: int):
+        """ Read blocks backwards from the end of the log until history is full or the log start is reached. """
+
+        position = size
+        remainder = b''
+        items = []
+        self.offset = None
+
+        while position > 0 and len(items) < self.HISTORY_SIZE:
+            block_size = min(self.BLOCK_SIZE, position)
+            position -= block_size
+            f.seek(position)
+
+            lines = (f.read(block_size) + remainder).split(b'\n')
+
+            # first line may continue in the previous block
+            remainder = lines.pop(0) if position > 0 else b''
+
+            # last line may not be terminated yet, offset is kept before it to parse it again once completed
+            if self.offset is None and lines:
+                tail = lines.pop()
+                self.offset = size - len(tail)
+                self.provisional = self._parse(tail) if tail else None
+
+            for line in reversed(lines):
+                item = self._parse(line)
+                if item is not None:
+                    items.append(item)
+
+        if self.offset is None:
+            self.offset = size
+
+        self.history.extend(reversed(items[:self.HISTORY_SIZE]))
+
+    def _read_appended(self, f, size: int):
+        f.seek(self.offset)
+        data = f.read(size - self.offset)
+
+        end = data.rfind(b'\n') + 1
+        self.offset += end
+        self.provisional = self._parse(data[end:]) if end < len(data) else None
+
+        for line in data[:end].split(b'\n'):
+            item = self._parse(line)
+            if item is not None:
+                self.history.append(item)
+
+    def _parse(self, line: bytes) -> Union[None, str]:
+        return self.parse_line(line.decode('utf-8', errors='replace').rstrip('\r'))
+
+    def last(self) -> Union[None, str]:
+        self.update()
+
+        if self.provisional is not None:
+            return self.provisional
+
+        return self.history[-1] if self.history else None
+
+    def recent(self) -> List[str]:
+        """ Recently logged paths, newest first and without repeats. """
+
+        self.update()
+
+        items = reversed(self.history)
+
+        if self.provisional is not None:
+            items = [self.provisional, *items]
+
+        return list(dict.fromkeys(items))
+
+
+def _parse_wmv_wmo(line: str) -> Union[None, str]:
+    if 'Loading WMO' in line:
+        return line[22:]
 
-    project_preferences = get_project_preferences()
-    if project_preferences.wmv_path:
 
-        lines = open(project_preferences.wmv_path).readlines()
+def _parse_wmv_m2(line: str) -> Union[None, str]:
+    if 'Loading model:' in line:
+        return line[25:].split(",", 1)[0]
 
-        for line in reversed(lines):
-            if 'Loading model:' in line:
-                return line[25:].split(",", 1)[0].rstrip("\n")
+
+def _parse_wmv_texture(line: str) -> Union[None, str]:
+    if 'Loading texture' in line:
+        return line[27:]
+
+
+def _parse_wow_export_texture(line: str) -> Union[None, str]:
+    if 'Previewing texture file' in line:
+        return line[35:].split(",", 1)[0]
+
+
+def _parse_wow_export_model(line: str) -> Union[None, str]:
+    if 'Previewing model' in line:
+        return line[28:].split(",", 1)[0]
+
+
+def _parse_noggit_red_m2(line: str) -> Union[None, str]:
+    if 'Loaded  file' in line and 'm2' in line:
+        start = line.find("'") + 1
+        end = line.find(".m2") + 3
+        return line[start:end]
+
+
+def _parse_noggit_red_wmo(line: str) -> Union[None, str]:
+    if 'Loaded  file' in line and 'wmo' in line:
+        start = line.find("'") + 1
+        end = line.find(".wmo") + 4
+        return line[start:end]
+
+
+# (log path preference, line parser) by application and file type
+LOG_PARSERS = {
+    ('WMV', 'WMO'): ('wmv_path', _parse_wmv_wmo),
+    ('WMV', 'M2'): ('wmv_path', _parse_wmv_m2),
+    ('WMV', 'TEXTURE'): ('wmv_path', _parse_wmv_texture),
+    ('WowExport', 'WMO'): ('wow_export_path', _parse_wow_export_model),
+    ('WowExport', 'M2'): ('wow_export_path', _parse_wow_export_model),
+    ('WowExport', 'TEXTURE'): ('wow_export_path', _parse_wow_export_texture),
+    ('NoggitRed', 'WMO'): ('noggit_red_path', _parse_noggit_red_wmo),
+    ('NoggitRed', 'M2'): ('noggit_red_path', _parse_noggit_red_m2),
+}
+
+
+def _get_log_watcher(application: str, file_type: str) -> Union[None, LogWatcher]:
+    path_property, parse_line = LOG_PARSERS[application, file_type]
+    log_path = getattr(get_project_preferences(), path_property)
+
+    if log_path:
+        return LogWatcher.get(log_path, parse_line)
+
+
+def get_recent_log_items(application: str, file_type: str) -> List[str]:
+    """Get paths of recently viewed files of a type from an application log, newest first."""
+
+    if (application, file_type) not in LOG_PARSERS:
+        return []
+
+    watcher = _get_log_watcher(application, file_type)
+    return watcher.recent() if watcher else []
+
+
+def _get_last_log_item(application: str, file_type: str) -> Union[None, str]:
+    watcher = _get_log_watcher(application, file_type)
+    return watcher.last() if watcher else None
+
+
+def wmv_get_last_wmo() -> Union[None, str]:
+    """Get the path of last WMO model from WoWModelViewer or similar log."""
+    return _get_last_log_item('WMV', 'WMO')
+
+
+def wmv_get_last_m2() -> Union[None, str]:
+    """Get the path of last M2 model from WoWModelViewer or similar log."""
+    return _get_last_log_item('WMV', 'M2')
 
 
 def wmv_get_last_texture() -> Union[None, str]:
     """Get the path of last texture from WoWModelViewer or similar log."""
+    return _get_last_log_item('WMV', 'TEXTURE')
 
-    project_preferences = get_project_preferences()
-    if project_preferences.wmv_path:
-
-        lines = open(project_preferences.wmv_path).readlines()
 
-        for line in reversed(lines):
-            if 'Loading texture' in line:
-                return line[27:].rstrip("\n")
-            
-def wow_export_get_last_texture() -> Union[None,str]:
+def wow_export_get_last_texture() -> Union[None, str]:
     """Get the path of last texture from WoWExport or similar log."""
-    project_preferences = get_project_preferences()
-    if project_preferences.wow_export_path:
-        lines = open(project_preferences.wow_export_path).readlines()
-
-        for line in reversed(lines):
-            if 'Previewing texture file' in line:
-                return line[35:].split(",", 1)[0].rstrip("\n")
-                            
+    return _get_last_log_item('WowExport', 'TEXTURE')
+
+
 def wow_export_get_last_m2() -> Union[None, str]:
     """Get the path of last M2 model from WoWExport or similar log."""
+    return _get_last_log_item('WowExport', 'M2')
 
-    project_preferences = get_project_preferences()
-    if project_preferences.wow_export_path:
-
-        lines = open(project_preferences.wow_export_path).readlines()
 
-        for line in reversed(lines):
-            if 'Previewing model' in line:
-                return line[28:].split(",", 1)[0].rstrip("\n")
-            
 def noggit_red_get_last_m2() -> Union[None, str]:
     """Get the path of last M2 model from Noggit Red or similar log."""
+    return _get_last_log_item('NoggitRed', 'M2')
 
-    project_preferences = get_project_preferences()
-    if project_preferences.noggit_red_path:
-
-        lines = open(project_preferences.noggit_red_path).readlines()
-
-        for line in reversed(lines):
-            if 'Loaded  file' in line and 'm2' in line:
-                start = line.find("'") + 1
-                end = line.find(".m2") + 3
-                return line[start:end]               
 
 def noggit_red_get_last_wmo() -> Union[None, str]:
     """Get the path of last WMO model from Noggit Red or similar log."""
+    return _get_last_log_item('NoggitRed', 'WMO')
 
-    project_preferences = get_project_preferences()
-    if project_preferences.noggit_red_path:
 
-        lines = open(project_preferences.noggit_red_path).readlines()
-
-        for line in reversed(lines):
-            if 'Loaded  file' in line and 'wmo' in line:
-                start = line.find("'") + 1
-                end = line.find(".wmo") + 4
-                return line[start:end]    
-            
 def wow_export_get_last_wmo() -> Union[None, str]:
     """Get the path of last WMO model from WoWExport or similar log."""
-
-    project_preferences = get_project_preferences()
-    if project_preferences.wow_export_path:
-
-        lines = open(project_preferences.wow_export_path).readlines()
-
-        for line in reversed(lines):
-            if 'Previewing model' in line:
-                return line[28:].split(",", 1)[0].rstrip("\n")
\ No newline at end of file
+    return _get_last_log_item('WowExport', 'WMO')
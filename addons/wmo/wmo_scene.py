@@ -18,7 +18,7 @@ from .utils.doodads import import_doodad
 from .wmo_scene_group import BlenderWMOSceneGroup
 from ..ui.preferences import get_project_preferences
 from ..utils.misc import find_nearest_object
-from ..wbs_kernel.wmo_utils import CWMOGeometryBatcher, WMOGeometryBatcherMeshParams
+from ..wbs_kernel.wmo_utils import CWMOGeometryBatcher, WMOGeometryBatcherMeshParams, CWMOGeometryUnbatcher
 from .ui.collections import get_wmo_collection, SpecialCollections, get_wmo_groups_list
 from ..utils.collections import get_current_wow_model_collection
 
@@ -434,12 +434,22 @@ class BlenderWMOScene:
 
     def load_groups(self):
 
-        for i, group in tqdm(enumerate(self.wmo.groups), desc='Importing groups', ascii=True):
+        unbatching_params = []
+        groups_to_load = []
+
+        for i, group in enumerate(self.wmo.groups):
             bl_group = BlenderWMOSceneGroup(self, group)
             self.bl_groups.append(bl_group)
 
             if not bl_group.name == 'antiportal':
-                bl_group.load_object(i)
+                groups_to_load.append((i, bl_group))
+                unbatching_params.append(bl_group.create_unbatching_parameters())
+
+        # convert geometry of all groups in parallel
+        unbatcher = CWMOGeometryUnbatcher(unbatching_params)
+
+        for group_index, (i, bl_group) in tqdm(enumerate(groups_to_load), desc='Importing groups', ascii=True):
+            bl_group.load_object(i, unbatcher, group_index)
 
     def build_references(self, export_selected, export_method):
         """ Build WMO references in Blender scene """
@@ -816,13 +826,13 @@ class BlenderWMOScene:
 
             bl_group.wmo_group.mogp.portal_count = len(self.wmo.mopr.relations) - bl_group.wmo_group.mogp.portal_start
 
-    def prepare_groups(self):
+    def prepare_groups(self, optimize_vertex_cache: bool = False):
         for bl_group in tqdm(self.bl_groups, desc='Preparing groups', ascii=True):
             if bl_group.wmo_group.export:
                 bl_group.doodads_relations = self.doodads_relations[bl_group.bl_object]
                 bl_group.lights_relations = self.lights_relations[bl_group.bl_object]
 
-                mesh, params = bl_group.create_batching_parameters()
+                mesh, params = bl_group.create_batching_parameters(optimize_vertex_cache)
                 self.groups_eval.append(mesh)
                 self.group_batch_params.append(params)
 
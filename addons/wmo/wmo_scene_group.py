@@ -1,6 +1,7 @@
 import bpy
 import mathutils
 import bmesh
+import numpy as np
 
 from typing import Tuple, Dict, List
 
@@ -9,8 +10,10 @@ from ..pywowlib.file_formats.wmo_format_group import MOGPFlags, LiquidVertex, BS
 from ..pywowlib.wmo_file import WMOGroupFile
 from .bl_render import BlenderWMOObjectRenderFlags
 from ..pywowlib import WoWVersions
-from ..wbs_kernel.wmo_utils import CWMOGeometryBatcher, WMOGeometryBatcherMeshParams, LiquidExportParams
-from ..utils.colors import srgb_to_linear as linear
+from ..utils.misc import mesh_from_triangles
+from ..wbs_kernel.wmo_utils import CWMOGeometryBatcher, WMOGeometryBatcherMeshParams, LiquidExportParams, \
+    CWMOGeometryUnbatcher, WMOGeometryUnbatcherGroupParams, CMeshColorLayer, BSP_NODE_DTYPE, MOBA_BATCH_DTYPE, \
+    MOPY_TRIANGLE_MATERIAL_DTYPE
 from .ui.custom_objects import WoWWMOGroup
 from .ui.collections import get_wmo_collection, SpecialCollections
 
@@ -498,184 +501,133 @@ class BlenderWMOSceneGroup:
             self.create_BSP_render(bsp_node.children[1], positive_min, positive_max, depth+1)
 
 
-    def load_object(self, export_order):
-        """ Load WoW WMO group as an object to the Blender scene """
+    def create_unbatching_parameters(self) -> WMOGeometryUnbatcherGroupParams:
+        """ Gather WMO group chunk data for the native unbatcher """
 
         group = self.wmo_group
+        flags = group.mogp.flags
 
-        vertices = group.movt.vertices
-        normals = group.monr.normals
-        tex_coords = group.motv.tex_coords
-        faces = [group.movi.indices[i:i + 3] for i in range(0, len(group.movi.indices), 3)]
+        triangle_materials = np.array([(mat.flags, mat.material_id) for mat in group.mopy.triangle_materials]
+                                      , dtype=MOPY_TRIANGLE_MATERIAL_DTYPE)
 
-        # create mesh
-        mesh = bpy.data.meshes.new(self.name)
-        mesh.from_pydata(vertices, [], faces)
+        batches = np.zeros(len(group.moba.batches), dtype=MOBA_BATCH_DTYPE)
+
+        for i, batch in enumerate(group.moba.batches):
+            batches['start_index'][i] = batch.start_triangle
+            batches['indices_count'][i] = batch.n_triangles
+            batches['max_index'][i] = batch.last_vertex
+
+            if batch.material_id > 0xFF:
+                batches['flags'][i] = 0x2  # MOBAFlags::FLAG_USE_MATERIAL_ID_LARGE
+                batches['bounding_box'][i, 5] = np.uint16(batch.material_id).view(np.int16)
+            else:
+                batches['material_id'][i] = batch.material_id
+
+        bsp_nodes = np.array([(node.plane_type, tuple(node.children), node.num_faces, node.first_face, node.dist)
+                              for node in group.mobn.nodes], dtype=BSP_NODE_DTYPE) if group.mobn else None
+
+        vertex_colors = None
+        if flags & MOGPFlags.HasVertexColor:
+            vertex_colors = group.mocv.vert_colors
+
+        blend_colors = None
+        if flags & MOGPFlags.HasTwoMOCV:
+            blend_colors = (group.mocv2 if flags & MOGPFlags.HasVertexColor else group.mocv).vert_colors
+
+        return WMOGeometryUnbatcherGroupParams(group.movt.vertices
+                                               , group.monr.normals
+                                               , group.movi.indices
+                                               , triangle_materials
+                                               , batches
+                                               , group.mogp.n_batches_a
+                                               , group.mogp.n_batches_b
+                                               , tex_coords=group.motv.tex_coords
+                                               , tex_coords2=group.motv2.tex_coords
+                                               if flags & MOGPFlags.HasTwoMOTV else None
+                                               , vertex_colors=vertex_colors
+                                               , blend_colors=blend_colors
+                                               , bsp_nodes=bsp_nodes
+                                               , bsp_faces=group.mobr.faces if group.mobr else None)
+
+    def load_object(self, export_order, unbatcher: CWMOGeometryUnbatcher, group_index: int):
+        """ Load WoW WMO group as an object to the Blender scene """
+
+        group = self.wmo_group
+
+        # create mesh, collision faces are split into a separate mesh by the unbatcher
+        mesh = mesh_from_triangles(self.name, unbatcher.render_vertices(group_index)
+                                   , unbatcher.render_triangles(group_index))
 
         # create object
         scn = bpy.context.scene
 
         nobj = bpy.data.objects.new(self.name, mesh)
 
-        collision_face_ids = []
-        for i, poly in enumerate(mesh.polygons):
-            poly.use_smooth = True
-
-            try: 
-                if group.mopy.triangle_materials[i].material_id == 0xFF:
-                    collision_face_ids.append(i)
-            except:
-                pass
+        mesh.polygons.foreach_set('use_smooth', np.ones(len(mesh.polygons), dtype=bool))
 
         # set normals
-        custom_normals = [(0.0, 0.0, 0.0)] * len(mesh.loops)
         mesh.use_auto_smooth = True
-        for i, loop in enumerate(mesh.loops):
-            custom_normals[i] = normals[loop.vertex_index]
-
-        mesh.normals_split_custom_set(custom_normals)
+        mesh.normals_split_custom_set(unbatcher.loop_normals(group_index))
 
         pass_index = 0
 
+        def add_color_layer(name: str, layer: CMeshColorLayer):
+            colors = unbatcher.loop_colors(group_index, layer)
+
+            if colors is None:
+                return
+
+            color_attribute = mesh.color_attributes.new(name=name, type='BYTE_COLOR', domain='CORNER')
+            color_attribute.data.foreach_set('color', colors.ravel())
+
         # set vertex color
-        vertex_color_layer = None
         if group.mogp.flags & MOGPFlags.HasVertexColor:
             flag_set = nobj.wow_wmo_group.flags
             flag_set.add('0')
             nobj.wow_wmo_group.flags = flag_set
-            vertex_color_layer = mesh.color_attributes.new(name="Col", type='BYTE_COLOR', domain='POINT')
-            mesh.color_attributes.new(name="Lightmap", type='BYTE_COLOR', domain='POINT')
+            add_color_layer('Col', CMeshColorLayer.VERTEX_COLOR)
+            add_color_layer('Lightmap', CMeshColorLayer.LIGHTMAP)
 
             pass_index |= BlenderWMOObjectRenderFlags.HasVertexColor
             pass_index |= BlenderWMOObjectRenderFlags.HasLightmap
 
-        blendmap = None
         if group.mogp.flags & MOGPFlags.HasTwoMOCV:
-            blendmap = mesh.color_attributes.new(name="Blendmap", type='BYTE_COLOR', domain='POINT')
+            add_color_layer('Blendmap', CMeshColorLayer.BLENDMAP)
 
             pass_index |= BlenderWMOObjectRenderFlags.HasBlendmap
 
         # set uv
-        mesh.uv_layers.new(name="UVMap")
-        uv_layer1 = mesh.uv_layers[0]
+        uv_layer1 = mesh.uv_layers.new(name="UVMap")
+        tex_coords = unbatcher.loop_tex_coords(group_index)
 
-        for i, uv_loop in enumerate(uv_layer1.data):
-            uv = tex_coords[mesh.loops[i].vertex_index]
-            uv_layer1.data[i].uv = (uv[0], 1 - uv[1])
+        if tex_coords is not None:
+            uv_layer1.data.foreach_set('uv', tex_coords.ravel())
 
         if group.mogp.flags & MOGPFlags.HasTwoMOTV:
-            uv2 = mesh.uv_layers.new(name="UVMap.001")
-            nobj.wow_wmo_vertex_info.second_uv = uv2.name
-            uv_layer2 = mesh.uv_layers[1]
-
-            for i, uv_loop in enumerate(uv_layer2.data):
-                uv = group.motv2.tex_coords[mesh.loops[i].vertex_index]
-                uv_loop.uv = (uv[0], 1 - uv[1])
-
-        # map wmo material ID to index in mesh materials
-        material_indices = {}
-        material_viewport_textures = {}
-
-        # create batch vertex groups
+            uv_layer2 = mesh.uv_layers.new(name="UVMap.001")
+            nobj.wow_wmo_vertex_info.second_uv = uv_layer2.name
+            tex_coords2 = unbatcher.loop_tex_coords2(group_index)
 
-        batch_map_a = None
-        batch_map_b = None
+            if tex_coords2 is not None:
+                uv_layer2.data.foreach_set('uv', tex_coords2.ravel())
 
+        # create batch maps
         if group.mogp.n_batches_a != 0:
-            batch_map_a = mesh.color_attributes.new(name="BatchmapTrans", type='BYTE_COLOR', domain='POINT')
+            add_color_layer('BatchmapTrans', CMeshColorLayer.BATCH_MAP_TRANS)
             pass_index |= BlenderWMOObjectRenderFlags.HasBatchA
 
         if group.mogp.n_batches_b != 0:
-            batch_map_b = mesh.color_attributes.new(name="BatchmapInt", type='BYTE_COLOR', domain='POINT')
+            add_color_layer('BatchmapInt', CMeshColorLayer.BATCH_MAP_INT)
             pass_index |= BlenderWMOObjectRenderFlags.HasBatchB
 
-        # nobj.wow_wmo_vertex_info.batch_map = batch_map.name
-
-        batch_material_map = {}
-
-        batch_a_range = range(0, group.moba.batches[group.mogp.n_batches_a - 1].last_vertex + 1
-        if group.mogp.n_batches_a else 0)
-
-        batch_b_range = range(len(batch_a_range) - 1,
-                              group.moba.batches[group.mogp.n_batches_a + group.mogp.n_batches_b - 1].last_vertex + 1
-                              if group.mogp.n_batches_b else len(batch_a_range) - 1)
-
         # add materials
-        for i, batch in enumerate(group.moba.batches):
-
-            material = self.wmo_scene.bl_materials[group.moba.batches[i].material_id]
+        for material_id in unbatcher.material_ids(group_index):
+            mesh.materials.append(self.wmo_scene.bl_materials[material_id])
 
-            mat_index_local = material_indices.get(batch.material_id)
-
-            if mat_index_local is None:
-                mat_id = len(mesh.materials)
-                material_indices[batch.material_id] = mat_id
-
-                image = self.get_material_viewport_image(material)
-                material_viewport_textures[mat_id] = image
-                mesh.materials.append(material)
-                mat_index_local = mat_id
-
-            for poly in mesh.polygons[batch.start_triangle // 3: (batch.start_triangle + batch.n_triangles) // 3]:
-
-                poly.material_index = mat_index_local
-
-            batch_material_map[(batch.start_triangle // 3,
-                                (batch.start_triangle + group.moba.batches[i].n_triangles) // 3)] = batch.material_id
-
-        # set layer data
-        for vertex_index, vertex in enumerate(mesh.vertices):
-
-            if vertex_color_layer is not None:
-
-                mesh.color_attributes['Col'].data[vertex_index].color = (
-                    linear(group.mocv.vert_colors[vertex_index][2] / 255),
-                    linear(group.mocv.vert_colors[vertex_index][1] / 255),
-                    linear(group.mocv.vert_colors[vertex_index][0] / 255),
-                    1.0
-                )
-
-                mesh.color_attributes['Lightmap'].data[vertex_index].color = (
-                    linear(group.mocv.vert_colors[vertex_index][3] / 255),
-                    linear(group.mocv.vert_colors[vertex_index][3] / 255),
-                    linear(group.mocv.vert_colors[vertex_index][3] / 255),
-                    1.0
-                )
-
-            if blendmap is not None:
-                mocv_layer = group.mocv2 if group.mogp.flags & MOGPFlags.HasVertexColor else group.mocv
-                mesh.color_attributes['Blendmap'].data[vertex_index].color = (
-                    linear(mocv_layer.vert_colors[vertex_index][3] / 255),
-                    linear(mocv_layer.vert_colors[vertex_index][3] / 255),
-                    linear(mocv_layer.vert_colors[vertex_index][3] / 255),
-                    1.0
-                )
-
-            if batch_map_a:
-                mesh.color_attributes['BatchmapTrans'].data[vertex_index].color = (
-                    (1, 1, 1, 1) if vertex_index in batch_a_range else (0, 0, 0, 0)
-                )
-
-            if batch_map_b:
-                mesh.color_attributes['BatchmapInt'].data[vertex_index].color = (
-                    (1, 1, 1, 1) if vertex_index in batch_b_range else (0, 0, 0, 0)
-                )
-        '''
-        # set faces material
-        for i in range(len(mesh.polygons)):
-            mat_id = group.mopy.triangle_materials[i].material_id
- 
-            mesh.polygons[i].material_index = material_indices[mat_id]
- 
-            # set texture displayed in viewport
-            img = material_viewport_textures[material_indices[mat_id]]
-            if img is not None:
-                uv1.data[i].image = img
- 
-        '''
+        mesh.polygons.foreach_set('material_index', unbatcher.polygon_material_indices(group_index))
 
         # add collision vertex group
-        collision_indices = self.get_collision_indices()
+        collision_indices = unbatcher.collision_vertex_indices(group_index).tolist()
 
         if collision_indices:
             collision_vg = nobj.vertex_groups.new(name="Collision")
@@ -739,48 +691,12 @@ class BlenderWMOSceneGroup:
 
         self.bl_object = nobj
 
-        # remove collision faces from mesh
-        if collision_face_ids:
-
-            bm_col = bmesh.new()
-
-            bm = bmesh.new()
-            bm.from_mesh(mesh)
-
-            bm.faces.ensure_lookup_table()
-            bm.verts.ensure_lookup_table()
-            bm.edges.ensure_lookup_table()
-            bm_collision_faces = [bm.faces[i] for i in collision_face_ids]
+        # create collision mesh
+        collision_triangles = unbatcher.collision_triangles(group_index)
 
-            # create collision mesh
-            vert_map = {}
-            for face in bm_collision_faces:
-                face_verts = [None, None, None]
-                for j, vert in enumerate(face.verts):
-
-                    n_vert = vert_map.get(vert.index)
-                    if not n_vert:
-                        n_vert = bm_col.verts.new(vert.co)
-                        vert_map[vert.index] = n_vert
-
-                    face_verts[j] = n_vert
-
-                try:
-                    bm_col.faces.new(face_verts)
-                except ValueError:
-                    pass
-                    # print('\nWARNING: Duplicated face was removed from collision geometry.')
-
-            c_mesh = bpy.data.meshes.new(name=self.name + '_Collision')
-            bm_col.to_mesh(c_mesh)
-            bm_col.free()
-
-            # remove collision faces from original mesh
-            bmesh.ops.delete(bm, geom=bm_collision_faces, context='FACES')
-            bm.to_mesh(mesh)
-            mesh.update()
-            bpy.context.view_layer.update()
-            bm.free()
+        if collision_triangles.shape[0]:
+            c_mesh = mesh_from_triangles(self.name + '_Collision', unbatcher.collision_vertices(group_index)
+                                         , collision_triangles)
 
             c_obj = bpy.data.objects.new(c_mesh.name, c_mesh)
             nobj.wow_wmo_group.collision_mesh = c_obj
@@ -1011,7 +927,8 @@ class BlenderWMOSceneGroup:
 
         return params
 
-    def create_batching_parameters(self) -> Tuple[bpy.types.Mesh, WMOGeometryBatcherMeshParams]:
+    def create_batching_parameters(self, optimize_vertex_cache: bool = False
+                                   ) -> Tuple[bpy.types.Mesh, WMOGeometryBatcherMeshParams]:
         """ Prepare the WoW WMO group proxy mesh for export.
             Mesh is returned in order to keep its lifetime beyond the function scope.
         """
@@ -1094,6 +1011,7 @@ class BlenderWMOSceneGroup:
                                                   , mesh.has_custom_normals
                                                   , vg_collision_index
                                                   , obj.wow_wmo_vertex_info.node_size
+                                                  , optimize_vertex_cache
                                                   , material_mapping
                                                   , liquid_params)
 
@@ -1112,6 +1030,18 @@ class BlenderWMOSceneGroup:
         self.wmo_group.mobn.from_bytes(batcher.bsp_nodes(group_index))
         self.wmo_group.mobr.from_bytes(batcher.bsp_faces(group_index))
 
+        bsp_stats = batcher.bsp_stats(group_index)
+        print('BSP tree for group \"{}\": {} nodes, {} leaves, depth {}, faces per leaf {}/{:.1f}/{} (min/avg/max), '
+              '{} face references, built in {:.2f} ms'.format(obj.name, bsp_stats.n_nodes, bsp_stats.n_leaves,
+                                                              bsp_stats.depth, bsp_stats.min_leaf_faces,
+                                                              bsp_stats.avg_leaf_faces, bsp_stats.max_leaf_faces,
+                                                              bsp_stats.n_face_refs, bsp_stats.build_time_ms))
+
+        acmr_before, acmr_after = batcher.acmr(group_index)
+        if acmr_before:
+            print('Vertex cache optimization for group \"{}\": ACMR {:.3f} -> {:.3f}'.format(obj.name, acmr_before,
+                                                                                             acmr_after))
+
         if self.has_blending:
             self.wmo_group.motv2.from_bytes(batcher.tex_coords2(group_index))
             self.wmo_group.mocv2.from_bytes(batcher.vertex_colors2(group_index))